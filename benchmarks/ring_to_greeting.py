@@ -0,0 +1,416 @@
+# benchmarks/ring_to_greeting.py
+# Measures the time from a ringing call event to the first audio of the
+# greeting in dialogue_manager.handle_incoming_call, broken down by stage,
+# plus call throughput under concurrent rings and memory growth over a run.
+#
+# The camera, microphone and speaker are replaced by stubs so the benchmark
+# runs headless, and the stages are timed through Neo's own hooks (session
+# and speech listeners, metrics observers). Results are written as JSON so
+# runs can be compared:
+#
+#   python benchmarks/ring_to_greeting.py --calls 200 --concurrency 4
+#   python benchmarks/ring_to_greeting.py --compare benchmarks/results/<old>.json
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+STAGES = ["dispatch", "detect", "record_call", "learner", "queue", "synthesis"]
+
+# Neo's timing histograms (core/metrics.py) that make up a stage
+METRIC_STAGES = {
+    "neo_condition_detect_seconds": "detect",
+    "neo_record_call_seconds": "record_call",
+    "neo_learner_lookup_seconds": "learner",
+}
+
+
+# -------------------------------------------------
+# Stub backends
+# -------------------------------------------------
+class StubCamera:
+    """
+    Returns synthetic 640x480 frames: a bright face-like patch on a dark
+    background, with a little noise so motion detection sees change.
+    """
+
+    def __init__(self, np):
+        self.np = np
+        self.rng = np.random.default_rng(0)
+        self.base = np.full((480, 640, 3), 40, dtype=np.uint8)
+        self.base[120:360, 220:420] = 180
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        noise = self.rng.integers(0, 12, size=self.base.shape, dtype=self.np.uint8)
+        return True, self.base + noise
+
+    def release(self):
+        pass
+
+
+class StubCascade:
+    """
+    Stand-in for a Haar classifier: reports one box when the region is bright.
+    """
+
+    def __init__(self, cost=0.0):
+        self.cost = cost
+
+    def detectMultiScale(self, gray, *args, **kwargs):
+        if self.cost:
+            time.sleep(self.cost)
+        if gray.size and gray.mean() > 100:
+            h, w = gray.shape
+            return [(w // 4, h // 4, w // 2, h // 2)]
+        return []
+
+
+class StubAudio:
+    """
+    Stands in for speaking and listening (speech_io.set_backend). speak()
+    models synthesis as a fixed time to the first chunk (or runs real Piper
+    when asked) and then plays for a time proportional to the text length.
+    """
+
+    def __init__(self, bench, first_chunk_ms, playback_ms_per_char, real_tts=False):
+        self.bench = bench
+        self.first_chunk = first_chunk_ms / 1000.0
+        self.per_char = playback_ms_per_char / 1000.0
+        self.real_tts = real_tts
+
+    def speak(self, text, stop):
+        from core import speech_io
+        if self.real_tts:
+            next(iter(speech_io.tts_voice().synthesize(text)))
+        elif self.first_chunk:
+            time.sleep(self.first_chunk)
+        self.bench.first_audio(time.perf_counter())
+        if self.per_char:
+            time.sleep(len(text) * self.per_char)
+        return not stop.is_set()
+
+    def utterances(self, partials=False, timeout=None, keywords=None, stop=None):
+        yield "final", "this is a benchmark message"
+        yield "final", "finished"
+
+
+# -------------------------------------------------
+# Instrumentation
+# -------------------------------------------------
+class Bench:
+    """
+    Collects per-call timestamps and stage durations. Calls are keyed by
+    caller number; the handling thread is mapped to the call it serves.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.calls = {}           # number -> dict of timings
+        self.thread_call = {}     # thread id -> number
+        self.future_calls = {}    # greeting future -> [numbers]
+        self.unrecorded = deque() # rung numbers whose record_call is still to come
+        self.speaking = None      # (future, started) of the utterance playing
+        self.done = threading.Condition(self.lock)
+        self.completed = 0
+
+    def ring(self, number):
+        with self.lock:
+            self.calls[number] = {"ring": time.perf_counter(), "stages": {}}
+            self.unrecorded.append(number)
+
+    # ---------- Neo's hooks ----------
+    def on_session(self, event, session):
+        from core import call_session
+        if session.number not in self.calls:
+            return
+        if event == call_session.HANDLING:
+            self.bind(session.number)
+        elif event == call_session.CLOSED:
+            self.finish()
+
+    def on_speech(self, event, text, future):
+        from core import speech_scheduler
+        if event == speech_scheduler.QUEUED:
+            self.greeting_queued(future, time.perf_counter())
+        elif event == speech_scheduler.STARTED:
+            with self.lock:
+                self.speaking = (future, time.perf_counter())
+
+    def on_metric(self, name, seconds):
+        stage = METRIC_STAGES.get(name)
+        if stage == "record_call":
+            # Rings are recorded on the dispatcher thread, in the order they came
+            with self.lock:
+                if self.unrecorded:
+                    self.calls[self.unrecorded.popleft()]["stages"]["record_call"] = seconds
+        elif stage is not None:
+            self.stage(stage, seconds)
+
+    # ---------- per call ----------
+    def bind(self, number):
+        with self.lock:
+            self.thread_call[threading.get_ident()] = number
+            call = self.calls[number]
+            call["stages"]["dispatch"] = time.perf_counter() - call["ring"]
+
+    def current(self):
+        with self.lock:
+            number = self.thread_call.get(threading.get_ident())
+            return self.calls.get(number), number
+
+    def stage(self, name, seconds):
+        call, _ = self.current()
+        if call is not None:
+            with self.lock:
+                call["stages"][name] = call["stages"].get(name, 0.0) + seconds
+
+    def greeting_queued(self, future, queued_at):
+        call, number = self.current()
+        if call is None or "greeting_queued" in call:
+            return
+        with self.lock:
+            call["greeting_queued"] = queued_at
+            self.future_calls.setdefault(future, []).append(number)
+
+    def first_audio(self, first_audio):
+        with self.lock:
+            if self.speaking is None:
+                return
+            (future, speak_started), self.speaking = self.speaking, None
+            for number in self.future_calls.pop(future, []):
+                call = self.calls[number]
+                call["first_audio"] = first_audio
+                call["stages"]["queue"] = speak_started - call["greeting_queued"]
+                call["stages"]["synthesis"] = first_audio - speak_started
+
+    def finish(self):
+        with self.lock:
+            self.thread_call.pop(threading.get_ident(), None)
+            self.completed += 1
+            self.done.notify_all()
+
+    def wait_for(self, count, timeout):
+        deadline = time.perf_counter() + timeout
+        with self.lock:
+            while self.completed < count:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise TimeoutError(f"only {self.completed}/{count} calls finished")
+                self.done.wait(remaining)
+
+
+def install(bench, args):
+    """
+    Imports Neo inside a scratch directory and wires the stubs and hooks in.
+    Returns the main and call_simulator modules.
+    """
+    os.environ["NEO_AUDIO"] = "null"
+    os.chdir(tempfile.mkdtemp(prefix="neo-bench-"))
+    sys.path.insert(0, REPO_ROOT)
+
+    import numpy as np
+    import main
+    from core import call_simulator, condition_detector, metrics, speech_io, speech_scheduler
+
+    condition_detector.set_camera(StubCamera(np),
+                                  StubCascade(args.cascade_ms / 1000.0),
+                                  StubCascade(args.cascade_ms / 1000.0))
+    audio = StubAudio(bench, args.tts_first_chunk_ms, args.playback_ms_per_char, args.real_tts)
+    speech_io.set_backend(speak=audio.speak, utterances=audio.utterances)
+    if args.real_tts:
+        speech_io.use_null_backend(False)
+    if args.fresh_detect:
+        # Sample the camera on every ring instead of using the sampler's estimate
+        condition_detector.ESTIMATE_MAX_AGE = 0
+    # The benchmark itself keeps the CPU busy; never read that as "using_phone"
+    condition_detector.CPU_ACTIVE_THRESHOLD = 101
+
+    # Stage timings
+    metrics.ENABLED = True
+    metrics.add_observer(bench.on_metric)
+    speech_scheduler.add_listener(bench.on_speech)
+    main.sessions.add_listener(bench.on_session)
+    # Every wave must be handled, never declined
+    main.sessions.max_sessions = max(main.sessions.max_sessions, args.concurrency)
+
+    events = call_simulator.subscribe()
+    threading.Thread(target=main.call_handler, args=(events,), daemon=True).start()
+    return main, call_simulator
+
+
+# -------------------------------------------------
+# Running
+# -------------------------------------------------
+def percentiles(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] * 1000
+    return {
+        "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99),
+        "mean": statistics.fmean(ordered) * 1000, "max": ordered[-1] * 1000,
+        "count": len(ordered),
+    }
+
+
+def run_waves(bench, call_simulator, total, concurrency, prefix, timeout):
+    """
+    Rings `total` calls in waves of `concurrency` simultaneous callers,
+    waiting for each wave to finish. Returns the elapsed wall time.
+    """
+    started = time.perf_counter()
+    completed_before = bench.completed
+    rung = 0
+    while rung < total:
+        wave = min(concurrency, total - rung)
+        for i in range(wave):
+            number = f"{prefix}{rung + i:07d}"
+            bench.ring(number)
+            call_simulator.publish(call_simulator.RINGING,
+                                   {"name": f"Caller {rung + i}", "number": number})
+        rung += wave
+        bench.wait_for(completed_before + rung, timeout)
+    return time.perf_counter() - started
+
+
+def run(args):
+    bench = Bench()
+    # Neo prints on every call; keep the benchmark output readable
+    with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet):
+        _, call_simulator = install(bench, args)
+        from core import speech_scheduler
+
+        # Warm-up (imports, caches, first allocations) is not counted
+        run_waves(bench, call_simulator, args.warmup, 1, "+1999", args.timeout)
+        speech_scheduler.wait_idle(args.timeout)
+
+        tracemalloc.start()
+        baseline = tracemalloc.take_snapshot()
+        calls_before = set(bench.calls)
+
+        latency_wall = run_waves(bench, call_simulator, args.calls, 1, "+1555", args.timeout)
+        throughput_wall = run_waves(bench, call_simulator, args.calls, args.concurrency, "+1666", args.timeout)
+        speech_scheduler.wait_idle(args.timeout)
+
+        after = tracemalloc.take_snapshot()
+        growth = sum(stat.size_diff for stat in after.compare_to(baseline, "filename"))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    sequential = [c for n, c in bench.calls.items() if n.startswith("+1555") and "first_audio" in c]
+    concurrent = [c for n, c in bench.calls.items() if n.startswith("+1666") and "first_audio" in c]
+    measured = len(set(bench.calls) - calls_before)
+
+    result = {
+        "benchmark": "ring_to_greeting",
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "config": vars(args).copy(),
+        "ring_to_greeting_ms": percentiles([c["first_audio"] - c["ring"] for c in sequential]),
+        "ring_to_greeting_concurrent_ms": percentiles([c["first_audio"] - c["ring"] for c in concurrent]),
+        "stages_ms": {stage: percentiles([c["stages"][stage] for c in sequential if stage in c["stages"]])
+                      for stage in STAGES},
+        "throughput": {
+            "sequential_calls_per_s": args.calls / latency_wall if latency_wall else 0.0,
+            "concurrent_calls_per_s": args.calls / throughput_wall if throughput_wall else 0.0,
+            "concurrency": args.concurrency,
+        },
+        "memory": {
+            "growth_kb": growth / 1024,
+            "growth_bytes_per_call": growth / measured if measured else 0.0,
+            "peak_traced_kb": peak / 1024,
+        },
+    }
+    result["config"].pop("compare", None)
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "-C", REPO_ROOT, "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# -------------------------------------------------
+# Reporting
+# -------------------------------------------------
+def print_report(result, previous=None):
+    def line(label, stats, old=None):
+        if not stats:
+            print(f"  {label:<24} (no data)")
+            return
+        text = f"  {label:<24} p50 {stats['p50']:8.2f}  p95 {stats['p95']:8.2f}  p99 {stats['p99']:8.2f} ms"
+        if old:
+            text += f"   (p95 {stats['p95'] - old['p95']:+.2f} ms)"
+        print(text)
+
+    prev = previous or {}
+    print("⏱  Ring-to-greeting latency")
+    line("sequential", result["ring_to_greeting_ms"], prev.get("ring_to_greeting_ms"))
+    line(f"{result['throughput']['concurrency']} concurrent", result["ring_to_greeting_concurrent_ms"],
+         prev.get("ring_to_greeting_concurrent_ms"))
+    print("🔬 Stages (sequential calls)")
+    for stage in STAGES:
+        line(stage, result["stages_ms"].get(stage), prev.get("stages_ms", {}).get(stage))
+    t = result["throughput"]
+    print(f"📈 Throughput: {t['sequential_calls_per_s']:.1f} calls/s sequential, "
+          f"{t['concurrent_calls_per_s']:.1f} calls/s at concurrency {t['concurrency']}")
+    m = result["memory"]
+    print(f"🧠 Memory: {m['growth_kb']:+.1f} KB over the run "
+          f"({m['growth_bytes_per_call']:+.0f} B/call), peak traced {m['peak_traced_kb']:.0f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Neo ring-to-greeting benchmark")
+    parser.add_argument("--calls", type=int, default=200, help="calls per phase")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--cascade-ms", type=float, default=0.0, help="simulated cost per cascade call")
+    parser.add_argument("--tts-first-chunk-ms", type=float, default=0.0,
+                        help="simulated synthesis time to the first audio chunk")
+    parser.add_argument("--playback-ms-per-char", type=float, default=0.0)
+    parser.add_argument("--real-tts", action="store_true", help="time real Piper first-chunk synthesis")
+    parser.add_argument("--fresh-detect", action="store_true",
+                        help="run the camera pipeline on every ring instead of the cached estimate")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait per wave")
+    parser.add_argument("--out", help="result file (default: benchmarks/results/ring_to_greeting_<time>.json)")
+    parser.add_argument("--compare", help="previous result file to compare against")
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+
+    result = run(args)
+    print_report(result, previous)
+
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"ring_to_greeting_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"💾 Results saved to {out}")
+
+
+if __name__ == "__main__":
+    main()
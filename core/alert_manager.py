@@ -1,13 +1,16 @@
 # core/alert_manager.py
 
-import time
 import json
 import os
-from collections import defaultdict
-from core import speech_io
+import time
+import threading
+from collections import OrderedDict, deque
+from core import speech_scheduler, event_log, metrics
 
-# Path to saved call count data
-ALERT_FILE = "data/alert_config.json"
+# Alert history (JSON Lines, see core/event_log.py), encrypted since it names callers
+ALERT_LOG_PATH = "data/alerts.jsonl"
+alert_log = event_log.EventLog(ALERT_LOG_PATH, encrypt=True)
+ALERT_FILE = "data/alert_config.json"   # plaintext history of older versions, see migrate_alert_file()
 
 # Numbers that Neo should alert about (like parents)
 ALERT_CONTACTS = ["+1111111111", "+2222222222"]  # Replace later with your real contacts
@@ -16,24 +19,117 @@ ALERT_CONTACTS = ["+1111111111", "+2222222222"]  # Replace later with your real
 CALL_THRESHOLD = 3   # e.g., 3 calls
 TIME_WINDOW = 180    # 3 minutes
 
+# Priority contacts escalate faster
+PRIORITY_CALL_THRESHOLD = 2
+PRIORITY_TIME_WINDOW = 300
+
+# Once a caller has triggered an alert, stay quiet about them for a while
+ALERT_COOLDOWN = 600   # 10 minutes
+
+# Forget callers that have been quiet for this long, and never track more than MAX_TRACKED
+IDLE_TTL = 3600
+MAX_TRACKED = 10000
+
+# Per-number overrides: {"+123": {"threshold": 2, "window": 60, "cooldown": 300}}
+CONTACT_RULES = {}
+
+# ---------------------------------------
+# Sliding-window call rate tracker
+# ---------------------------------------
+class CallRateTracker:
+    """
+    Thread-safe per-number call counter. Each number keeps at most
+    `threshold` timestamps in a deque, so recording a call is O(1) and
+    memory per caller is bounded. Numbers are kept in least-recently-seen
+    order and evicted once idle for `idle_ttl` or when more than
+    `max_tracked` are tracked, which keeps floods of distinct numbers in check.
+    """
+
+    def __init__(self, idle_ttl=IDLE_TTL, max_tracked=MAX_TRACKED):
+        self.idle_ttl = idle_ttl
+        self.max_tracked = max_tracked
+        self.entries = OrderedDict()   # number -> {"calls": deque, "last_seen": t, "last_alert": t}
+        self.lock = threading.Lock()
+
+    def rule_for(self, number):
+        """
+        Returns (threshold, window, cooldown) for a number.
+        """
+        if number in ALERT_CONTACTS:
+            rule = {"threshold": PRIORITY_CALL_THRESHOLD, "window": PRIORITY_TIME_WINDOW,
+                    "cooldown": ALERT_COOLDOWN}
+        else:
+            rule = {"threshold": CALL_THRESHOLD, "window": TIME_WINDOW, "cooldown": ALERT_COOLDOWN}
+        rule.update(CONTACT_RULES.get(number, {}))
+        return rule["threshold"], rule["window"], rule["cooldown"]
+
+    def record(self, number, t=None):
+        """
+        Records a call and returns True if it should raise an alert:
+        the threshold was reached within the window and the number is
+        not in its cooldown period.
+        """
+        t = time.time() if t is None else t
+        threshold, window, cooldown = self.rule_for(number)
+        with self.lock:
+            entry = self.entries.get(number)
+            if entry is None or entry["calls"].maxlen != threshold:
+                calls = deque(entry["calls"] if entry else (), maxlen=threshold)
+                entry = {"calls": calls, "last_seen": t,
+                         "last_alert": entry["last_alert"] if entry else None}
+                self.entries[number] = entry
+            self.entries.move_to_end(number)
+            entry["last_seen"] = t
+            calls = entry["calls"]
+            calls.append(t)
+
+            alert = (len(calls) >= threshold and t - calls[0] < window
+                     and (entry["last_alert"] is None or t - entry["last_alert"] >= cooldown))
+            if alert:
+                entry["last_alert"] = t
+            self._evict(t)
+            return alert
+
+    def count(self, number, t=None):
+        """
+        Returns how many of the tracked recent calls fall in the window.
+        """
+        t = time.time() if t is None else t
+        _, window, _ = self.rule_for(number)
+        with self.lock:
+            entry = self.entries.get(number)
+            if entry is None:
+                return 0
+            return sum(1 for x in entry["calls"] if t - x < window)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+    def _evict(self, t):
+        while self.entries:
+            number, oldest = next(iter(self.entries.items()))
+            if len(self.entries) <= self.max_tracked and t - oldest["last_seen"] < self.idle_ttl:
+                break
+            del self.entries[number]
+
+
 # Memory of recent calls
-recent_calls = defaultdict(list)
+tracker = CallRateTracker()
 
 # ---------------------------------------
 # Record incoming call attempt
 # ---------------------------------------
+@metrics.timed("record_call", "Call-rate bookkeeping per ring")
 def record_call(caller):
     """
     Records a new call attempt and checks for repeated calls.
+    Returns True if an alert was triggered.
     """
-    num = caller["number"]
-    t = time.time()
-    recent_calls[num].append(t)
-    # Keep only last few calls within time window
-    recent_calls[num] = [x for x in recent_calls[num] if (t - x) < TIME_WINDOW]
-
-    if len(recent_calls[num]) >= CALL_THRESHOLD:
+    if tracker.record(caller["number"]):
         trigger_alert(caller)
+        return True
+    return False
 
 # ---------------------------------------
 # Trigger alert if repeated calls detected
@@ -42,19 +138,52 @@ def trigger_alert(caller):
     """
     Activates alert mode when a number calls too frequently.
     """
+    metrics.count("alerts", help="Repeated-call alerts raised")
     print(f"⚠️ Alert: {caller['name']} is calling repeatedly!")
-    speech_io.speak(f"Alert. {caller['name']} has been calling repeatedly.")
+    speech_scheduler.say(f"Alert. {caller['name']} has been calling repeatedly.",
+                         speech_scheduler.PRIORITY_ALERT)
     save_alert(caller)
 
 # ---------------------------------------
 # Save alert info
 # ---------------------------------------
 def save_alert(caller):
-    os.makedirs("data", exist_ok=True)
-    data = {
-        "caller": caller,
-        "time": time.ctime(),
-        "type": "repeated_call"
-    }
-    with open(ALERT_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(data) + "\n")
+    alert_log.write("repeated_call", caller=caller)
+
+def read_alerts(since=None, until=None):
+    """
+    Yields saved alerts in the [since, until) epoch range.
+    """
+    return alert_log.read(since, until)
+
+# ---------------------------------------
+# Migration from data/alert_config.json
+# ---------------------------------------
+def migrate_alert_file(path=ALERT_FILE):
+    """
+    Imports the alert history older versions appended to `path` (one JSON
+    object per line, "time" as written by time.ctime()) into the encrypted
+    alert log, then deletes the file so no plaintext copy stays on disk.
+    Safe to run on every startup. Returns the number of alerts imported.
+    """
+    if not os.path.exists(path):
+        return 0
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+                ts = time.mktime(time.strptime(data["time"]))
+                events.append({"ts": ts, "type": data.get("type", "repeated_call"), "caller": data["caller"]})
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"⚠️ Skipping alert line in {path}: {e}")
+    imported = alert_log.import_events(events)
+    try:
+        os.remove(path)
+    except OSError as e:
+        print(f"⚠️ Could not remove imported alert file {path}: {e}")
+    if imported:
+        print(f"📦 Imported {imported} alert(s) from {path}")
+    return imported
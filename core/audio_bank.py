@@ -0,0 +1,183 @@
+# core/audio_bank.py
+# Pre-rendered speech for fixed phrases. Every line is synthesized once
+# into a single packed file of float32 samples (data/audio_bank.<n>.bin)
+# with a JSON index of text -> (offset, length). At runtime the file is
+# memory-mapped and speech_io plays slices of it directly, so fixed
+# phrases cost no synthesis at all. Rebuilding only renders new or changed
+# lines; everything else is copied over from the previous bank.
+#
+#   python -m core.audio_bank           # build from resources/responses.json
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+INDEX_FILE = "data/audio_bank.json"   # the bank file sits next to it
+FORMAT_VERSION = 1
+
+_lock = threading.Lock()
+_build_lock = threading.Lock()
+_bank = None      # (samples memmap, entries, model, sample_rate) or None
+
+# ---------------------------------------
+# Reading
+# ---------------------------------------
+def _entry_key(text, model):
+    return hashlib.sha1((model + "\0" + text).encode("utf-8")).hexdigest()
+
+def _bank_path(index_path, index):
+    return os.path.join(os.path.dirname(index_path), index["file"])
+
+def _read_index(index_path=INDEX_FILE):
+    """
+    Returns the index dict if its bank file is complete, otherwise None.
+    """
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        size = os.path.getsize(_bank_path(index_path, index))
+    except (OSError, ValueError, KeyError):
+        return None
+    if index.get("version") != FORMAT_VERSION or size != index.get("bytes"):
+        return None
+    return index
+
+def load(index_path=INDEX_FILE):
+    """
+    Memory-maps the bank. Returns the number of phrases available.
+    """
+    global _bank
+    if np is None:
+        return 0
+    index = _read_index(index_path)
+    if index is None or not index["entries"]:
+        with _lock:
+            _bank = None
+        return 0
+    samples = np.memmap(_bank_path(index_path, index), dtype=np.float32, mode="r")
+    with _lock:
+        _bank = (samples, index["entries"], index.get("model"), index.get("sample_rate"))
+    return len(index["entries"])
+
+def lookup(text, model=None, sample_rate=None):
+    """
+    Returns the pre-rendered samples for `text` as a read-only view into
+    the mapped file (no copy), or None. With `model` / `sample_rate`,
+    a bank rendered with another voice is ignored.
+    """
+    bank = _bank
+    if bank is None:
+        return None
+    samples, entries, bank_model, bank_rate = bank
+    if (model is not None and model != bank_model) or (sample_rate is not None and sample_rate != bank_rate):
+        return None
+    entry = entries.get(text)
+    if entry is None:
+        return None
+    return samples[entry["offset"]:entry["offset"] + entry["length"]]
+
+def size():
+    bank = _bank
+    return len(bank[1]) if bank else 0
+
+# ---------------------------------------
+# Building
+# ---------------------------------------
+def build(lines, synthesize=None, model=None, sample_rate=None, index_path=INDEX_FILE):
+    """
+    Writes a bank holding exactly `lines`. Lines already in the current
+    bank (same text, same voice) are copied; only the rest go through
+    `synthesize(text)` (default: speech_io's Piper). Returns
+    (rendered, reused) and maps the new bank.
+    """
+    if synthesize is None:
+        from core import speech_io
+        if speech_io.is_null_backend():
+            print("⚠️ Audio bank not built: no TTS backend.")
+            return 0, 0
+        synthesize = speech_io.render
+        model = model or speech_io.PIPER_MODEL_PATH
+        sample_rate = sample_rate or speech_io.tts_voice().config.sample_rate
+    model = model or ""
+
+    lines = list(dict.fromkeys(line for line in lines if line))
+    with _build_lock:
+        old = _read_index(index_path)
+        old_samples = None
+        old_by_key = {}
+        if old is not None and old.get("sample_rate") == sample_rate and old["entries"]:
+            old_samples = np.memmap(_bank_path(index_path, old), dtype=np.float32, mode="r")
+            old_by_key = {e["key"]: e for e in old["entries"].values()}
+
+        entries = {}
+        rendered = reused = 0
+        offset = 0
+        started = time.perf_counter()
+        # A new file per build: a mapped file cannot be replaced on Windows
+        folder = os.path.dirname(index_path) or "."
+        stem = os.path.splitext(os.path.basename(index_path))[0]
+        bank_name = f"{stem}.{time.time_ns()}.bin"
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, bank_name), "wb") as f:
+            for text in lines:
+                key = _entry_key(text, model)
+                previous = old_by_key.get(key)
+                if previous is not None:
+                    audio = old_samples[previous["offset"]:previous["offset"] + previous["length"]]
+                    reused += 1
+                else:
+                    audio = np.asarray(synthesize(text), dtype=np.float32).reshape(-1)
+                    rendered += 1
+                f.write(audio.tobytes())
+                entries[text] = {"key": key, "offset": offset, "length": len(audio)}
+                offset += len(audio)
+            f.flush()
+            os.fsync(f.fileno())
+
+        index = {"version": FORMAT_VERSION, "file": bank_name, "model": model,
+                 "sample_rate": sample_rate, "bytes": offset * 4, "entries": entries}
+        tmp_index = index_path + ".tmp"
+        with open(tmp_index, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp_index, index_path)
+        del old_samples
+
+    load(index_path)
+    _remove_old_banks(folder, stem, bank_name)
+    print(f"🎙 Audio bank: {rendered} rendered, {reused} reused, {offset * 4 / 1e6:.1f} MB "
+          f"in {time.perf_counter() - started:.1f}s")
+    return rendered, reused
+
+def _remove_old_banks(folder, stem, keep):
+    for name in os.listdir(folder):
+        if name.startswith(stem + ".") and name.endswith(".bin") and name != keep:
+            try:
+                os.remove(os.path.join(folder, name))
+            except OSError:
+                pass   # still mapped somewhere; removed after the next build
+
+def build_async(lines_func):
+    """
+    Rebuilds in a daemon thread; `lines_func()` supplies the lines.
+    """
+    def _build():
+        try:
+            build(lines_func())
+        except Exception as e:
+            print("Audio bank build error:", e)
+    t = threading.Thread(target=_build, daemon=True)
+    t.start()
+    return t
+
+
+if __name__ == "__main__":
+    from core import response_catalog
+    response_catalog.ensure_file()
+    build(response_catalog.all_lines())
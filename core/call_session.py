@@ -0,0 +1,256 @@
+# core/call_session.py
+# One CallSession per ringing call, owning everything about that call
+# (caller, detected condition, transcript, timestamps, outcome), and a
+# SessionManager that keeps overlapping calls apart. Neo has one microphone
+# and one speaker, so only MAX_ACTIVE_CALLS sessions hold "the line" at a
+# time; others hold for it, and calls beyond MAX_SESSIONS are declined
+# straight away with a short canned response.
+
+import itertools
+import threading
+import time
+from collections import Counter
+from core import speech_scheduler, message_store, metrics
+
+MAX_ACTIVE_CALLS = 1     # conversations at once (one microphone, one speaker)
+MAX_SESSIONS = 4         # live sessions, including those holding for the line
+HOLD_TIMEOUT = 30        # seconds a call may hold before it is declined
+
+DECLINE_MESSAGE = "Sorry, Sir’s assistant is on another call. Please call back in a few minutes."
+
+# Session states
+RINGING = "ringing"
+HOLDING = "holding"
+ON_LINE = "on_line"
+CLOSED = "closed"
+
+# Outcomes
+MESSAGE = "message"          # the caller left a message
+ANSWERED = "answered"        # Sir picked up himself
+USER_ACTIVE = "user_active"  # Sir was around, Neo stayed silent
+DECLINED = "declined"        # too many calls, or held too long
+HUNG_UP = "hung_up"          # the caller hung up before leaving a message
+FAILED = "failed"            # an error ended the call
+
+# Session events, see SessionManager.add_listener() (plus CLOSED above)
+OPENED = "opened"
+HANDLING = "handling"
+
+_ids = itertools.count(1)
+
+# ---------------------------------------
+# Call session
+# ---------------------------------------
+class CallSession:
+    """
+    State of a single call from the first ring to hang-up.
+    """
+
+    def __init__(self, caller):
+        self.id = next(_ids)
+        self.caller = caller
+        self.condition = None
+        self.transcript = []      # (time, "neo" | "caller", text)
+        self.state = RINGING
+        self.outcome = None
+        self.message_id = None
+        self.answered = False     # set when Sir picks up
+        self.hung_up = threading.Event()   # set when the caller hangs up
+        self.started = time.time()
+        self.line_at = None       # when the session got the line
+        self.ended = None
+
+    @property
+    def number(self):
+        return self.caller.get("number")
+
+    def note(self, speaker, text):
+        self.transcript.append((time.time(), speaker, text))
+
+    def duration(self):
+        return (self.ended or time.time()) - self.started
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "caller": self.caller,
+            "condition": self.condition,
+            "state": self.state,
+            "outcome": self.outcome,
+            "message_id": self.message_id,
+            "started": self.started,
+            "duration": self.duration(),
+            "transcript": [{"time": t, "speaker": s, "text": x} for t, s, x in self.transcript],
+        }
+
+
+# ---------------------------------------
+# Session manager
+# ---------------------------------------
+class SessionManager:
+    """
+    Tracks live sessions (one per caller number), hands out the line and
+    keeps running totals for stats().
+    """
+
+    def __init__(self, max_active=MAX_ACTIVE_CALLS, max_sessions=MAX_SESSIONS, hold_timeout=HOLD_TIMEOUT):
+        self.max_active = max_active
+        self.max_sessions = max_sessions
+        self.hold_timeout = hold_timeout
+        self.sessions = {}      # number -> live CallSession
+        self.on_line = set()    # ids of sessions holding the line
+        self.cond = threading.Condition()
+        self.outcomes = Counter()
+        self.total = 0
+        self.listeners = []
+
+    def open(self, caller):
+        """
+        Starts a session for a ringing call. Returns None if this caller
+        already has a live session. Past MAX_SESSIONS the session comes back
+        with `overflow` set and should be passed to decline().
+        """
+        with self.cond:
+            if caller["number"] in self.sessions:
+                return None
+            session = CallSession(caller)
+            session.overflow = len(self.sessions) >= self.max_sessions
+            if not session.overflow:
+                self.sessions[caller["number"]] = session
+            self.total += 1
+        self._notify(OPENED, session)
+        return session
+
+    def get(self, number):
+        with self.cond:
+            return self.sessions.get(number)
+
+    def handling(self, session):
+        """
+        Called by the thread that takes the session up, before anything else.
+        """
+        self._notify(HANDLING, session)
+
+    # ---------- listeners ----------
+    def add_listener(self, callback):
+        """
+        Registers callback(event, session), run when a session is OPENED (on
+        the thread dispatching call events), when its handler thread takes
+        it up (HANDLING) and when it is CLOSED.
+        """
+        self.listeners.append(callback)
+
+    def _notify(self, event, session):
+        for callback in list(self.listeners):
+            try:
+                callback(event, session)
+            except Exception as e:
+                print("Session listener error:", e)
+
+    def hang_up(self, number):
+        """
+        Records that the caller hung up: a session holding for the line
+        gives up, and one on the line ends its conversation.
+        """
+        with self.cond:
+            session = self.sessions.get(number)
+            if session is not None:
+                session.hung_up.set()
+                self.cond.notify_all()
+
+    def mark_answered(self, number):
+        """
+        Records that Sir picked up; a session still holding gives up its turn.
+        """
+        with self.cond:
+            session = self.sessions.get(number)
+            if session is not None:
+                session.answered = True
+                self.cond.notify_all()
+
+    # ---------- the line ----------
+    def wait_for_line(self, session, timeout=None):
+        """
+        Blocks until the session may talk. Returns False if it held for
+        longer than `timeout` (default: hold_timeout), Sir answered or the
+        caller hung up.
+        """
+        timeout = self.hold_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            session.state = HOLDING
+            while (len(self.on_line) >= self.max_active and not session.answered
+                   and not session.hung_up.is_set()):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.cond.wait(remaining)
+            if session.answered or session.hung_up.is_set():
+                return False
+            self.on_line.add(session.id)
+            session.state = ON_LINE
+            session.line_at = time.time()
+            return True
+
+    def line_busy(self):
+        with self.cond:
+            return bool(self.on_line)
+
+    def wait_line_free(self, timeout=None):
+        """
+        Blocks until no session holds the line. Returns False on timeout.
+        """
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.on_line, timeout)
+
+    def release_line(self, session):
+        with self.cond:
+            self.on_line.discard(session.id)
+            self.cond.notify_all()
+
+    # ---------- ending ----------
+    def decline(self, session):
+        """
+        Turns a call away with the canned response and records it as a
+        missed call, so it still shows up in Sir's report.
+        """
+        session.note("neo", DECLINE_MESSAGE)
+        speech_scheduler.say(DECLINE_MESSAGE, speech_scheduler.PRIORITY_CALLER)
+        try:
+            session.message_id = message_store.add_message(session.caller, "")
+        except Exception as e:
+            print("Could not record declined call:", e)
+        print(f"📵 Declined call from {session.caller.get('name', 'unknown')} (line busy)")
+        self.close(session, DECLINED)
+
+    def close(self, session, outcome):
+        with self.cond:
+            if session.state == CLOSED:
+                return
+            session.state = CLOSED
+            session.outcome = outcome
+            session.ended = time.time()
+            if self.sessions.get(session.number) is session:
+                del self.sessions[session.number]
+            self.on_line.discard(session.id)
+            self.outcomes[outcome] += 1
+            self.cond.notify_all()
+        self._notify(CLOSED, session)
+        metrics.count(f"calls_{outcome}", help=f"Calls that ended as '{outcome}'")
+
+    # ---------- stats ----------
+    def stats(self):
+        """
+        Returns live counts plus one summary per session in progress.
+        """
+        with self.cond:
+            live = list(self.sessions.values())
+            return {
+                "live": len(live),
+                "on_line": sum(1 for s in live if s.state == ON_LINE),
+                "holding": sum(1 for s in live if s.state == HOLDING),
+                "total": self.total,
+                "outcomes": dict(self.outcomes),
+                "sessions": [{"id": s.id, "caller": s.caller.get("name"), "state": s.state,
+                              "condition": s.condition, "duration": s.duration()} for s in live],
+            }
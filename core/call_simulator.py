@@ -1,5 +1,6 @@
 # core/call_simulator.py
 import time
+import queue
 import random
 import threading
 
@@ -19,6 +20,59 @@ user_picked = False
 incoming = False
 call_thread = None
 
+# Guards current_call / user_picked / incoming
+_state_lock = threading.Lock()
+
+# Own random generator so runs can be reproduced with seed()
+_rng = random.Random()
+
+def seed(value):
+    """
+    Seeds the simulator's random generator for reproducible runs.
+    """
+    _rng.seed(value)
+
+# -------------------------------------------------
+# Call events
+# -------------------------------------------------
+# Every state change is published as a dict:
+#   {"type": "ringing" | "answered" | "missed" | "hung_up", "caller": {...}, "time": epoch}
+# "missed" means Sir did not pick up (Neo takes over); "hung_up" ends the call.
+RINGING = "ringing"
+ANSWERED = "answered"
+MISSED = "missed"
+HUNG_UP = "hung_up"
+
+CALL_LENGTH = (20, 90)   # seconds a simulated caller stays on after a missed call
+
+_subscribers = []
+_subscribers_lock = threading.Lock()
+
+def subscribe():
+    """
+    Returns a queue that receives every call event published from now on.
+    """
+    q = queue.Queue()
+    with _subscribers_lock:
+        _subscribers.append(q)
+    return q
+
+def unsubscribe(q):
+    with _subscribers_lock:
+        if q in _subscribers:
+            _subscribers.remove(q)
+
+def publish(event_type, caller, when=None):
+    """
+    Sends a call event to every subscriber. `when` overrides the event
+    time (used by the load simulator's virtual clock).
+    """
+    event = {"type": event_type, "caller": caller, "time": time.time() if when is None else when}
+    with _subscribers_lock:
+        subscribers = list(_subscribers)
+    for q in subscribers:
+        q.put(event)
+
 # -------------------------------------------------
 # Simulate incoming call every random seconds
 # -------------------------------------------------
@@ -27,27 +81,37 @@ def simulate_incoming_calls():
     Randomly triggers incoming calls every 15–60 seconds.
     This runs in the background and updates the global state.
     """
-    global incoming, current_call, call_thread
+    global call_thread
     def _simulate():
         global incoming, current_call, user_picked
         while True:
-            wait_time = random.randint(15, 60)
+            wait_time = _rng.randint(15, 60)
             time.sleep(wait_time)
-            current_call = random.choice(CALLERS)
-            incoming = True
-            user_picked = False
-            print(f"\n📞 Incoming call from {current_call['name']} ({current_call['number']})")
+            with _state_lock:
+                current_call = _rng.choice(CALLERS)
+                incoming = True
+                user_picked = False
+                caller = current_call
+            print(f"\n📞 Incoming call from {caller['name']} ({caller['number']})")
+            publish(RINGING, caller)
 
             # Simulate ringing for 10 seconds
             ring_time = 0
-            while ring_time < 10 and not user_picked:
+            while ring_time < 10 and not user_answered():
                 time.sleep(1)
                 ring_time += 1
 
             # If user didn't answer in 10 seconds, consider missed
-            if not user_picked:
+            with _state_lock:
+                missed = not user_picked
+                incoming = False
+            if missed:
                 print("❌ User did not answer the call.")
-            incoming = False
+                publish(MISSED, caller)
+                # The caller hangs up on their own a while later
+                timer = threading.Timer(_rng.randint(*CALL_LENGTH), hang_up, (caller,))
+                timer.daemon = True
+                timer.start()
 
     call_thread = threading.Thread(target=_simulate, daemon=True)
     call_thread.start()
@@ -56,27 +120,48 @@ def simulate_incoming_calls():
 # Check if there is an active incoming call
 # -------------------------------------------------
 def check_incoming_call():
-    return incoming
+    with _state_lock:
+        return incoming
 
 # -------------------------------------------------
 # Get current caller info
 # -------------------------------------------------
 def get_current_caller():
-    return current_call if current_call else None
+    with _state_lock:
+        return dict(current_call) if current_call else None
 
 # -------------------------------------------------
 # Simulate user answering manually
 # -------------------------------------------------
 def user_answered():
-    return user_picked
+    with _state_lock:
+        return user_picked
+
+def answer_call():
+    """
+    Marks the ringing call as picked up by the user.
+    """
+    global user_picked
+    with _state_lock:
+        if not incoming or user_picked:
+            return
+        user_picked = True
+        caller = current_call
+    publish(ANSWERED, caller)
+
+def hang_up(caller):
+    """
+    Publishes that `caller` hung up.
+    """
+    print(f"📴 {caller['name']} hung up.")
+    publish(HUNG_UP, caller)
 
 # -------------------------------------------------
 # For manual testing
 # -------------------------------------------------
 if __name__ == "__main__":
+    events = subscribe()
     simulate_incoming_calls()
     while True:
-        if check_incoming_call():
-            caller = get_current_caller()
-            print(f"Detected call from {caller['name']}")
-        time.sleep(2)
+        event = events.get()
+        print(f"Call event: {event['type']} from {event['caller']['name']}")
@@ -1,103 +1,445 @@
 # core/condition_detector.py
-import cv2
 import time
 import numpy as np
 import random
-import psutil
 import os
+import sys
+import threading
+from collections import deque
+from core import metrics, engine_host
+
+# ---------------------------------------
+# Sampler settings
+# ---------------------------------------
+SAMPLE_INTERVAL = 2.0      # seconds between background samples
+LOW_POWER_SAMPLE_INTERVAL = 10.0   # used while the battery is low
+ESTIMATE_MAX_AGE = 10.0    # older estimates trigger a fresh check in detect()
+HISTORY_SIZE = 30          # timestamped estimates kept in memory
+CPU_ACTIVE_THRESHOLD = 15  # percent
+
+# ---------------------------------------
+# Frame processing settings
+# ---------------------------------------
+FRAMES_PER_SAMPLE = 4      # frames grabbed and classified per sample
+FRAME_WIDTH = 320          # frames are downscaled to at most this width
+MOTION_THRESHOLD = 2.0     # mean abs pixel change below which a frame reuses the previous label
+DARK_THRESHOLD = 20        # mean brightness below which the camera counts as covered
+ROI_MARGIN = 0.5           # face search area around the last face, as a fraction of its size
+
+# ---------------------------------------
+# Voting settings
+# ---------------------------------------
+VOTE_WINDOW = 5            # samples used for voting (one vote per batch of frames)
+ENTER_SHARE = 0.6          # vote share a new state needs to take over
+STAY_SHARE = 0.4           # current state is kept while its share stays above this
+
+LABELS = ("away", "sleeping", "busy")
+AWAY, SLEEPING, BUSY = range(3)
+
+_history = deque(maxlen=HISTORY_SIZE)   # (timestamp, condition, confidence)
+_history_lock = threading.Lock()
+_sample_lock = threading.Lock()
+_sampler_thread = None
+_sampler_stop = threading.Event()
+_sample_interval = SAMPLE_INTERVAL
+
+# OpenCV and psutil are imported on first use, so importing this module stays cheap
+cv2 = None
+psutil = None
+
+# Warm camera and classifiers, opened once and reused
+_cam = None
+_face_cascade = None
+_eye_cascade = None
+
+
+class FaceTrack:
+    """
+    Last face box in downscaled coordinates, used to narrow the next
+    search. The sampler keeps one; other callers (benchmark) use their own.
+    """
+
+    def __init__(self):
+        self.face = None
+
+
+_face_track = FaceTrack()
+
+
+# ---------------------------------------
+# Sliding-window condition state machine
+# ---------------------------------------
+class ConditionTracker:
+    """
+    Smooths per-frame labels into a stable condition. Keeps the last
+    `window` labels in a ring, and only switches state when another label
+    holds at least `enter` of the votes while the current one has dropped
+    below `stay`. A single blink or missed face does not flip the result.
+    """
+
+    def __init__(self, window=VOTE_WINDOW, enter=ENTER_SHARE, stay=STAY_SHARE):
+        self.votes = np.full(window, -1, dtype=np.int8)   # -1 = empty slot
+        self.pos = 0
+        self.enter = enter
+        self.stay = stay
+        self.state = "unknown"
+        self.confidence = 0.0
+
+    def update(self, labels):
+        """
+        Adds a batch of label indices and returns (state, confidence).
+        """
+        labels = np.asarray(labels, dtype=np.int8)[-len(self.votes):]
+        idx = (self.pos + np.arange(len(labels))) % len(self.votes)
+        self.votes[idx] = labels
+        self.pos = (self.pos + len(labels)) % len(self.votes)
+
+        filled = self.votes[self.votes >= 0]
+        if len(filled) == 0:
+            return self.state, self.confidence
+        shares = np.bincount(filled, minlength=len(LABELS)) / len(filled)
+        best = int(np.argmax(shares))
+
+        if self.state not in LABELS:
+            if shares[best] >= self.enter:
+                self.state = LABELS[best]
+        else:
+            current = LABELS.index(self.state)
+            if best != current and shares[best] >= self.enter and shares[current] < self.stay:
+                self.state = LABELS[best]
+
+        self.confidence = float(shares[LABELS.index(self.state)]) if self.state in LABELS else 0.0
+        return self.state, self.confidence
+
+    def reset(self):
+        self.votes[:] = -1
+        self.pos = 0
+        self.state = "unknown"
+        self.confidence = 0.0
+
+
+_tracker = ConditionTracker()
+
 
 # ---------------------------------------
 # Detect motion, face, and phone usage
 # ---------------------------------------
 
-def detect():
+@metrics.timed("condition_detect", "Time to answer detect()")
+def detect(max_age=None):
     """
-    Uses camera, motion, and activity data to guess user's condition.
-    Returns one of: sleeping, using_phone, busy, away, unknown
+    Returns the user's condition: sleeping, using_phone, busy, away, unknown.
+    Served from the background sampler's latest estimate when it is at most
+    `max_age` seconds (default ESTIMATE_MAX_AGE) old, otherwise a fresh
+    sample is taken.
     """
+    max_age = ESTIMATE_MAX_AGE if max_age is None else max_age
+    estimate = latest()
+    if estimate and time.time() - estimate[0] <= max_age:
+        return estimate[1]
     print("🧠 Checking user condition...")
-    condition = "unknown"
-
-    # Try webcam
-    cam_available, face_found, eyes_closed = analyze_webcam()
-    if cam_available:
-        if not face_found:
-            condition = "away"
-        elif eyes_closed:
-            condition = "sleeping"
+    return sample()
+
+
+@metrics.timed("condition_sample", "Time to grab and classify one batch of frames")
+def sample():
+    """
+    Grabs a short batch of frames, feeds their labels to the tracker,
+    records the smoothed condition in the rolling history and returns it.
+    """
+    with _sample_lock:
+        frames = _grab_frames(FRAMES_PER_SAMPLE)
+        if frames is None:
+            # No camera: nothing to vote on
+            _tracker.reset()
+            condition, confidence = "unknown", 0.0
         else:
-            condition = "busy"  # face visible but eyes open → awake
-    else:
-        condition = "unknown"
+            try:
+                labels = classify_batch(prepare_batch(frames))
+            except engine_host.EngineError as e:
+                print("Vision engine error:", e)   # the worker is being restarted
+                labels = None
+            if labels is None:
+                _tracker.reset()   # camera covered or dark
+                condition, confidence = "unknown", 0.0
+            else:
+                # Frames of one batch are a fraction of a second apart: one vote
+                condition, confidence = _tracker.update([batch_vote(labels)])
 
-    # Check device activity (keyboard/mouse or high CPU)
-    if is_device_active():
-        condition = "using_phone"
+        # Check device activity (keyboard/mouse or high CPU)
+        if is_device_active():
+            condition = "using_phone"
 
-    print(f"Detected condition: {condition}")
-    return condition
+        with _history_lock:
+            _history.append((time.time(), condition, confidence))
+        return condition
+
+
+def latest():
+    """
+    Returns the most recent (timestamp, condition, confidence) estimate, or None.
+    """
+    with _history_lock:
+        return _history[-1] if _history else None
+
+
+def history():
+    """
+    Returns a copy of the rolling (timestamp, condition, confidence) history,
+    oldest first.
+    """
+    with _history_lock:
+        return list(_history)
 
 
 # ---------------------------------------
-# Webcam-based analysis
+# Background sampler
 # ---------------------------------------
-def analyze_webcam():
+def start_sampler(interval=SAMPLE_INTERVAL):
     """
-    Tries to detect face and eyes using Haar cascades (OpenCV built-in).
-    Returns (camera_ok, face_found, eyes_closed)
+    Starts a background thread that keeps the camera warm and refreshes
+    the condition estimate every `interval` seconds.
     """
+    global _sampler_thread, _sample_interval
+    _sample_interval = interval
+    if _sampler_thread is not None and _sampler_thread.is_alive():
+        return
+    _sampler_stop.clear()
     try:
-        cam = cv2.VideoCapture(0)
-        if not cam.isOpened():
-            return (False, False, False)
+        _import_psutil()
+    except ImportError as e:
+        print("⚠️ psutil unavailable, device activity is not checked:", e)
+    _sampler_thread = threading.Thread(target=_sampler_loop, daemon=True)
+    _sampler_thread.start()
 
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
 
-        ret, frame = cam.read()
-        cam.release()
+def stop_sampler():
+    _sampler_stop.set()
+    release_camera()
 
-        if not ret:
-            return (True, False, False)
 
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+def set_sample_interval(interval):
+    """
+    Changes how often the background sampler runs (takes effect next cycle).
+    """
+    global _sample_interval
+    _sample_interval = interval
 
-        if len(faces) == 0:
-            return (True, False, False)
 
-        # Check eyes in the first detected face
-        (x, y, w, h) = faces[0]
-        roi_gray = gray[y:y + h, x:x + w]
-        eyes = eye_cascade.detectMultiScale(roi_gray)
+def _sampler_loop():
+    while not _sampler_stop.is_set():
+        try:
+            sample()
+        except Exception as e:
+            print("Condition sampler error:", e)
+        _sampler_stop.wait(_sample_interval)
 
-        if len(eyes) == 0:
-            return (True, True, True)   # face found, eyes closed
-        else:
-            return (True, True, False)  # face found, eyes open
 
+# ---------------------------------------
+# Camera and classifiers
+# ---------------------------------------
+def _import_cv2():
+    global cv2
+    if cv2 is None:
+        import cv2 as _cv2
+        cv2 = _cv2
+    return cv2
+
+
+def _load_cascades():
+    global _face_cascade, _eye_cascade
+    if _face_cascade is None and engine_host.enabled():
+        # Detection runs in the vision worker; frames go over shared memory
+        _face_cascade = engine_host.Cascade('haarcascade_frontalface_default.xml')
+        _eye_cascade = engine_host.Cascade('haarcascade_eye.xml')
+    if _face_cascade is None:
+        _import_cv2()
+        _face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        _eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
+    return _face_cascade, _eye_cascade
+
+
+def _get_camera():
+    global _cam
+    if _cam is None or not _cam.isOpened():
+        _import_cv2()
+        _cam = cv2.VideoCapture(0)
+    return _cam
+
+
+def set_camera(camera, face_cascade=None, eye_cascade=None):
+    """
+    Installs a camera object (anything with isOpened/read/release) and,
+    optionally, face/eye classifiers with a detectMultiScale method.
+    Used to run the detector against recorded or synthetic frames.
+    """
+    global _cam, _face_cascade, _eye_cascade
+    with _sample_lock:
+        _cam = camera
+        _face_track.face = None
+        if face_cascade is not None:
+            _face_cascade = face_cascade
+        if eye_cascade is not None:
+            _eye_cascade = eye_cascade
+
+
+def release_camera():
+    global _cam
+    with _sample_lock:
+        if _cam is not None:
+            _cam.release()
+            _cam = None
+
+
+def _grab_frames(count):
+    """
+    Reads `count` frames from the warm camera. Returns a list of BGR
+    frames, or None if the camera is unavailable.
+    """
+    try:
+        cam = _get_camera()
+        if not cam.isOpened():
+            return None
+        frames = []
+        for _ in range(count):
+            ret, frame = cam.read()
+            if ret:
+                frames.append(frame)
+        return frames or None
     except Exception as e:
         print(f"Webcam check failed: {e}")
-        return (False, False, False)
+        return None
+
+
+# ---------------------------------------
+# Batch frame processing
+# ---------------------------------------
+def prepare_batch(frames):
+    """
+    Stacks BGR frames into one array, downscales them by integer striding
+    to at most FRAME_WIDTH and converts to grayscale in a single
+    vectorized step. Returns a uint8 array of shape (n, h, w).
+    """
+    batch = np.stack(frames)
+    step = max(1, int(np.ceil(batch.shape[2] / FRAME_WIDTH)))
+    small = batch[:, ::step, ::step]
+    gray = small @ np.array([0.114, 0.587, 0.299], dtype=np.float32)   # BGR weights
+    return gray.astype(np.uint8)
+
+
+def classify_batch(gray, track=None):
+    """
+    Labels each grayscale frame as AWAY, SLEEPING or BUSY. Frames that
+    barely differ from the previous one reuse its label instead of running
+    the cascades again. `track` (default: the sampler's) remembers the last
+    face between calls. Returns None if the camera looks covered.
+    """
+    track = _face_track if track is None else track
+    brightness = gray.mean(axis=(1, 2))
+    if np.all(brightness < DARK_THRESHOLD):
+        return None
+
+    # Mean absolute change from the previous frame, for the whole batch at once
+    motion = np.empty(len(gray), dtype=np.float32)
+    motion[0] = np.inf
+    if len(gray) > 1:
+        diffs = np.abs(np.diff(gray.astype(np.int16), axis=0))
+        motion[1:] = diffs.mean(axis=(1, 2))
+
+    labels = np.empty(len(gray), dtype=np.int8)
+    for i, frame in enumerate(gray):
+        if motion[i] < MOTION_THRESHOLD:
+            labels[i] = labels[i - 1]
+            continue
+        face = _find_face(frame, track.face)
+        track.face = face
+        if face is None:
+            labels[i] = AWAY
+        else:
+            labels[i] = BUSY if _eyes_open(frame, face) else SLEEPING
+    return labels
+
+
+def batch_vote(labels):
+    """
+    Returns the most common label of a batch (ties go to the latest frame).
+    """
+    counts = np.bincount(labels, minlength=len(LABELS))
+    best = counts.max()
+    return next(int(label) for label in labels[::-1] if counts[label] == best)
+
+
+def _find_face(gray, last_face=None):
+    face_cascade, _ = _load_cascades()
+    h, w = gray.shape
+
+    # Search around the last known face first
+    if last_face is not None:
+        x, y, fw, fh = last_face
+        mx, my = int(fw * ROI_MARGIN), int(fh * ROI_MARGIN)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(w, x + fw + mx), min(h, y + fh + my)
+        faces = face_cascade.detectMultiScale(gray[y0:y1, x0:x1], 1.3, 5)
+        if len(faces):
+            fx, fy, fw, fh = faces[0]
+            return (x0 + fx, y0 + fy, fw, fh)
+
+    faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+    return tuple(faces[0]) if len(faces) else None
+
+
+def _eyes_open(gray, face):
+    _, eye_cascade = _load_cascades()
+    x, y, w, h = face
+    # Eyes sit in the upper half of the face
+    eyes = eye_cascade.detectMultiScale(gray[y:y + h // 2, x:x + w])
+    return len(eyes) > 0
+
+
+@metrics.timed("analyze_webcam", "Single-frame webcam check")
+def analyze_webcam():
+    """
+    Single-frame check using Haar cascades (OpenCV built-in).
+    The camera and classifiers stay loaded between calls.
+    Returns (camera_ok, face_found, eyes_closed)
+    """
+    with _sample_lock:
+        frames = _grab_frames(1)
+        if frames is None:
+            return (False, False, False)
+        labels = classify_batch(prepare_batch(frames))
+    if labels is None or labels[0] == AWAY:
+        return (True, False, False)
+    return (True, True, labels[0] == SLEEPING)
 
 
 # ---------------------------------------
 # Detect phone / device activity
 # ---------------------------------------
+@metrics.timed("cpu_probe", "Device activity probe")
 def is_device_active():
     """
     Checks if user is actively using device (based on CPU or running apps).
-    Works on Windows/Linux.
+    Works on Windows/Linux. Non-blocking: measures CPU use since the last call.
     """
     try:
-        usage = psutil.cpu_percent(interval=1)
-        if usage > 15:  # actively using
+        usage = _import_psutil().cpu_percent(interval=None)
+        if usage > CPU_ACTIVE_THRESHOLD:  # actively using
             return True
-    except:
+    except Exception:
         pass
     return False
 
 
+def _import_psutil():
+    global psutil
+    if psutil is None:
+        import psutil as _psutil
+        _psutil.cpu_percent(interval=None)   # primes the counter: the next call has a baseline
+        psutil = _psutil
+    return psutil
+
+
 # ---------------------------------------
 # Randomized fallback when unsure
 # ---------------------------------------
@@ -113,9 +455,59 @@ def fallback_condition():
     return random.choice(fallback_conditions)
 
 
+# ---------------------------------------
+# Benchmark
+# ---------------------------------------
+def benchmark(frame_count=200, use_camera=True):
+    """
+    Runs the frame pipeline (downscale, classify, vote) over `frame_count`
+    frames and reports throughput and CPU cost. Uses synthetic frames
+    when `use_camera` is False or no camera is available. Runs alongside
+    the sampler: camera reads take the sample lock, and the face track and
+    vote tracker are the benchmark's own.
+    """
+    frames = None
+    if use_camera:
+        with _sample_lock:
+            frames = _grab_frames(FRAMES_PER_SAMPLE)
+    if frames is None:
+        use_camera = False
+        rng = np.random.default_rng(0)
+        frames = list(rng.integers(0, 255, size=(FRAMES_PER_SAMPLE, 480, 640, 3), dtype=np.uint8))
+
+    tracker = ConditionTracker()
+    track = FaceTrack()
+    batches = max(1, frame_count // len(frames))
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for _ in range(batches):
+        if use_camera:
+            with _sample_lock:
+                frames = _grab_frames(FRAMES_PER_SAMPLE) or frames
+        labels = classify_batch(prepare_batch(frames), track)
+        if labels is not None:
+            tracker.update([batch_vote(labels)])
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    processed = batches * len(frames)
+    return {
+        "frames": processed,
+        "frames_per_second": processed / wall if wall else 0.0,
+        "cpu_percent": 100.0 * cpu / wall if wall else 0.0,
+        "ms_per_frame": 1000.0 * wall / processed,
+    }
+
+
 # ---------------------------------------
 # Manual test
 # ---------------------------------------
 if __name__ == "__main__":
-    cond = detect()
-    print("Condition result:", cond)
+    if "--bench" in sys.argv:
+        result = benchmark(use_camera="--synthetic" not in sys.argv)
+        print(f"Frames: {result['frames']}  "
+              f"{result['frames_per_second']:.1f} frames/s  "
+              f"{result['ms_per_frame']:.2f} ms/frame  "
+              f"CPU {result['cpu_percent']:.0f}% of one core")
+    else:
+        cond = detect()
+        print("Condition result:", cond)
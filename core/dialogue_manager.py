@@ -1,104 +1,117 @@
 # core/dialogue_manager.py
 
-import os
-import json
-import random
-import datetime
-from core import speech_io, learner
+import time
+from core import response_catalog, speech_io, speech_scheduler, learner, message_store, metrics, review_queue, voicemail, message_index
 
 # ----------------------------
-# Predefined responses
+# Responses
 # ----------------------------
-PREDEFINED_RESPONSES = {
-    "sleeping": [
-        "Sir is sleeping right now. Can I take a message?",
-        "Sir is resting. Please leave your message.",
-        "Sir is currently asleep. Would you like to leave a message?",
-    ],
-    "away": [
-        "Sir is away at the moment. Leave a message?",
-        "Sir is not available currently. Can I record your message?",
-        "Sir is out. Please tell me your message.",
-        "Sir is busy. Do you want to leave a message?",
-        "Sir is not here. I can take a message.",
-        "Sir is currently occupied. Please leave a message.",
-        "Sir is away for now. Can I record your message?",
-        "Sir is not available. Would you like to leave a note?",
-        "Sir is not around. I can take your message.",
-        "Sir is away at the moment. Leave your message please.",
-        # add more if needed up to 20
-    ],
-    "unknown": [
-        "Hello! I will take a message for you.",
-        "Hi! I can record your message for Sir.",
-        "Hello! Please tell me your message.",
-    ]
-}
+# What Neo says comes from resources/responses.json (core/response_catalog.py)
+
+# Saying one of these (as a whole word) ends the caller's message
+END_WORDS = ("end", "finished", "complete")
+
+# A message also ends after this much silence, or at this length
+SILENCE_TIMEOUT = 10      # seconds
+MAX_MESSAGE_SECONDS = 120
+
+# ----------------------------
+# Speak to the caller
+# ----------------------------
+def say(text):
+    return speech_scheduler.say(text, speech_scheduler.PRIORITY_CALLER)
 
 # ----------------------------
 # Save caller message
 # ----------------------------
-def save_message(caller, message_text):
-    os.makedirs("data/messages", exist_ok=True)
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    caller_name = caller.get("name", "unknown")
-    filename = f"data/messages/{caller_name}_{timestamp}.json"
-    message = {
-        "caller": caller,
-        "message": message_text,
-        "time": timestamp
-    }
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(message, f, indent=4)
-    print(f"💾 Message saved: {filename}")
+@metrics.timed("save_message", "Writing a caller message to the store")
+def save_message(caller, message_text, audio_path=None):
+    message_id = message_store.add_message(caller, message_text, audio_path=audio_path)
+    print(f"💾 Message saved: #{message_id} from {caller.get('name', 'unknown')}")
+    try:
+        message_index.sync()
+    except Exception as e:
+        print("Message index error (caught up on the next search):", e)
+    return message_id
 
 # ----------------------------
 # Ask user feedback
 # ----------------------------
-def ask_user_feedback():
-    print("🧠 Did Neo respond correctly? (type correct response or leave blank to skip)")
-    feedback = input("Feedback: ").strip()
-    return feedback if feedback else None
+def ask_user_feedback(caller, user_condition, message_text):
+    """
+    Queues "did Neo respond correctly?" for Sir to answer later (see
+    core/review_queue.py) and returns the review id. Never blocks the call.
+    """
+    caller_id = caller.get("id", "unknown")
+    prompt = (f"{caller.get('name', 'Someone')} called while you were {user_condition}"
+              f" and said: {message_text or 'nothing'}. How should Neo have answered?")
+    return review_queue.submit("feedback", prompt,
+                               {"caller_id": caller_id, "condition": user_condition})
+
+def _apply_feedback(answer, context):
+    learner.learn_response(context["caller_id"], context["condition"], answer)
+
+review_queue.register("feedback", _apply_feedback)
 
 # ----------------------------
 # Handle single incoming call
 # ----------------------------
-def handle_incoming_call(caller, user_condition):
+def handle_incoming_call(caller, user_condition, session=None):
     """
-    Handles the entire interaction with one caller.
+    Handles the entire interaction with one caller. With a CallSession
+    (core/call_session.py), everything said is added to its transcript and
+    the message ends early if the caller hangs up. Returns the id of the
+    saved message.
     """
     caller_id = caller.get("id", "unknown")
 
-    # Speak user condition once
-    condition_message = random.choice(PREDEFINED_RESPONSES.get(user_condition, PREDEFINED_RESPONSES["unknown"]))
-    speech_io.speak(f"Detected that Sir is {user_condition}. {condition_message}")
+    def _say(text):
+        if session is not None:
+            session.note("neo", text)
+        return say(text)
+
+    # Speak user condition once (two fixed lines, both pre-rendered in the audio bank)
+    _say(response_catalog.prompt("detected", condition=user_condition))
+    _say(response_catalog.pick(user_condition))
 
     # Try learned response first
     learned_response = learner.get_learned_response(caller_id, user_condition)
     if learned_response:
-        speech_io.speak(learned_response)
+        _say(learned_response)
 
-    # Ask caller for message
-    speech_io.speak("Please tell your message. Say 'end', 'finished', or 'complete' to stop.")
+    # Ask caller for message (wait until the prompt has been played)
+    _say(response_catalog.prompt("ask_message")).result()
+    # The caller's voice is recorded alongside the transcript
+    recorder = voicemail.record(caller)
     full_message = ""
-    while True:
-        line = speech_io.listen(duration=5)
-        if not line:
-            continue
-        if any(word in line.lower() for word in ["end", "finished", "complete"]):
-            break
-        full_message += line + " "
+    deadline = time.monotonic() + MAX_MESSAGE_SECONDS
+
+    def _over():
+        return (session is not None and session.hung_up.is_set()) or time.monotonic() > deadline
+
+    try:
+        for _, line in speech_io.utterances(timeout=SILENCE_TIMEOUT, stop=_over):
+            if session is not None:
+                session.note("caller", line)
+            found = speech_io.find_phrase(line, END_WORDS)
+            if found:
+                full_message += found[1]   # keep what was said before the end word
+                break
+            full_message += line + " "
+    finally:
+        audio_path = recorder.stop() if recorder is not None else None
 
     full_message = full_message.strip()
-    save_message(caller, full_message)
+    message_id = save_message(caller, full_message, audio_path)
+    if session is not None:
+        session.message_id = message_id
 
-    # Ask Sir for feedback
-    user_feedback = ask_user_feedback()
-    if user_feedback:
-        learner.learn_response(caller_id, user_condition, user_feedback)
-        speech_io.speak("🧠 Noted your feedback. I will remember this for next time.")
+    # Sir reviews the reply later; the call goes on
+    ask_user_feedback(caller, user_condition, full_message)
 
-    speech_io.speak("✅ Message recorded successfully. Goodbye!")
+    if session is None or not session.hung_up.is_set():
+        _say(response_catalog.prompt("recorded"))
+    return message_id
 
 # ----------------------------
 # Example testing
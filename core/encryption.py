@@ -0,0 +1,483 @@
+# core/encryption.py
+# At-rest encryption for what Neo stores about callers: message text,
+# voicemail audio, the learned profile and the alert log. Everything is
+# written in one format, a chunked AEAD stream (AES-256-GCM):
+#
+#   header  = MAGIC (4) | key id (4) | nonce prefix (7)
+#   chunk i = AES-GCM(plaintext[i], nonce = prefix | i (4) | last flag (1), aad = header)
+#
+# Plaintext is cut into CHUNK_SIZE pieces, so files are encrypted and
+# decrypted as they are written and read, never held whole. The counter
+# and last-chunk flag in the nonce stop chunks from being reordered or
+# the stream from being cut short. Short records (a message, a log line)
+# are single-chunk streams made with encrypt() / decrypt().
+#
+# The key lives in data/encryption_key.key (never committed) and is read
+# once; the first run creates it. A key that was published with the
+# repository is never trusted: it is retired on sight. rotate_key()
+# writes a fresh key and keeps the old ones in RETIRED_KEYS_FILE so
+# existing data still opens; a background pass (see start()) then
+# re-encrypts everything still under an old key, or still in plaintext
+# from before encryption, a small batch at a time.
+#
+#   python -m core.encryption status
+#   python -m core.encryption rotate   # a running Neo notices within KEY_CHECK seconds
+
+import base64
+import hashlib
+import hmac
+import io
+import os
+import sys
+import threading
+import time
+
+try:
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+except ImportError:
+    AESGCM = None
+
+KEY_FILE = "data/encryption_key.key"
+RETIRED_KEYS_FILE = "data/encryption_key.retired"   # one old key per line
+ENCRYPTION_ENABLED = os.environ.get("NEO_ENCRYPTION", "1") != "0"
+
+# Ids of keys that were once committed to the repository
+PUBLISHED_KEY_IDS = frozenset({bytes.fromhex("1dee541a")})
+
+MAGIC = b"NEO\x01"
+CHUNK_SIZE = 64 * 1024
+TAG_SIZE = 16
+HEADER_SIZE = len(MAGIC) + 4 + 7
+KEY_CHECK = 2.0            # seconds between checks for a rotated key file
+REENCRYPT_INTERVAL = 3600   # seconds between background passes
+REENCRYPT_PAUSE = 0.05      # seconds between batches, so a pass stays in the background
+
+
+class EncryptionError(Exception):
+    """Data could not be decrypted: wrong or missing key, or tampering."""
+
+
+_lock = threading.Lock()
+_keys = None          # key id -> AESGCM, current key included
+_current_id = None
+_blind_key = None     # HMAC key for blind(), derived from the current key
+_key_mtime = None
+_last_check = 0.0
+_warned = False
+_reencryptors = {}    # name -> func() that re-encrypts one batch, returns the count
+_worker = None
+_wake = threading.Event()
+
+# ---------------------------------------
+# Keys
+# ---------------------------------------
+def enabled():
+    """
+    True when new data is written encrypted. Without the `cryptography`
+    package Neo keeps working in plaintext (with a warning).
+    """
+    global _warned
+    if not ENCRYPTION_ENABLED:
+        return False
+    if AESGCM is None:
+        if not _warned:
+            _warned = True
+            print("⚠️ cryptography is not installed: data is stored unencrypted.")
+        return False
+    return True
+
+def _key_id(raw):
+    return hashlib.sha256(raw).digest()[:4]
+
+def _derive(raw, purpose):
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=purpose).derive(raw)
+
+def _cipher(raw):
+    # The key file holds a Fernet-style key; derive a dedicated AES key from it
+    return AESGCM(_derive(raw, b"neo stream aead v1"))
+
+def _decode_key(line):
+    raw = base64.urlsafe_b64decode(line.strip())
+    if len(raw) != 32:
+        raise ValueError("encryption key must be 32 bytes")
+    return raw
+
+def new_key():
+    return base64.urlsafe_b64encode(os.urandom(32))
+
+def _write_private(path, data, append=False):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | (os.O_APPEND if append else os.O_TRUNC), 0o600)
+    with os.fdopen(fd, "ab" if append else "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def _replace_key():
+    tmp_path = KEY_FILE + ".tmp"
+    _write_private(tmp_path, new_key() + b"\n")
+    os.replace(tmp_path, KEY_FILE)
+
+def _load_keys():
+    """
+    Returns the cached keys, re-reading them (at most every KEY_CHECK
+    seconds) if the key file was changed, e.g. rotated by another process.
+    Creates a key on first run.
+    """
+    global _keys, _current_id, _blind_key, _key_mtime, _last_check
+    now = time.monotonic()
+    if _keys is not None and now - _last_check < KEY_CHECK:
+        return _keys
+    with _lock:
+        _last_check = now
+        mtime = _mtime(KEY_FILE)
+        if _keys is not None and mtime == _key_mtime:
+            return _keys
+        if mtime is None:
+            _write_private(KEY_FILE, new_key() + b"\n")
+            print("🔑 Created a new encryption key:", KEY_FILE)
+            mtime = _mtime(KEY_FILE)
+        with open(KEY_FILE, "rb") as f:
+            current = _decode_key(f.read())
+        if _key_id(current) in PUBLISHED_KEY_IDS:
+            # Anyone with a clone has this key: keep it only to read old data
+            _write_private(RETIRED_KEYS_FILE, base64.urlsafe_b64encode(current) + b"\n", append=True)
+            _replace_key()
+            print("🔑 The encryption key was published with the repository; replaced it with a new one.")
+            with open(KEY_FILE, "rb") as f:
+                current = _decode_key(f.read())
+            mtime = _mtime(KEY_FILE)
+        keys = {}
+        if os.path.exists(RETIRED_KEYS_FILE):
+            with open(RETIRED_KEYS_FILE, "rb") as f:
+                for line in f:
+                    if line.strip():
+                        raw = _decode_key(line)
+                        keys[_key_id(raw)] = _cipher(raw)
+        changed = _keys is not None and _key_id(current) != _current_id
+        _current_id = _key_id(current)
+        keys[_current_id] = _cipher(current)
+        _blind_key = _derive(current, b"neo blind index v1")
+        _keys, _key_mtime = keys, mtime
+    if changed:
+        print(f"🔑 Encryption key changed (now {_current_id.hex()}).")
+        _wake.set()
+    return keys
+
+def current_key_id():
+    _load_keys()
+    return _current_id
+
+def rotate_key():
+    """
+    Switches to a new key. The old one is kept for reading until the
+    background pass has re-encrypted everything. Returns the new key id (hex).
+    """
+    global _keys
+    _load_keys()
+    with _lock:
+        with open(KEY_FILE, "rb") as f:
+            old = f.read().strip()
+        _write_private(RETIRED_KEYS_FILE, old + b"\n", append=True)
+        _replace_key()
+        _keys = None
+    key_id = current_key_id().hex()
+    print(f"🔑 Encryption key rotated (now {key_id}); re-encrypting old data in the background.")
+    _wake.set()
+    return key_id
+
+def blind(term):
+    """
+    Returns a keyed 8-byte hash of a search term, so an index can find
+    words without storing them in the clear (the term itself when
+    encryption is off). Hashes change when the key is rotated.
+    """
+    if not enabled():
+        return term.encode("utf-8")
+    _load_keys()
+    return hmac.new(_blind_key, term.encode("utf-8"), hashlib.sha256).digest()[:8]
+
+def blind_key_id():
+    """
+    Identifies the hashes blind() currently produces ("plain" when off).
+    """
+    return current_key_id().hex() if enabled() else "plain"
+
+# ---------------------------------------
+# Stream format
+# ---------------------------------------
+def _nonce(prefix, index, last):
+    return prefix + index.to_bytes(4, "big") + (b"\x01" if last else b"\x00")
+
+def is_encrypted(data):
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:len(MAGIC)]) == MAGIC
+
+def key_id_of(data):
+    """
+    Returns the key id an encrypted blob or file header was made with,
+    or None for plaintext.
+    """
+    return bytes(data[len(MAGIC):len(MAGIC) + 4]) if is_encrypted(data) else None
+
+def needs_reencrypt(data):
+    """
+    True if `data` is plaintext or under a retired key (and encryption is on).
+    """
+    return enabled() and key_id_of(data) != current_key_id()
+
+
+class StreamWriter(io.RawIOBase):
+    """
+    Encrypts everything written to it into the binary file `raw`, one
+    CHUNK_SIZE chunk at a time. close() writes the final chunk (and closes
+    `raw` unless close_raw=False).
+    """
+
+    def __init__(self, raw, close_raw=True):
+        keys = _load_keys()
+        self.raw = raw
+        self.close_raw = close_raw
+        self.cipher = keys[_current_id]
+        self.header = MAGIC + _current_id + os.urandom(7)
+        self.prefix = self.header[len(MAGIC) + 4:]
+        self.index = 0
+        self.pending = bytearray()
+        raw.write(self.header)
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.pending += data
+        # Keep the tail back: only close() knows which chunk is the last one
+        while len(self.pending) > CHUNK_SIZE:
+            self._emit(bytes(self.pending[:CHUNK_SIZE]), last=False)
+            del self.pending[:CHUNK_SIZE]
+        return len(data)
+
+    def _emit(self, chunk, last):
+        self.raw.write(self.cipher.encrypt(_nonce(self.prefix, self.index, last), chunk, self.header))
+        self.index += 1
+
+    def close(self):
+        if self.closed:
+            return
+        self._emit(bytes(self.pending), last=True)
+        self.pending = bytearray()
+        if self.close_raw:
+            self.raw.close()
+        super().close()
+
+
+class StreamReader(io.RawIOBase):
+    """
+    Decrypts a stream from the binary file `raw` chunk by chunk as it is
+    read. Raises EncryptionError on a wrong key, tampering or truncation.
+    """
+
+    def __init__(self, raw, header=None):
+        self.raw = raw
+        header = header if header is not None else raw.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE or not is_encrypted(header):
+            raise EncryptionError("not an encrypted stream")
+        if AESGCM is None:
+            raise EncryptionError("cryptography is not installed")
+        self.cipher = _load_keys().get(key_id_of(header))
+        if self.cipher is None:
+            raise EncryptionError(f"unknown encryption key {key_id_of(header).hex()}")
+        self.header = header
+        self.prefix = header[len(MAGIC) + 4:]
+        self.index = 0
+        self.plain = b""
+        self.next_chunk = raw.read(CHUNK_SIZE + TAG_SIZE)
+        self.done = False
+
+    def readable(self):
+        return True
+
+    def _advance(self):
+        chunk = self.next_chunk
+        self.next_chunk = self.raw.read(CHUNK_SIZE + TAG_SIZE)
+        last = not self.next_chunk
+        try:
+            self.plain = self.cipher.decrypt(_nonce(self.prefix, self.index, last), chunk, self.header)
+        except Exception:
+            raise EncryptionError("encrypted data is damaged or truncated") from None
+        self.index += 1
+        self.done = last
+
+    def readinto(self, buffer):
+        while not self.plain and not self.done:
+            self._advance()
+        n = min(len(buffer), len(self.plain))
+        buffer[:n] = self.plain[:n]
+        self.plain = self.plain[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            self.raw.close()
+        super().close()
+
+
+def encrypt(data):
+    """
+    Encrypts a short record (bytes or str) in memory. Returns the data
+    unchanged when encryption is off.
+    """
+    if not enabled():
+        return data
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    out = io.BytesIO()
+    writer = StreamWriter(out, close_raw=False)
+    writer.write(data)
+    writer.close()
+    return out.getvalue()
+
+def decrypt(data):
+    """
+    Decrypts a record made by encrypt(). Plaintext passes through, so data
+    written before encryption was turned on still reads.
+    """
+    if isinstance(data, str):
+        return data.encode("utf-8")
+    if not is_encrypted(data):
+        return bytes(data)
+    return StreamReader(io.BytesIO(data)).read()
+
+def decrypt_text(data):
+    return data if isinstance(data, str) else decrypt(data).decode("utf-8")
+
+# ---------------------------------------
+# Files
+# ---------------------------------------
+def open_read(path):
+    """
+    Opens a file for reading as a binary stream, decrypting incrementally
+    if it is encrypted and passing plaintext files through.
+    """
+    raw = open(path, "rb")
+    header = raw.read(HEADER_SIZE)
+    if is_encrypted(header):
+        return io.BufferedReader(StreamReader(raw, header), buffer_size=CHUNK_SIZE)
+    raw.seek(0)
+    return raw
+
+def file_needs_reencrypt(path):
+    with open(path, "rb") as f:
+        return needs_reencrypt(f.read(HEADER_SIZE))
+
+def encrypt_file(path):
+    """
+    Re-writes `path` in place under the current key (decrypting it first
+    if it is under an old one), streaming through a temp file.
+    """
+    tmp_path = path + ".tmp"
+    with open_read(path) as src, open(tmp_path, "wb") as raw:
+        dst = StreamWriter(raw, close_raw=False) if enabled() else raw
+        while True:
+            block = src.read(CHUNK_SIZE)
+            if not block:
+                break
+            dst.write(block)
+        if dst is not raw:
+            dst.close()   # writes the final chunk
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+
+# ---------------------------------------
+# Background re-encryption
+# ---------------------------------------
+def register(name, reencrypt_batch):
+    """
+    Registers a store's re-encryption step: reencrypt_batch() re-encrypts
+    a small batch of records that needs_reencrypt() and returns how many,
+    0 once nothing is left.
+    """
+    _reencryptors[name] = reencrypt_batch
+
+def reencrypt_all():
+    """
+    Runs every registered store until it reports nothing left. Returns
+    {name: records re-encrypted}. Once every store got there without an
+    error, the retired keys are no longer needed and are deleted.
+    """
+    done = {}
+    if not enabled():
+        return done
+    key_id = current_key_id()
+    complete = True
+    for name, step in list(_reencryptors.items()):
+        total = 0
+        try:
+            while True:
+                count = step()
+                if not count:
+                    break
+                total += count
+                time.sleep(REENCRYPT_PAUSE)
+        except Exception as e:
+            complete = False
+            print(f"Re-encryption of {name} failed:", e)
+        if total:
+            print(f"🔐 Re-encrypted {total} {name} record(s) under the current key.")
+        done[name] = total
+    if complete and _reencryptors:
+        _prune_retired(key_id)
+    return done
+
+def _prune_retired(key_id):
+    """
+    Deletes the retired keys, unless the key was rotated since `key_id`
+    (then there is old data again).
+    """
+    global _keys
+    with _lock:
+        if not os.path.exists(RETIRED_KEYS_FILE):
+            return
+        with open(KEY_FILE, "rb") as f:
+            if _key_id(_decode_key(f.read())) != key_id:
+                return
+        os.remove(RETIRED_KEYS_FILE)
+        _keys = None
+    print("🔑 Everything is under the current key; deleted the retired keys.")
+
+def _reencrypt_loop():
+    while True:
+        reencrypt_all()
+        _wake.wait(REENCRYPT_INTERVAL)
+        _wake.clear()
+
+def start():
+    """
+    Starts the background re-encryption thread (once).
+    """
+    global _worker
+    if _worker is None and enabled():
+        _worker = threading.Thread(target=_reencrypt_loop, daemon=True)
+        _worker.start()
+    return _worker
+
+def status():
+    if not enabled():
+        return {"enabled": False, "current_key": None, "retired_keys": 0, "stores": sorted(_reencryptors)}
+    keys = _load_keys()
+    return {"enabled": True, "current_key": current_key_id().hex(),
+            "retired_keys": len(keys) - 1, "stores": sorted(_reencryptors)}
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["rotate"]:
+        rotate_key()
+    else:
+        print(status())
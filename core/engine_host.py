@@ -0,0 +1,614 @@
+# core/engine_host.py
+# Runs the CPU-heavy engines in their own processes: speech recognition
+# (Vosk), speech synthesis (Piper) and face/eye detection (OpenCV). Each
+# engine is a worker process that talks to Neo over a local connection;
+# audio and frames travel through a shared-memory buffer instead of being
+# pickled. The host pings idle workers, restarts any that crash or hang,
+# and hands out look-alike objects (Recognizer, Voice, Cascade) so that
+# speech_io and condition_detector keep working the same way.
+#
+# NEO_ENGINES=inline keeps everything in the main process.
+
+import argparse
+import atexit
+import itertools
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Client, Listener
+from multiprocessing.shared_memory import SharedMemory
+from types import SimpleNamespace
+
+from core import metrics
+
+# numpy is imported where buffers are used, so that importing this module
+# (e.g. with NEO_ENGINES=inline) does not require it
+
+ENGINE_MODE = os.environ.get("NEO_ENGINES", "process")   # "process" or "inline"
+
+START_TIMEOUT = 20.0     # seconds for a worker to come up
+CALL_TIMEOUT = 60.0      # seconds before a request counts as hung
+HEALTH_INTERVAL = 5.0    # seconds between pings of idle workers
+PING_TIMEOUT = 2.0
+RESTART_DELAYS = (0, 1, 2, 5, 10, 30)   # back-off between restarts in a row
+STABLE_AFTER = 60.0      # a worker up this long resets the back-off
+
+# Initial shared buffer per engine (it grows when a payload does not fit)
+BUFFER_SIZES = {
+    "stt": 64 * 1024,            # 100 ms blocks of int16 audio
+    "tts": 4 * 1024 * 1024,      # one sentence of float32 audio
+    "vision": 1024 * 1024,       # one downscaled grayscale frame
+}
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_seq = itertools.count()
+
+
+class EngineError(RuntimeError):
+    """Raised when a worker fails, hangs or reports an error."""
+
+
+def enabled():
+    return ENGINE_MODE == "process"
+
+
+# ---------------------------------------
+# Host side: one Engine per worker process
+# ---------------------------------------
+class Engine:
+    """
+    Client for one worker process. All requests go through call(), one at
+    a time; `generation` changes whenever the worker is restarted, so
+    proxies know to recreate their remote objects.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.RLock()
+        self.proc = None
+        self.conn = None
+        self.shm = None
+        self.attached = False
+        self.generation = 0
+        self.restarts = 0
+        self.failures = 0        # restarts in a row, for the back-off
+        self.started = 0.0
+        self.last_ok = 0.0
+        self.restart_at = None   # when a worker that failed may be started again
+        self.socket_dir = None   # one private directory per engine, removed by stop()
+
+    # ---------- process lifecycle ----------
+    def _address(self):
+        if sys.platform == "win32":
+            return rf"\\.\pipe\neo-{self.name}-{os.getpid()}-{next(_seq)}"
+        if self.socket_dir is None:
+            self.socket_dir = tempfile.mkdtemp(prefix=f"neo-engine-{self.name}-")
+        return os.path.join(self.socket_dir, f"{self.name}-{next(_seq)}.sock")
+
+    def _start(self):
+        self.restart_at = None
+        authkey = os.urandom(16)
+        address = self._address()
+        env = dict(os.environ, NEO_ENGINE_AUTHKEY=authkey.hex())
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (REPO_ROOT, env.get("PYTHONPATH")) if p)
+        self.proc = subprocess.Popen([sys.executable, "-m", "core.engine_host",
+                                      "--worker", self.name, "--address", address], env=env)
+        deadline = time.monotonic() + START_TIMEOUT
+        while True:
+            try:
+                self.conn = Client(address, authkey=authkey)
+                break
+            except (OSError, EOFError):
+                if self.proc.poll() is not None:
+                    raise EngineError(f"{self.name} engine exited on start ({self.proc.returncode})")
+                if time.monotonic() > deadline:
+                    self._kill()
+                    raise EngineError(f"{self.name} engine did not start")
+                time.sleep(0.05)
+        self.attached = False
+        self.generation += 1
+        self.started = self.last_ok = time.monotonic()
+        print(f"⚙️ {self.name} engine running (pid {self.proc.pid})")
+
+    def _kill(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except OSError:
+                pass
+            self.conn = None
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.kill()
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                pass
+        if self.socket_dir is not None:
+            # Drop the old socket file (a worker that crashed leaves it behind)
+            for name in os.listdir(self.socket_dir):
+                try:
+                    os.remove(os.path.join(self.socket_dir, name))
+                except OSError:
+                    pass
+
+    def _ensure_running(self):
+        """
+        Starts the worker if it is not running. While a restart is backing
+        off, fails fast with EngineError instead of waiting with the lock held.
+        """
+        if self.proc is not None and self.proc.poll() is None and self.conn is not None:
+            return
+        if self.proc is not None and self.restart_at is None:
+            self._restart("exited")
+        if self.restart_at is not None:
+            wait = self.restart_at - time.monotonic()
+            if wait > 0:
+                raise EngineError(f"{self.name} engine restarting in {wait:.0f}s")
+        self._start()
+
+    def _restart(self, reason):
+        """
+        Kills the worker and schedules its restart after the back-off
+        delay; the next request (or health check) after that starts it.
+        """
+        print(f"⚠️ {self.name} engine {reason}; restarting.")
+        self._kill()
+        if time.monotonic() - self.started > STABLE_AFTER:
+            self.failures = 0
+        delay = RESTART_DELAYS[min(self.failures, len(RESTART_DELAYS) - 1)]
+        self.failures += 1
+        self.restarts += 1
+        _restarts.inc()
+        self.restart_at = time.monotonic() + delay
+
+    def stop(self):
+        with self.lock:
+            self._kill()
+            self.proc = None
+            self.restart_at = None
+            if self.socket_dir is not None:
+                shutil.rmtree(self.socket_dir, ignore_errors=True)
+                self.socket_dir = None
+            if self.shm is not None:
+                self.shm.close()
+                try:
+                    self.shm.unlink()
+                except FileNotFoundError:
+                    pass
+                self.shm = None
+
+    # ---------- requests ----------
+    def call(self, op, *args, timeout=CALL_TIMEOUT):
+        """
+        Sends one request and returns the worker's result. A crashed or
+        hung worker is restarted and the request fails with EngineError.
+        """
+        with self.lock:
+            self._ensure_running()
+            try:
+                self.conn.send((op, args))
+                if not self.conn.poll(timeout):
+                    raise TimeoutError(f"no answer to {op} after {timeout:.0f}s")
+                status, result = self.conn.recv()
+            except (OSError, EOFError, TimeoutError) as e:
+                self._restart(f"failed ({e!r})")
+                raise EngineError(f"{self.name} engine failed during {op}: {e!r}") from e
+            self.last_ok = time.monotonic()
+        if status == "error":
+            raise EngineError(f"{self.name} engine: {result}")
+        return result
+
+    def buffer(self, nbytes):
+        """
+        Returns the shared buffer, growing it (and telling the worker) if
+        it is smaller than `nbytes`. Call with the lock held.
+        """
+        self._ensure_running()
+        if self.shm is None or self.shm.size < nbytes:
+            old = self.shm
+            self.shm = SharedMemory(create=True, size=max(nbytes, BUFFER_SIZES.get(self.name, 0)))
+            self.attached = False
+            if old is not None:
+                old.close()
+                old.unlink()
+        if not self.attached:
+            mapped = self.call("attach", self.shm.name)
+            if mapped < nbytes:
+                raise EngineError(f"{self.name} engine mapped {mapped} bytes, {nbytes} needed")
+            self.attached = True
+        return self.shm
+
+    def write(self, data):
+        """
+        Copies bytes or an array into the shared buffer. Returns the byte count.
+        """
+        import numpy as np
+        if isinstance(data, np.ndarray):
+            shm = self.buffer(data.nbytes)
+            np.ndarray(data.shape, dtype=data.dtype, buffer=shm.buf)[...] = data
+            return data.nbytes
+        shm = self.buffer(len(data))
+        shm.buf[:len(data)] = data
+        return len(data)
+
+    def read(self, count, dtype):
+        """
+        Copies `count` items out of the shared buffer.
+        """
+        import numpy as np
+        return np.ndarray((count,), dtype=dtype, buffer=self.shm.buf).copy()
+
+    # ---------- health ----------
+    def check(self):
+        """
+        Pings the worker if it is idle; restarts it if it died or hangs.
+        """
+        if not self.lock.acquire(blocking=False):
+            return   # busy with a request, which has its own timeout
+        try:
+            if self.proc is None:
+                return
+            if self.restart_at is None and self.proc.poll() is not None:
+                self._restart(f"exited with code {self.proc.returncode}")
+            if self.restart_at is not None and time.monotonic() < self.restart_at:
+                return   # backing off; started once the delay is over
+            try:
+                self.call("ping", timeout=PING_TIMEOUT)   # (re)starts the worker if needed
+            except EngineError as e:
+                print(e)
+        finally:
+            self.lock.release()
+
+    def status(self):
+        alive = self.proc is not None and self.proc.poll() is None
+        return {
+            "engine": self.name,
+            "alive": alive,
+            "pid": self.proc.pid if alive else None,
+            "restarts": self.restarts,
+            "idle_seconds": time.monotonic() - self.last_ok if alive else None,
+        }
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+_monitor = None
+_restarts = metrics.counter("neo_engine_restarts_total", "Engine worker restarts")
+
+
+def engine(name):
+    """
+    Returns the Engine for "stt", "tts" or "vision" and makes sure the
+    health monitor is running.
+    """
+    with _engines_lock:
+        eng = _engines.get(name)
+        if eng is None:
+            eng = _engines[name] = Engine(name)
+    _start_monitor()
+    return eng
+
+
+def _start_monitor():
+    global _monitor
+    with _engines_lock:
+        if _monitor is not None:
+            return
+
+        def _loop():
+            while True:
+                time.sleep(HEALTH_INTERVAL)
+                with _engines_lock:
+                    engines = list(_engines.values())
+                for eng in engines:
+                    try:
+                        eng.check()
+                    except Exception as e:
+                        print(f"Engine monitor error ({eng.name}):", e)
+
+        _monitor = threading.Thread(target=_loop, daemon=True)
+        _monitor.start()
+
+
+def status():
+    with _engines_lock:
+        engines = list(_engines.values())
+    return [eng.status() for eng in engines]
+
+
+def shutdown():
+    with _engines_lock:
+        engines = list(_engines.values())
+    for eng in engines:
+        eng.stop()
+
+
+atexit.register(shutdown)
+
+
+# ---------------------------------------
+# Proxies with the same interface as the local objects
+# ---------------------------------------
+class _RemoteObject:
+    """
+    Handle to an object living in a worker, recreated after a restart.
+    """
+
+    def __init__(self, engine_name, create_op, *create_args):
+        self.engine = engine(engine_name)
+        self.create_op = create_op
+        self.create_args = create_args
+        self.remote_id = None
+        self.generation = None
+
+    def _id(self):
+        if self.remote_id is None or self.generation != self.engine.generation:
+            self.remote_id = self.engine.call(self.create_op, *self.create_args)
+            self.generation = self.engine.generation
+        return self.remote_id
+
+
+class Recognizer(_RemoteObject):
+    """
+    Stands in for vosk.KaldiRecognizer(Model(model_path), sample_rate[, grammar]).
+    """
+
+    def __init__(self, model_path, sample_rate, grammar=None):
+        super().__init__("stt", "rec_new", model_path, sample_rate, grammar)
+
+    def AcceptWaveform(self, data):
+        with self.engine.lock:
+            rec = self._id()
+            size = self.engine.write(data)
+            return self.engine.call("rec_accept", rec, size)
+
+    def feed(self, data):
+        """
+        AcceptWaveform(data) followed by Result() if it returned True, else
+        PartialResult(), in one round trip. Returns (accepted, result JSON).
+        """
+        with self.engine.lock:
+            rec = self._id()
+            size = self.engine.write(data)
+            accepted, result = self.engine.call("rec_feed", rec, size)
+            return accepted, result
+
+    def _text(self, method):
+        with self.engine.lock:
+            return self.engine.call("rec_text", self._id(), method)
+
+    def Result(self):
+        return self._text("Result")
+
+    def PartialResult(self):
+        return self._text("PartialResult")
+
+    def FinalResult(self):
+        return self._text("FinalResult")
+
+    def Reset(self):
+        with self.engine.lock:
+            self.engine.call("rec_reset", self._id())
+
+    def close(self):
+        with self.engine.lock:
+            if self.remote_id is not None and self.generation == self.engine.generation:
+                self.engine.call("rec_free", self.remote_id)
+            self.remote_id = None
+
+
+class Voice:
+    """
+    Stands in for a loaded PiperVoice: .config.sample_rate and
+    .synthesize(text) yielding chunks with .audio_float_array.
+    """
+
+    def __init__(self, model_path):
+        self.engine = engine("tts")
+        self.model_path = model_path
+        self.config = SimpleNamespace(sample_rate=self.engine.call("voice_info", model_path))
+
+    def synthesize(self, text):
+        stream = self.engine.call("synth_start", self.model_path, text)
+        generation = self.engine.generation
+        finished = False
+        try:
+            while True:
+                with self.engine.lock:
+                    if self.engine.generation != generation:
+                        raise EngineError("tts engine restarted during synthesis")
+                    self.engine.buffer(0)
+                    count = self.engine.call("synth_next", stream)
+                    if isinstance(count, tuple):   # ("grow", bytes): chunk did not fit
+                        self.engine.buffer(count[1])
+                        count = self.engine.call("synth_next", stream)
+                    if count is None:
+                        finished = True
+                        return
+                    audio = self.engine.read(count, "float32")
+                yield SimpleNamespace(audio_float_array=audio)
+        finally:
+            if not finished and self.engine.generation == generation:
+                try:
+                    self.engine.call("synth_free", stream)
+                except EngineError:
+                    pass
+
+
+class Cascade(_RemoteObject):
+    """
+    Stands in for cv2.CascadeClassifier(cv2.data.haarcascades + name).
+    """
+
+    def __init__(self, name):
+        super().__init__("vision", "cascade_new", name)
+
+    def detectMultiScale(self, image, *args, **kwargs):
+        with self.engine.lock:
+            cascade = self._id()
+            self.engine.write(image)
+            return self.engine.call("detect", cascade, image.shape, str(image.dtype), args, kwargs)
+
+
+# ---------------------------------------
+# Worker side
+# ---------------------------------------
+class _SttWorker:
+    def __init__(self):
+        self.models = {}
+        self.recognizers = {}
+        self.ids = itertools.count(1)
+
+    def _model(self, model_path):
+        if model_path not in self.models:
+            from vosk import Model
+            if not os.path.exists(model_path):
+                raise FileNotFoundError("Vosk model not found. Download and place in models/vosk_model")
+            self.models[model_path] = Model(model_path)
+        return self.models[model_path]
+
+    def op_load_model(self, shm, model_path):
+        self._model(model_path)
+
+    def op_rec_new(self, shm, model_path, sample_rate, grammar):
+        from vosk import KaldiRecognizer
+        args = (self._model(model_path), sample_rate) + ((grammar,) if grammar else ())
+        rec_id = next(self.ids)
+        self.recognizers[rec_id] = KaldiRecognizer(*args)
+        return rec_id
+
+    def op_rec_accept(self, shm, rec_id, size):
+        return bool(self.recognizers[rec_id].AcceptWaveform(bytes(shm.buf[:size])))
+
+    def op_rec_feed(self, shm, rec_id, size):
+        rec = self.recognizers[rec_id]
+        if rec.AcceptWaveform(bytes(shm.buf[:size])):
+            return True, rec.Result()
+        return False, rec.PartialResult()
+
+    def op_rec_text(self, shm, rec_id, method):
+        return getattr(self.recognizers[rec_id], method)()
+
+    def op_rec_reset(self, shm, rec_id):
+        self.recognizers[rec_id].Reset()
+
+    def op_rec_free(self, shm, rec_id):
+        self.recognizers.pop(rec_id, None)
+
+
+class _TtsWorker:
+    def __init__(self):
+        self.voice = None
+        self.streams = {}   # id -> [chunk iterator, pending samples]
+        self.ids = itertools.count(1)
+
+    def _voice(self, model_path):
+        if self.voice is None:
+            from piper import PiperVoice
+            if not os.path.exists(model_path):
+                raise FileNotFoundError("Piper TTS model not found. Download and place in models/piper_model")
+            self.voice = PiperVoice.load(model_path)
+        return self.voice
+
+    def op_voice_info(self, shm, model_path):
+        return self._voice(model_path).config.sample_rate
+
+    def op_synth_start(self, shm, model_path, text):
+        stream_id = next(self.ids)
+        self.streams[stream_id] = [iter(self._voice(model_path).synthesize(text)), None]
+        return stream_id
+
+    def op_synth_next(self, shm, stream_id):
+        import numpy as np
+        stream = self.streams[stream_id]
+        if stream[1] is None:
+            chunk = next(stream[0], None)
+            if chunk is None:
+                del self.streams[stream_id]
+                return None
+            stream[1] = np.asarray(chunk.audio_float_array, dtype=np.float32).reshape(-1)
+        samples = stream[1]
+        if shm is None or samples.nbytes > shm.size:
+            return ("grow", samples.nbytes)
+        np.ndarray(samples.shape, dtype=np.float32, buffer=shm.buf)[...] = samples
+        stream[1] = None
+        return len(samples)
+
+    def op_synth_free(self, shm, stream_id):
+        self.streams.pop(stream_id, None)
+
+
+class _VisionWorker:
+    def __init__(self):
+        self.cascades = {}
+        self.ids = itertools.count(1)
+
+    def op_cascade_new(self, shm, name):
+        import cv2
+        cascade_id = next(self.ids)
+        self.cascades[cascade_id] = cv2.CascadeClassifier(cv2.data.haarcascades + name)
+        return cascade_id
+
+    def op_detect(self, shm, cascade_id, shape, dtype, args, kwargs):
+        import numpy as np
+        image = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        found = self.cascades[cascade_id].detectMultiScale(image, *args, **kwargs)
+        return [tuple(int(v) for v in box) for box in found]
+
+
+_WORKERS = {"stt": _SttWorker, "tts": _TtsWorker, "vision": _VisionWorker}
+
+
+def _attach(name):
+    shm = SharedMemory(name=name)
+    try:
+        # The host owns the segment; keep this process from unlinking it on exit
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+def worker_main(name, address):
+    """
+    Entry point of a worker process: serves requests until the host
+    closes the connection.
+    """
+    authkey = bytes.fromhex(os.environ.pop("NEO_ENGINE_AUTHKEY"))
+    handler = _WORKERS[name]()
+    with Listener(address, authkey=authkey) as listener:
+        conn = listener.accept()
+    shm = None
+    while True:
+        try:
+            op, args = conn.recv()
+        except (EOFError, OSError):
+            return   # the host went away
+        try:
+            if op == "ping":
+                result = "pong"
+            elif op == "attach":
+                if shm is not None:
+                    shm.close()
+                shm = _attach(args[0])
+                result = shm.size   # the host checks the worker sees the whole buffer
+            else:
+                result = getattr(handler, "op_" + op)(shm, *args)
+            reply = ("ok", result)
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__}: {e}")
+        conn.send(reply)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Neo engine worker")
+    parser.add_argument("--worker", choices=sorted(_WORKERS), required=True)
+    parser.add_argument("--address", required=True)
+    args = parser.parse_args()
+    worker_main(args.worker, args.address)
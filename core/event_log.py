@@ -0,0 +1,346 @@
+# core/event_log.py
+
+import atexit
+import base64
+import glob
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from core import encryption
+
+FLUSH_SIZE = 64           # buffered events that force a flush
+FLUSH_INTERVAL = 5.0      # seconds between background flushes
+MAX_BYTES = 1_000_000     # rotate the live file past this size
+BACKUPS = 10              # rotated segments kept per log
+SEEK_BLOCK = 4096         # stop bisecting when the range is this small
+
+_logs = []
+_logs_lock = threading.Lock()
+_flusher = None
+_flush_wake = threading.Event()   # set by write() when a buffer is full
+
+
+# ---------------------------------------
+# Writer
+# ---------------------------------------
+class EventLog:
+    """
+    Append-only JSON Lines log. Each event is {"ts": epoch, "type": ..., ...}.
+    Events are buffered in memory and written in one append by the
+    background flusher when the buffer reaches `flush_size` (write() never
+    touches the disk), every `flush_interval` seconds, or at exit. Past
+    `max_bytes` the live file is rotated to "<path>.<first_ts>-<last_ts>"
+    (gzipped if `compress`), and only the newest `backups` segments are kept.
+    With `encrypt`, each line keeps only its "ts" in the clear (for seeking)
+    and the event itself is encrypted at flush time (see core/encryption.py).
+    close() a log that is no longer needed, so the flusher lets go of it.
+    """
+
+    def __init__(self, path, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 max_bytes=MAX_BYTES, backups=BACKUPS, compress=True, encrypt=False):
+        self.path = path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.compress = compress
+        self.encrypt = encrypt
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.last_flush = time.time()
+        self.first_ts = _first_timestamp(path)
+        _register(self)
+        if encrypt:
+            encryption.register(f"event log {path}", self._reencrypt_batch)
+
+    def write(self, event_type, ts=None, **fields):
+        """
+        Buffers one event. Returns the event dict.
+        """
+        event = {"ts": time.time() if ts is None else ts, "type": event_type}
+        event.update(fields)
+        with self.lock:
+            self.buffer.append(json.dumps(event, ensure_ascii=False))
+            full = len(self.buffer) >= self.flush_size
+        if full:
+            _flush_wake.set()
+        return event
+
+    def flush(self):
+        """
+        Writes buffered events to disk now.
+        """
+        with self.lock:
+            self.last_flush = time.time()
+            if not self.buffer:
+                return
+            lines, self.buffer = self.buffer, []
+            if self.encrypt:
+                lines = [_seal(line) for line in lines]
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            if self.first_ts is None:
+                self.first_ts = json.loads(lines[0])["ts"]
+            if os.path.getsize(self.path) >= self.max_bytes:
+                self._rotate(json.loads(lines[-1])["ts"])
+
+    def close(self):
+        """
+        Flushes and takes the log off the background flusher. An encrypted
+        log stays registered for re-encryption, so its files are never
+        left under a retired key.
+        """
+        _unregister(self)
+        self.flush()
+
+    def import_events(self, events):
+        """
+        Adds older events (dicts with "ts" and "type", all older than
+        anything logged so far, e.g. from a legacy file) as a rotated
+        segment of their own, sealed like the rest, so the log stays in
+        time order. Importing the same events again replaces that segment
+        instead of duplicating it. Returns the number of events added.
+        """
+        events = sorted(events, key=lambda e: e["ts"])
+        if not events:
+            return 0
+        lines = [json.dumps(event, ensure_ascii=False) for event in events]
+        if self.encrypt:
+            lines = [_seal(line) for line in lines]
+        target = f"{self.path}.{events[0]['ts']:.3f}-{events[-1]['ts']:.3f}"
+        opener = open
+        if self.compress:
+            target, opener = target + ".gz", gzip.open
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with opener(target + ".tmp", "wt", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            os.replace(target + ".tmp", target)
+        return len(events)
+
+    def _due(self, now):
+        return self.buffer and (len(self.buffer) >= self.flush_size
+                                or now - self.last_flush >= self.flush_interval)
+
+    def _rotate(self, last_ts):
+        target = f"{self.path}.{self.first_ts:.3f}-{last_ts:.3f}"
+        os.replace(self.path, target)
+        self.first_ts = None
+        if self.compress:
+            with open(target, "rb") as src, gzip.open(target + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(target)
+        for old in _segments(self.path)[:-self.backups or None]:
+            os.remove(old[2])
+
+    def _reencrypt_batch(self):
+        """
+        Rewrites the first file of this log (live file or segment) that
+        still holds plaintext lines or lines under a retired key. Returns
+        1 if one was rewritten, 0 if none is left.
+        """
+        if not encryption.enabled():
+            return 0
+        with self.lock:
+            files = [name for _, _, name in _segments(self.path)]
+            if os.path.exists(self.path):
+                files.append(self.path)
+            for name in files:
+                opener = gzip.open if name.endswith(".gz") else open
+                with opener(name, "rt", encoding="utf-8") as f:
+                    lines = [line.rstrip("\n") for line in f if line.strip()]
+                if not any(_needs_reencrypt(line) for line in lines):
+                    continue
+                tmp_path = name + ".tmp"
+                with opener(tmp_path, "wt", encoding="utf-8") as f:
+                    for line in lines:
+                        if _needs_reencrypt(line):
+                            line = _seal(_unseal(line))
+                        f.write(line + "\n")
+                os.replace(tmp_path, name)
+                return 1
+        return 0
+
+    def read(self, since=None, until=None, event_type=None):
+        """
+        Flushes, then yields events in [since, until) from this log.
+        """
+        self.flush()
+        return read_events(self.path, since, until, event_type)
+
+
+def _seal(line):
+    """
+    Encrypts one JSON line, keeping its timestamp readable.
+    """
+    if not encryption.enabled():
+        return line
+    sealed = base64.b64encode(encryption.encrypt(line)).decode("ascii")
+    return json.dumps({"ts": json.loads(line)["ts"], "enc": sealed})
+
+
+def _unseal(line):
+    """
+    Returns the plain JSON line for a line written by _seal().
+    """
+    event = json.loads(line)
+    if "enc" not in event:
+        return line
+    return encryption.decrypt_text(base64.b64decode(event["enc"]))
+
+
+def _needs_reencrypt(line):
+    try:
+        sealed = json.loads(line).get("enc")
+    except ValueError:
+        return False   # torn line from a crash
+    # The first 12 base64 characters hold the magic and key id
+    return encryption.needs_reencrypt(base64.b64decode(sealed[:12]) if sealed else b"")
+
+
+def _first_timestamp(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            line = f.readline()
+        return json.loads(line)["ts"] if line else None
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+# ---------------------------------------
+# Background flushing
+# ---------------------------------------
+def _register(log):
+    global _flusher
+    with _logs_lock:
+        _logs.append(log)
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, daemon=True)
+            _flusher.start()
+
+
+def _unregister(log):
+    with _logs_lock:
+        if log in _logs:
+            _logs.remove(log)
+
+
+def _flush_loop():
+    while True:
+        _flush_wake.wait(1.0)
+        _flush_wake.clear()
+        now = time.time()
+        with _logs_lock:
+            logs = list(_logs)
+        for log in logs:
+            if log._due(now):
+                try:
+                    log.flush()
+                except OSError as e:
+                    print(f"Event log flush failed for {log.path}:", e)
+
+
+def flush_all():
+    with _logs_lock:
+        logs = list(_logs)
+    for log in logs:
+        try:
+            log.flush()
+        except OSError as e:
+            print(f"Event log flush failed for {log.path}:", e)
+
+
+atexit.register(flush_all)
+
+
+# ---------------------------------------
+# Reader
+# ---------------------------------------
+def _segments(path):
+    """
+    Returns rotated segments of a log as (first_ts, last_ts, file) tuples,
+    oldest first.
+    """
+    found = []
+    for name in glob.glob(glob.escape(path) + ".*-*"):
+        stamp = name[len(path) + 1:]
+        if stamp.endswith(".gz"):
+            stamp = stamp[:-3]
+        try:
+            first, last = (float(x) for x in stamp.split("-"))
+        except ValueError:
+            continue
+        found.append((first, last, name))
+    return sorted(found)
+
+
+def _seek_to(f, since):
+    """
+    Positions a binary file at (or slightly before) the first line with
+    ts >= since by bisecting on byte offsets. Lines are in time order.
+    """
+    f.seek(0, os.SEEK_END)
+    lo, hi = 0, f.tell()
+    while hi - lo > SEEK_BLOCK:
+        mid = (lo + hi) // 2
+        f.seek(mid)
+        f.readline()   # skip the partial line
+        line = f.readline()
+        try:
+            ts = json.loads(line)["ts"]
+        except (ValueError, KeyError):
+            hi = mid
+            continue
+        if ts < since:
+            lo = mid
+        else:
+            hi = mid
+    f.seek(lo)
+    if lo:
+        f.readline()
+
+
+def _scan(f, since, until, event_type):
+    for line in f:
+        try:
+            event = json.loads(line)
+            if "enc" in event:
+                event = json.loads(_unseal(line))
+        except ValueError:
+            continue   # torn line from a crash
+        except encryption.EncryptionError as e:
+            print("⚠️ Skipping unreadable event:", e)
+            continue
+        ts = event.get("ts", 0)
+        if since is not None and ts < since:
+            continue
+        if until is not None and ts >= until:
+            return
+        if event_type is None or event.get("type") == event_type:
+            yield event
+
+
+def read_events(path, since=None, until=None, event_type=None):
+    """
+    Yields events from a log and its rotated segments in time order,
+    limited to [since, until) and optionally to one event type. Segments
+    outside the range are skipped by name; the live file is bisected.
+    """
+    for first, last, name in _segments(path):
+        if (since is not None and last < since) or (until is not None and first >= until):
+            continue
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(name, "rt", encoding="utf-8") as f:
+            yield from _scan(f, since, until, event_type)
+
+    if not os.path.exists(path):
+        return
+    # Binary mode so bisecting on byte offsets never splits a character
+    with open(path, "rb") as f:
+        if since is not None:
+            _seek_to(f, since)
+        yield from _scan(f, since, until, event_type)
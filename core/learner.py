@@ -1,38 +1,188 @@
 # core/learner.py
 
+import atexit
+import copy
 import json
 import os
+import tempfile
+import threading
+from core import metrics, encryption
 
 USER_PROFILE = "data/user_profile.json"
+FLUSH_DELAY = 2.0   # seconds to wait for more changes before writing
 
 # Ensure data folder exists
 os.makedirs("data", exist_ok=True)
 
+# ---------------- Profile store ----------------
+class ProfileStore:
+    """
+    Keeps the user profile in memory. The file is read once; changes are
+    written back after FLUSH_DELAY seconds of quiet (several learns in a
+    row cost one write) via a temp file and an atomic rename, so a killed
+    process never leaves a half-written profile behind. On disk the
+    profile is encrypted (see core/encryption.py).
+    """
+
+    def __init__(self, path=USER_PROFILE, flush_delay=FLUSH_DELAY):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.lock = threading.RLock()
+        self.write_lock = threading.Lock()   # one writer at a time, outside self.lock
+        self.profile = None
+        self.dirty = False
+        self.timer = None
+        self.generation = 0   # bumped on every flushed snapshot
+        self.written = 0      # generation of the snapshot on disk
+
+    def _blank(self):
+        return {"habits": {}, "responses": {}, "report_phrases": {}}
+
+    def _load(self):
+        if self.profile is not None:
+            return self.profile
+        with metrics.timer("profile_load", "Reading the profile from disk"):
+            return self._read()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            self.profile = self._blank()
+            return self.profile
+        try:
+            with encryption.open_read(self.path) as f:
+                self.profile = json.load(f)
+        except json.JSONDecodeError:
+            print("⚠️ Failed to parse profile. Using blank memory.")
+            self.profile = self._blank()
+        except encryption.EncryptionError as e:
+            # Keep the file for later instead of overwriting it on the next flush
+            print("⚠️ Failed to decrypt profile, moved aside. Using blank memory:", e)
+            os.replace(self.path, self.path + ".unreadable")
+            self.profile = self._blank()
+        return self.profile
+
+    def get(self, *keys):
+        """
+        Looks up a nested value, e.g. get("responses", caller_id, situation).
+        Returns None if any level is missing.
+        """
+        with self.lock:
+            node = self._load()
+            for key in keys:
+                if not isinstance(node, dict) or key not in node:
+                    return None
+                node = node[key]
+            return node
+
+    def set(self, *keys, value):
+        """
+        Sets a nested value, creating intermediate levels, and schedules a write.
+        """
+        with self.lock:
+            node = self._load()
+            for key in keys[:-1]:
+                node = node.setdefault(key, {})
+            node[keys[-1]] = value
+            self._mark_dirty()
+
+    def snapshot(self):
+        with self.lock:
+            return copy.deepcopy(self._load())
+
+    def replace(self, profile):
+        with self.lock:
+            self.profile = copy.deepcopy(profile)
+            self._mark_dirty()
+
+    def _mark_dirty(self):
+        self.dirty = True
+        if self.timer is not None:
+            self.timer.cancel()
+        self.timer = threading.Timer(self.flush_delay, self.flush)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def flush(self):
+        """
+        Writes pending changes to disk now (temp file + rename). Concurrent
+        flushes never share a temp file, and an older snapshot never
+        replaces a newer one.
+        """
+        with self.lock:
+            if not self.dirty:
+                return
+            data = json.dumps(self.profile, indent=4)
+            self.dirty = False
+            self.generation += 1
+            generation = self.generation
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with self.write_lock:
+            if generation < self.written:
+                return
+            tmp_path = None
+            try:
+                with metrics.timer("profile_flush", "Writing the profile to disk"):
+                    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path),
+                                                    suffix=".tmp")
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(encryption.encrypt(data.encode("utf-8")))
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp_path, self.path)
+                self.written = generation
+            except OSError as e:
+                print("⚠️ Failed to save profile:", e)
+                if tmp_path is not None and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                with self.lock:
+                    self.dirty = True
+
+    def reencrypt(self):
+        """
+        Rewrites the profile file if it is in plaintext or under a retired
+        key. Returns 1 if it was rewritten, else 0.
+        """
+        with self.lock:
+            if not os.path.exists(self.path) or not encryption.file_needs_reencrypt(self.path):
+                return 0
+            self._load()
+            self.dirty = True
+        self.flush()
+        return 0 if self.dirty else 1
+
+
+_store = ProfileStore()
+atexit.register(_store.flush)
+encryption.register("profile", _store.reencrypt)
+
 # ---------------- Profile functions ----------------
 def load_profile():
-    if not os.path.exists(USER_PROFILE):
-        return {"habits": {}, "responses": {}}
-    try:
-        with open(USER_PROFILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data
-    except json.JSONDecodeError:
-        print("⚠️ Failed to parse profile. Using blank memory.")
-        return {"habits": {}, "responses": {}}
+    return _store.snapshot()
 
 def save_profile(profile):
-    with open(USER_PROFILE, "w", encoding="utf-8") as f:
-        json.dump(profile, f, indent=4)
+    _store.replace(profile)
+
+def flush():
+    _store.flush()
 
 # ---------------- Learning functions ----------------
 def learn_response(caller_id, situation, correct_reply):
-    profile = load_profile()
-    profile.setdefault("responses", {})
-    profile["responses"].setdefault(caller_id, {})
-    profile["responses"][caller_id][situation] = correct_reply
-    save_profile(profile)
+    _store.set("responses", caller_id, situation, value=correct_reply)
     print(f"💾 Learned response for {caller_id} under '{situation}': {correct_reply}")
 
+@metrics.timed("learner_lookup", "Learned-response lookup")
 def get_learned_response(caller_id, situation):
-    profile = load_profile()
-    return profile.get("responses", {}).get(caller_id, {}).get(situation)
+    return _store.get("responses", caller_id, situation)
+
+# ---------------- Report phrasing ----------------
+def learn_report_phrase(message_text, phrase):
+    _store.set("report_phrases", message_text.strip().lower(), value=phrase)
+    print(f"💾 Learned report phrase: {phrase}")
+
+def get_report_phrase(message_text):
+    return _store.get("report_phrases", message_text.strip().lower())
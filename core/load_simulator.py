@@ -0,0 +1,259 @@
+# core/load_simulator.py
+# Call-load simulator on a virtual clock, built on call_simulator's events.
+# Traffic (Poisson arrivals, concurrent rings, repeat-caller bursts, robocall
+# floods, callers hanging up) is merged into one timeline and played back
+# faster than real time.
+# Runs are reproducible with a seed and can be recorded and replayed.
+
+import argparse
+import heapq
+import json
+import math
+import random
+import time
+from core import call_simulator, alert_manager
+
+RING_DURATION = 10        # seconds a call rings before it counts as missed
+ANSWER_PROBABILITY = 0.0  # chance the user picks up themselves
+
+# -------------------------------------------------
+# Virtual clock
+# -------------------------------------------------
+class VirtualClock:
+    """
+    Simulated time. advance_to() jumps ahead instantly, or sleeps
+    (target - now) / speed real seconds when a speed factor is set.
+    """
+
+    def __init__(self, start=0.0, speed=None):
+        self.now = start
+        self.speed = speed   # None = as fast as possible, 60.0 = one minute per second
+
+    def time(self):
+        return self.now
+
+    def advance_to(self, t):
+        if t <= self.now:
+            return
+        if self.speed:
+            time.sleep((t - self.now) / self.speed)
+        self.now = t
+
+
+# -------------------------------------------------
+# Simulator
+# -------------------------------------------------
+class LoadSimulator:
+    """
+    Collects call arrivals and plays them back as ringing / answered /
+    missed events in virtual-time order.
+    """
+
+    def __init__(self, seed=None, start=0.0, speed=None, callers=None):
+        self.rng = random.Random(seed)
+        self.start = start
+        self.clock = VirtualClock(start, speed)
+        self.callers = callers or call_simulator.CALLERS
+        self.arrivals = []   # (time, caller, ring_duration, answered, stay)
+        self.trace = []
+
+    # ---------- traffic generators ----------
+    def add_call(self, at, caller, ring_duration=RING_DURATION, answered=False, stay=None):
+        """
+        One call. A missed call with a `stay` hangs up that many seconds
+        after it was missed; without one it never hangs up.
+        """
+        self.arrivals.append((at, caller, ring_duration, answered, stay))
+        return self
+
+    def poisson(self, calls_per_minute, duration, start=0.0):
+        """
+        Random arrivals from the known callers at the given average rate
+        (0 adds none).
+        """
+        if not math.isfinite(calls_per_minute) or calls_per_minute < 0:
+            raise ValueError(f"calls_per_minute must be a finite number >= 0, not {calls_per_minute!r}")
+        if calls_per_minute == 0:
+            return self
+        t = start
+        rate = calls_per_minute / 60.0
+        while True:
+            t += self.rng.expovariate(rate)
+            if t >= start + duration:
+                return self
+            self.add_call(t, self.rng.choice(self.callers),
+                          answered=self.rng.random() < ANSWER_PROBABILITY)
+
+    def concurrent(self, count, at):
+        """
+        `count` different callers ringing at the same moment.
+        """
+        for i in range(count):
+            self.add_call(at, self.callers[i % len(self.callers)])
+        return self
+
+    def burst(self, caller, count, spacing, start=0.0):
+        """
+        One caller ringing `count` times, `spacing` seconds apart.
+        """
+        for i in range(count):
+            self.add_call(start + i * spacing, caller)
+        return self
+
+    def robocall_flood(self, count, duration, start=0.0, prefix="+1900"):
+        """
+        `count` calls from distinct unknown numbers spread over `duration`.
+        """
+        for i in range(count):
+            caller = {"name": "Unknown", "number": f"{prefix}{i:07d}"}
+            self.add_call(start + self.rng.uniform(0, duration), caller, ring_duration=3)
+        return self
+
+    def hang_ups(self, call_length=call_simulator.CALL_LENGTH):
+        """
+        Makes every missed call without a hang-up so far hang up a random
+        `call_length` (low, high) seconds after it was missed, as callers
+        on call_simulator do.
+        """
+        low, high = call_length
+        self.arrivals = [(at, caller, ring, answered,
+                          self.rng.uniform(low, high) if stay is None and not answered else stay)
+                         for at, caller, ring, answered, stay in self.arrivals]
+        return self
+
+    # ---------- running ----------
+    def events(self):
+        """
+        Yields call events in time order without publishing them.
+        """
+        timeline = []
+        for seq, (at, caller, ring, answered, stay) in enumerate(sorted(self.arrivals, key=lambda a: a[0])):
+            timeline.append((at, seq, call_simulator.RINGING, caller))
+            end = call_simulator.ANSWERED if answered else call_simulator.MISSED
+            timeline.append((at + (ring / 2 if answered else ring), seq, end, caller))
+            if stay is not None and not answered:
+                timeline.append((at + ring + stay, seq, call_simulator.HUNG_UP, caller))
+        heapq.heapify(timeline)
+        while timeline:
+            at, _, event_type, caller = heapq.heappop(timeline)
+            self.clock.advance_to(at)
+            yield {"type": event_type, "caller": caller, "time": at}
+
+    def run(self, consumer=None):
+        """
+        Plays the timeline. Each event goes to `consumer(event)` if given,
+        otherwise it is published on call_simulator's event bus with its
+        virtual time. Returns the number of events. Each run starts over:
+        the clock goes back to the start and the trace is cleared.
+        """
+        self.clock.now = self.start
+        self.trace = []
+        count = 0
+        for event in self.events():
+            self.trace.append(event)
+            if consumer is not None:
+                consumer(event)
+            else:
+                call_simulator.publish(event["type"], event["caller"], when=event["time"])
+            count += 1
+        return count
+
+    # ---------- traces ----------
+    def save_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for event in self.trace:
+                f.write(json.dumps(event) + "\n")
+
+    @classmethod
+    def from_trace(cls, path, speed=None):
+        """
+        Rebuilds a simulator that replays a recorded trace.
+        """
+        sim = cls(speed=speed)
+        rings = {}
+        missed = {}   # number -> indexes into sim.arrivals still waiting for a hang-up
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                event = json.loads(line)
+                number = event["caller"]["number"]
+                if event["type"] == call_simulator.RINGING:
+                    rings.setdefault(number, []).append(event)
+                elif event["type"] == call_simulator.HUNG_UP:
+                    if missed.get(number):
+                        index = missed[number].pop(0)
+                        at, caller, ring, answered, _ = sim.arrivals[index]
+                        sim.arrivals[index] = (at, caller, ring, answered, event["time"] - at - ring)
+                elif rings.get(number):
+                    start = rings[number].pop(0)
+                    answered = event["type"] == call_simulator.ANSWERED
+                    ring = event["time"] - start["time"]
+                    sim.add_call(start["time"], start["caller"], ring * 2 if answered else ring, answered)
+                    if not answered:
+                        missed.setdefault(number, []).append(len(sim.arrivals) - 1)
+        for pending in rings.values():
+            for start in pending:
+                sim.add_call(start["time"], start["caller"])
+        if sim.arrivals:
+            sim.start = sim.clock.now = min(a[0] for a in sim.arrivals)
+        return sim
+
+
+# -------------------------------------------------
+# Alert-threshold replay
+# -------------------------------------------------
+def replay_alerts(sim):
+    """
+    Runs a simulation straight through alert_manager's rate tracker on
+    virtual time and returns the list of (time, caller) alerts it would raise.
+    """
+    tracker = alert_manager.CallRateTracker()
+    alerts = []
+
+    def _consume(event):
+        if event["type"] == call_simulator.RINGING and tracker.record(event["caller"]["number"], event["time"]):
+            alerts.append((event["time"], event["caller"]))
+
+    sim.run(_consume)
+    return alerts
+
+
+# -------------------------------------------------
+# Command line
+# -------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Neo call-load simulator")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--duration", type=float, default=3600, help="virtual seconds")
+    parser.add_argument("--rate", type=float, default=1.0, help="Poisson calls per minute")
+    parser.add_argument("--concurrent", type=int, default=0, help="simultaneous rings at t=60")
+    parser.add_argument("--burst", type=int, default=0, help="repeat calls from Mom, 30 s apart")
+    parser.add_argument("--flood", type=int, default=0, help="robocalls from distinct numbers")
+    parser.add_argument("--hang-up", action="store_true", help="missed callers hang up after a while")
+    parser.add_argument("--record", help="save the trace to this file")
+    parser.add_argument("--replay", help="replay a recorded trace instead")
+    args = parser.parse_args()
+
+    if args.replay:
+        sim = LoadSimulator.from_trace(args.replay)
+    else:
+        sim = LoadSimulator(seed=args.seed).poisson(args.rate, args.duration)
+        if args.concurrent:
+            sim.concurrent(args.concurrent, at=60)
+        if args.burst:
+            sim.burst(call_simulator.CALLERS[0], args.burst, spacing=30, start=120)
+        if args.flood:
+            sim.robocall_flood(args.flood, args.duration)
+        if args.hang_up:
+            sim.hang_ups()
+
+    started = time.perf_counter()
+    alerts = replay_alerts(sim)
+    elapsed = time.perf_counter() - started
+    rings = sum(1 for e in sim.trace if e["type"] == call_simulator.RINGING)
+    print(f"📞 {rings} calls over {sim.clock.now:.0f} virtual seconds in {elapsed:.3f}s real time")
+    print(f"⚠️ {len(alerts)} alerts")
+    for at, caller in alerts[:20]:
+        print(f"   t={at:8.1f}s  {caller['name']} ({caller['number']})")
+    if args.record:
+        sim.save_trace(args.record)
+        print(f"💾 Trace saved to {args.record}")
@@ -0,0 +1,336 @@
+# core/message_index.py
+# Search over saved messages. An inverted index of message words and
+# caller names lives in data/message_index.db and is kept up to date
+# incrementally: sync() only indexes messages it has not seen yet, so the
+# index survives restarts and is never rebuilt at startup.
+#
+# search("what did the boss say about the meeting") ranks messages with
+# BM25, computed inside SQLite from the postings of the query's words.
+# Postings are kept in impact order, so a query reads a bounded number of
+# them however many messages there are. Words that match the caller's name
+# count CALLER_BOOST times as much, and phrases like "today" or "this
+# week" limit the time range. With encryption on, terms are stored as
+# keyed hashes (encryption.blind), never as words.
+#
+#   python -m core.message_index "messages from mom this week"
+
+import datetime
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from core import message_store, encryption
+
+INDEX_PATH = "data/message_index.db"
+SYNC_BATCH = 500          # messages indexed per step
+MAX_RESULTS = 5
+CALLER_BOOST = 2.0        # a caller-name match is worth this many word matches
+TERM_CANDIDATES = 200     # highest-impact postings read per query word
+K1 = 1.2                  # BM25 term-frequency saturation
+B = 0.75                  # BM25 length normalization
+AVG_LENGTH = 8            # assumed words per message until there are some
+TOKENS_VERSION = 2        # bump when tokens() changes: the index is rebuilt
+
+# Words that say nothing about which message is meant
+STOP_WORDS = frozenset("""
+a an and any are about at be by call called calls did do does for from
+had has have he her him his i in is it me message messages my of on or
+say said says she tell that the their them there they this to was what
+when which who with you your
+""".split())
+
+_conn = None
+_lock = threading.RLock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS postings (
+    term       BLOB NOT NULL,
+    impact     REAL NOT NULL,
+    message_id INTEGER NOT NULL,
+    time       REAL NOT NULL,
+    PRIMARY KEY (term, impact DESC, message_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_time ON postings (term, time);
+CREATE TABLE IF NOT EXISTS terms (
+    term BLOB PRIMARY KEY,
+    df   INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS docs (
+    message_id INTEGER PRIMARY KEY,
+    time       REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_time ON docs (time);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# ---------------------------------------
+# Connection
+# ---------------------------------------
+def _connect():
+    global _conn
+    with _lock:
+        if _conn is None:
+            os.makedirs(os.path.dirname(INDEX_PATH) or ".", exist_ok=True)
+            _conn = sqlite3.connect(INDEX_PATH, check_same_thread=False)
+            _conn.execute("PRAGMA journal_mode=WAL")
+            _conn.execute("PRAGMA synchronous=NORMAL")
+            _conn.executescript(SCHEMA)
+        return _conn
+
+
+def close():
+    global _conn
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+
+
+def _meta(conn, key, default=None):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def _set_meta(conn, **values):
+    conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                     [(k, str(v)) for k, v in values.items()])
+
+# ---------------------------------------
+# Terms
+# ---------------------------------------
+def tokens(text):
+    """
+    Lowercase words of `text` with possessives and plurals folded
+    ("meetings", "meeting's" -> "meeting"), stop words dropped. Stop words
+    are checked before folding too, so "this" never becomes "thi".
+    """
+    found = []
+    for word in re.findall(r"[a-z0-9']+", (text or "").lower()):
+        word = word.strip("'")
+        if word.endswith("'s"):
+            word = word[:-2]
+        if not word or word in STOP_WORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+            word = word[:-1]
+        if word not in STOP_WORDS:
+            found.append(word)
+    return found
+
+
+def _term(word, field=""):
+    return encryption.blind(field + word)
+
+# ---------------------------------------
+# Indexing
+# ---------------------------------------
+def _impact(tf, length, avg_length):
+    # BM25's term-frequency part; the idf is applied at query time
+    return tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+
+
+def _index(conn, message, avg_length):
+    words = tokens(message["message"])
+    caller_words = tokens(message["caller"].get("name", ""))
+    postings = {}
+    for word, tf in Counter(words).items():
+        postings[_term(word)] = _impact(tf, len(words), avg_length)
+    for word, tf in Counter(caller_words).items():
+        # Names are short and all about the same length: no length normalization
+        postings[_term(word, "caller:")] = _impact(tf, 1, 1)
+    conn.executemany("INSERT INTO postings (term, impact, message_id, time) VALUES (?, ?, ?, ?)",
+                     [(term, impact, message["id"], message["time"]) for term, impact in postings.items()])
+    conn.executemany("INSERT INTO terms (term, df) VALUES (?, 1) "
+                     "ON CONFLICT (term) DO UPDATE SET df = df + 1", [(term,) for term in postings])
+    conn.execute("INSERT INTO docs (message_id, time) VALUES (?, ?)", (message["id"], message["time"]))
+    return len(words)
+
+
+def _reset_if_stale(conn):
+    """
+    Term hashes depend on the encryption key and on tokens(): after a key
+    rotation or a tokenizer change the index starts over (sync() then
+    rebuilds it in batches).
+    """
+    key_id = encryption.blind_key_id()
+    if _meta(conn, "key") == key_id and _meta(conn, "tokens") == str(TOKENS_VERSION):
+        return
+    with conn:
+        conn.execute("DELETE FROM postings")
+        conn.execute("DELETE FROM terms")
+        conn.execute("DELETE FROM docs")
+        _set_meta(conn, key=key_id, tokens=TOKENS_VERSION, last_id=0, docs=0, total_length=0)
+
+
+def sync(limit=SYNC_BATCH):
+    """
+    Indexes up to `limit` messages saved since the last sync. Returns how
+    many were read from the store (messages that cannot be decrypted are
+    skipped).
+    """
+    with _lock:
+        conn = _connect()
+        _reset_if_stale(conn)
+        last_id = int(_meta(conn, "last_id", 0))
+        messages = message_store.after(last_id, limit)
+        if not messages:
+            return 0
+        docs = int(_meta(conn, "docs", 0))
+        total_length = int(_meta(conn, "total_length", 0))
+        with conn:
+            for message in messages:
+                if message["unreadable"]:
+                    continue   # undecryptable: skipped, not retried on every sync
+                # Impacts use the average length at indexing time, which settles quickly
+                avg_length = max(total_length / docs, 1.0) if docs else AVG_LENGTH
+                total_length += _index(conn, message, avg_length)
+                docs += 1
+            _set_meta(conn, last_id=messages[-1]["id"], docs=docs, total_length=total_length)
+        return len(messages)
+
+
+def _sync_batch():
+    return sync(SYNC_BATCH)
+
+# Catches up after a key rotation along with the stores' re-encryption
+encryption.register("message index", _sync_batch)
+
+# ---------------------------------------
+# Time phrases
+# ---------------------------------------
+# Speech recognition spells numbers out ("last three days")
+NUMBER_WORDS = {
+    "a": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "fourteen": 14, "fifteen": 15, "twenty": 20, "thirty": 30, "couple of": 2, "few": 3,
+}
+
+def _day_start(day):
+    return datetime.datetime.combine(day, datetime.time()).timestamp()
+
+
+def time_range(text, now=None):
+    """
+    Returns (since, until, text without the time phrase) for phrases like
+    "today", "yesterday", "this week", "last week", "this month", "last
+    3 days" or "past three days". since/until are None when the text names
+    no time.
+    """
+    now = time.time() if now is None else now
+    today = datetime.date.fromtimestamp(now)
+    week_start = today - datetime.timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    lowered = (text or "").lower()
+
+    numbers = "|".join(sorted(NUMBER_WORDS, key=len, reverse=True))
+    match = re.search(rf"\b(?:last|past) (\d+|{numbers}) days?\b", lowered)
+    if match:
+        count = match.group(1)
+        days = int(count) if count.isdigit() else NUMBER_WORDS[count]
+        return now - days * 86400, None, lowered[:match.start()] + lowered[match.end():]
+
+    phrases = (
+        ("yesterday", _day_start(today - datetime.timedelta(days=1)), _day_start(today)),
+        ("today", _day_start(today), None),
+        ("this week", _day_start(week_start), None),
+        ("last week", _day_start(week_start - datetime.timedelta(days=7)), _day_start(week_start)),
+        ("this month", _day_start(month_start), None),
+    )
+    for phrase, since, until in phrases:
+        match = re.search(rf"\b{phrase}\b", lowered)
+        if match:
+            return since, until, lowered[:match.start()] + lowered[match.end():]
+    return None, None, text
+
+# ---------------------------------------
+# Search
+# ---------------------------------------
+def _ranked(conn, words, since, until, limit):
+    """
+    BM25 over the TERM_CANDIDATES highest-impact postings of each word
+    (postings are stored in impact order, so this reads a bounded prefix
+    however common the word is).
+    """
+    docs = int(_meta(conn, "docs", 0))
+    if not docs:
+        return []
+
+    # One weight per term: BM25 idf, boosted for the caller field
+    boosts = {}
+    for word in set(words):
+        boosts[_term(word)] = 1.0
+        boosts[_term(word, "caller:")] = CALLER_BOOST
+    marks = ",".join("?" * len(boosts))
+    dfs = dict(conn.execute(f"SELECT term, df FROM terms WHERE term IN ({marks})", list(boosts)))
+    if not dfs:
+        return []
+
+    timed = since is not None or until is not None
+    parts, params = [], []
+    for term, df in dfs.items():
+        idf = math.log(1 + (docs - df + 0.5) / (df + 0.5))
+        parts.append("SELECT * FROM (SELECT message_id, ? * impact AS score FROM postings WHERE term = ?"
+                     + (" AND time >= ? AND time < ?" if timed else "")
+                     + " ORDER BY impact DESC LIMIT ?)")
+        params += [boosts[term] * idf, term]
+        if timed:
+            params += [since or 0.0, until or float("inf")]
+        params.append(TERM_CANDIDATES)
+    sql = (f"SELECT message_id, SUM(score) AS total FROM ({' UNION ALL '.join(parts)}) "
+           "GROUP BY message_id ORDER BY total DESC, message_id DESC LIMIT ?")
+    return conn.execute(sql, params + [limit]).fetchall()
+
+
+def _newest(conn, since, until, limit):
+    return conn.execute("SELECT message_id, 0.0 FROM docs WHERE time >= ? AND time < ? "
+                        "ORDER BY time DESC LIMIT ?",
+                        (since or 0.0, until or float("inf"), limit)).fetchall()
+
+
+def search_ids(query, limit=MAX_RESULTS, now=None):
+    """
+    Returns [(message_id, score)] for the best matches of `query`, best
+    first. A query with only a time phrase returns the newest messages in
+    that range.
+    """
+    since, until, rest = time_range(query, now)
+    words = tokens(rest)
+    with _lock:
+        conn = _connect()
+        try:
+            sync()
+        except (sqlite3.Error, encryption.EncryptionError) as e:
+            # Search what is already indexed; the next sync tries again
+            print("Message index sync error:", e)
+        if words:
+            return _ranked(conn, words, since, until, limit)
+        if since is not None or until is not None:
+            return _newest(conn, since, until, limit)
+        return []
+
+
+def search(query, limit=MAX_RESULTS, now=None):
+    """
+    Returns the best matching messages for `query` (message_store dicts
+    with an added "score"), best first.
+    """
+    results = []
+    for message_id, score in search_ids(query, limit, now):
+        message = message_store.get(message_id)
+        if message is not None and not message["unreadable"]:
+            message["score"] = score
+            results.append(message)
+    return results
+
+
+if __name__ == "__main__":
+    for msg in search(" ".join(sys.argv[1:])):
+        print(f"{msg['score']:.2f}  #{msg['id']} {time.ctime(msg['time'])} "
+              f"{msg['caller'].get('name', 'unknown')}: {msg['message']}")
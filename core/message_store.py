@@ -0,0 +1,325 @@
+# core/message_store.py
+
+import datetime
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from core import encryption
+
+DB_PATH = "data/messages.db"
+MESSAGES_DIR = "data/messages"   # legacy one-JSON-file-per-message folder
+REENCRYPT_BATCH = 100            # rows re-encrypted per step after a key rotation
+ALL_CALLERS = object()           # iter_unread(): no filter (None means "no number")
+
+_conn = None
+_lock = threading.RLock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    caller_name   TEXT NOT NULL,
+    caller_number TEXT,
+    caller        TEXT NOT NULL,
+    message       TEXT NOT NULL,
+    time          REAL NOT NULL,
+    read          INTEGER NOT NULL DEFAULT 0,
+    audio_path    TEXT,
+    unreadable    INTEGER NOT NULL DEFAULT 0   -- set when the text failed to decrypt
+);
+CREATE INDEX IF NOT EXISTS messages_unread ON messages (read, time);
+CREATE INDEX IF NOT EXISTS messages_caller ON messages (caller_number, time);
+CREATE INDEX IF NOT EXISTS messages_time ON messages (time);
+CREATE TABLE IF NOT EXISTS imported_files (
+    name TEXT PRIMARY KEY
+);
+"""
+
+# ---------------------------------------
+# Connection
+# ---------------------------------------
+def _connect():
+    global _conn
+    with _lock:
+        if _conn is None:
+            os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+            _conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+            _conn.row_factory = sqlite3.Row
+            _conn.execute("PRAGMA journal_mode=WAL")
+            _conn.execute("PRAGMA synchronous=NORMAL")
+            _conn.executescript(SCHEMA)
+            _upgrade(_conn)
+        return _conn
+
+
+def _upgrade(conn):
+    """
+    Adds columns that databases from older versions are missing.
+    """
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(messages)")}
+    if "audio_path" not in columns:
+        with conn:
+            conn.execute("ALTER TABLE messages ADD COLUMN audio_path TEXT")
+    if "unreadable" not in columns:
+        with conn:
+            conn.execute("ALTER TABLE messages ADD COLUMN unreadable INTEGER NOT NULL DEFAULT 0")
+
+
+def close():
+    global _conn
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+
+
+def _row_to_message(row):
+    """
+    A message that cannot be decrypted (damaged, or under a lost key) comes
+    back with "message" None and "unreadable" True instead of raising, so
+    one bad row never stops a report or a consumer following the store.
+    """
+    try:
+        text, unreadable = encryption.decrypt_text(row["message"]), False
+    except encryption.EncryptionError as e:
+        print(f"⚠️ Message #{row['id']} cannot be decrypted:", e)
+        text, unreadable = None, True
+    return {
+        "id": row["id"],
+        "caller": json.loads(row["caller"]),
+        "message": text,
+        "time": row["time"],
+        "read": bool(row["read"]),
+        "audio_path": row["audio_path"],
+        "unreadable": unreadable,
+    }
+
+
+def _query(sql, params=()):
+    with _lock:
+        rows = _connect().execute(sql, params).fetchall()
+    return [_row_to_message(row) for row in rows]
+
+
+# ---------------------------------------
+# Writing
+# ---------------------------------------
+def add_message(caller, message_text, timestamp=None, audio_path=None):
+    """
+    Appends a message and returns its id. `audio_path` points at the
+    caller's recording, if one was made. The text is stored encrypted
+    (see core/encryption.py).
+    """
+    timestamp = time.time() if timestamp is None else timestamp
+    with _lock:
+        conn = _connect()
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO messages (caller_name, caller_number, caller, message, time, audio_path) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (caller.get("name", "unknown"), caller.get("number"),
+                 json.dumps(caller), encryption.encrypt(message_text), timestamp, audio_path))
+        return cur.lastrowid
+
+
+def mark_read(message_ids):
+    """
+    Marks the given messages as delivered.
+    """
+    message_ids = list(message_ids)
+    if not message_ids:
+        return
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.executemany("UPDATE messages SET read = 1 WHERE id = ?",
+                             [(message_id,) for message_id in message_ids])
+
+
+# ---------------------------------------
+# Queries
+# ---------------------------------------
+def get(message_id):
+    found = _query("SELECT * FROM messages WHERE id = ?", (message_id,))
+    return found[0] if found else None
+
+
+def after(message_id, limit=100):
+    """
+    Returns up to `limit` messages with an id above `message_id`, in id
+    order (for consumers that follow the store, like core/message_index.py).
+    """
+    return _query("SELECT * FROM messages WHERE id > ? ORDER BY id LIMIT ?", (message_id, limit))
+
+
+def unread(limit=None):
+    """
+    Returns unread messages, oldest first.
+    """
+    sql = "SELECT * FROM messages WHERE read = 0 ORDER BY time, id"
+    if limit is not None:
+        return _query(sql + " LIMIT ?", (limit,))
+    return _query(sql)
+
+
+def iter_unread(caller_number=ALL_CALLERS, batch_size=50, caller_name=ALL_CALLERS):
+    """
+    Lazily yields unread messages, oldest first, optionally for one caller
+    (one unread_summary() group: its number, which may be None, and name).
+    Rows are fetched `batch_size` at a time.
+    """
+    where, params = "read = 0", ()
+    if caller_number is not ALL_CALLERS:
+        where += " AND caller_number IS ?"
+        params += (caller_number,)
+    if caller_name is not ALL_CALLERS:
+        where += " AND caller_name = ?"
+        params += (caller_name,)
+    last_time, last_id = -1.0, 0
+    while True:
+        batch = _query(f"SELECT * FROM messages WHERE {where} AND (time, id) > (?, ?) "
+                       "ORDER BY time, id LIMIT ?", params + (last_time, last_id, batch_size))
+        yield from batch
+        if len(batch) < batch_size:
+            return
+        last_time, last_id = batch[-1]["time"], batch[-1]["id"]
+
+
+def unread_summary():
+    """
+    Returns one entry per caller with unread messages, ordered by their
+    first unread message: {"name", "number", "count", "first", "last"}.
+    """
+    with _lock:
+        rows = _connect().execute(
+            "SELECT caller_name, caller_number, COUNT(*), MIN(time), MAX(time) "
+            "FROM messages WHERE read = 0 GROUP BY caller_number, caller_name "
+            "ORDER BY MIN(time)").fetchall()
+    return [{"name": row[0], "number": row[1], "count": row[2], "first": row[3], "last": row[4]}
+            for row in rows]
+
+
+def count_unread():
+    with _lock:
+        return _connect().execute("SELECT COUNT(*) FROM messages WHERE read = 0").fetchone()[0]
+
+
+def by_caller(number, since=None, until=None, limit=None):
+    """
+    Returns messages from one caller number, oldest first, optionally
+    limited to the [since, until) epoch range.
+    """
+    sql = "SELECT * FROM messages WHERE caller_number = ? AND time >= ? AND time < ? ORDER BY time, id"
+    params = (number, since or 0, until if until is not None else float("inf"))
+    if limit is not None:
+        return _query(sql + " LIMIT ?", params + (limit,))
+    return _query(sql, params)
+
+
+def between(since, until=None):
+    """
+    Returns all messages in the [since, until) epoch range, oldest first.
+    """
+    until = until if until is not None else float("inf")
+    return _query("SELECT * FROM messages WHERE time >= ? AND time < ? ORDER BY time, id",
+                  (since, until))
+
+
+# ---------------------------------------
+# Migration from data/messages/*.json
+# ---------------------------------------
+def _remove_imported(file_path):
+    try:
+        os.remove(file_path)
+    except OSError as e:
+        print(f"⚠️ Could not remove imported message file {file_path}: {e}")
+
+
+def migrate_directory(path=MESSAGES_DIR):
+    """
+    Imports legacy per-message JSON files. Each file is deleted once its
+    message is in the (encrypted) database, so no plaintext copy stays on
+    disk; files imported before that are skipped and deleted too. This is
+    safe to run on every startup. Imported messages are left unread.
+    Returns the number of messages imported.
+    """
+    if not os.path.isdir(path):
+        return 0
+
+    imported = 0
+    with _lock:
+        conn = _connect()
+        done = {row[0] for row in conn.execute("SELECT name FROM imported_files")}
+        for name in sorted(os.listdir(path)):
+            if not name.endswith(".json"):
+                continue
+            if name in done:
+                _remove_imported(os.path.join(path, name))
+                continue
+            try:
+                with open(os.path.join(path, name), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                stamp = datetime.datetime.strptime(data["time"], "%Y%m%d_%H%M%S").timestamp()
+                caller = data["caller"]
+                message_text = data.get("message", "")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Skipping message file {name}: {e}")
+                continue
+            with conn:
+                conn.execute(
+                    "INSERT INTO messages (caller_name, caller_number, caller, message, time) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (caller.get("name", "unknown"), caller.get("number"),
+                     json.dumps(caller), encryption.encrypt(message_text), stamp))
+                conn.execute("INSERT INTO imported_files (name) VALUES (?)", (name,))
+            _remove_imported(os.path.join(path, name))
+            imported += 1
+
+    if imported:
+        print(f"📦 Imported {imported} message file(s) from {path}")
+    return imported
+
+
+# ---------------------------------------
+# Re-encryption after a key rotation
+# ---------------------------------------
+def _reencrypt_batch():
+    """
+    Re-encrypts up to REENCRYPT_BATCH messages that are still in plaintext
+    or under a retired key. Returns how many were done. A message that
+    cannot be decrypted is flagged unreadable (left as it is, for a manual
+    look) and skipped from then on, so it never stalls the pass.
+    """
+    current = encryption.current_key_id()
+    with _lock:
+        conn = _connect()
+        # Bytes 5-8 of an encrypted message are its key id
+        rows = conn.execute("SELECT id, message FROM messages WHERE unreadable = 0 "
+                            "AND (typeof(message) != 'blob' OR substr(message, 5, 4) != ?) LIMIT ?",
+                            (current, REENCRYPT_BATCH)).fetchall()
+        updates, damaged = [], []
+        for row in rows:
+            try:
+                updates.append((encryption.encrypt(encryption.decrypt(row["message"])), row["id"]))
+            except encryption.EncryptionError as e:
+                print(f"⚠️ Message #{row['id']} cannot be decrypted ({e}); flagged unreadable.")
+                damaged.append((row["id"],))
+        if rows:
+            with conn:
+                conn.executemany("UPDATE messages SET message = ? WHERE id = ?", updates)
+                conn.executemany("UPDATE messages SET unreadable = 1 WHERE id = ?", damaged)
+    return len(rows)
+
+encryption.register("message", _reencrypt_batch)
+
+
+# ---------------------------------------
+# Manual use
+# ---------------------------------------
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        migrate_directory(sys.argv[2] if len(sys.argv) > 2 else MESSAGES_DIR)
+    for msg in unread():
+        print(f"#{msg['id']} {time.ctime(msg['time'])} {msg['caller']['name']}: {msg['message']}")
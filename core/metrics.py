@@ -0,0 +1,249 @@
+# core/metrics.py
+
+import bisect
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_FILE = "data/metrics.prom"
+EXPORT_INTERVAL = 15      # seconds between Prometheus text file writes
+SUMMARY_INTERVAL = 300    # seconds between printed summaries
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# NEO_METRICS=0 turns every timer and counter into a no-op
+ENABLED = os.environ.get("NEO_METRICS", "1") != "0"
+
+_registry = {}
+_registry_lock = threading.Lock()
+_exporter = None
+_observers = []
+
+
+# ---------------------------------------
+# Metric types
+# ---------------------------------------
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        if ENABLED:
+            with self.lock:
+                self.value += amount
+
+    def lines(self):
+        return [f"{self.name} {self.value}"]
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram: observe() is a bisect and two additions.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, help="", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        if not ENABLED:
+            return
+        slot = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[slot] += 1
+            self.sum += value
+            self.count += 1
+        for callback in _observers:
+            callback(self.name, value)
+
+    def quantile(self, q):
+        """
+        Estimates a quantile as the upper bound of the bucket it falls in.
+        """
+        with self.lock:
+            if not self.count:
+                return None
+            target = q * self.count
+            seen = 0
+            for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+                seen += count
+                if seen >= target:
+                    return bound
+        return float("inf")
+
+    def lines(self):
+        with self.lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        out = []
+        cumulative = 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            out.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        out.append(f'{self.name}_bucket{{le="+Inf"}} {count}')
+        out.append(f"{self.name}_sum {total}")
+        out.append(f"{self.name}_count {count}")
+        return out
+
+
+def _get(cls, name, help, **kwargs):
+    metric = _registry.get(name)
+    if metric is None:
+        with _registry_lock:
+            metric = _registry.get(name)
+            if metric is None:
+                metric = cls(name, help, **kwargs)
+                _registry[name] = metric
+    return metric
+
+
+def add_observer(callback):
+    """
+    Registers callback(histogram name, value), run on the observing thread
+    for every value a histogram records (e.g. to attribute timings to one
+    call in benchmarks/ring_to_greeting.py). Keep it quick.
+    """
+    _observers.append(callback)
+
+
+def counter(name, help=""):
+    return _get(Counter, name, help)
+
+
+def histogram(name, help="", buckets=DEFAULT_BUCKETS):
+    return _get(Histogram, name, help, buckets=buckets)
+
+
+# ---------------------------------------
+# Timing helpers
+# ---------------------------------------
+@contextmanager
+def timer(name, help=""):
+    """
+    Times the block into the histogram "neo_<name>_seconds".
+    """
+    if not ENABLED:
+        yield
+        return
+    hist = histogram(f"neo_{name}_seconds", help)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        hist.observe(time.perf_counter() - started)
+
+
+def timed(name, help=""):
+    """
+    Decorator version of timer(); also counts calls that raised.
+    """
+    def decorate(func):
+        hist = histogram(f"neo_{name}_seconds", help)
+        errors = counter(f"neo_{name}_errors_total")
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                hist.observe(time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+def count(name, amount=1, help=""):
+    counter(f"neo_{name}_total", help).inc(amount)
+
+
+# ---------------------------------------
+# Export
+# ---------------------------------------
+def export_text():
+    """
+    Returns all metrics in the Prometheus text exposition format.
+    """
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    out = []
+    for metric in metrics:
+        if metric.help:
+            out.append(f"# HELP {metric.name} {metric.help}")
+        out.append(f"# TYPE {metric.name} {metric.kind}")
+        out.extend(metric.lines())
+    return "\n".join(out) + "\n"
+
+
+def write_textfile(path=METRICS_FILE):
+    """
+    Writes the metrics file atomically (for node_exporter's textfile collector).
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(export_text())
+    os.replace(tmp_path, path)
+
+
+def summary():
+    """
+    Returns a short human-readable summary: one line per metric.
+    """
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    lines = []
+    for metric in metrics:
+        if isinstance(metric, Histogram):
+            if not metric.count:
+                continue
+            mean = metric.sum / metric.count * 1000
+            p95 = metric.quantile(0.95)
+            lines.append(f"{metric.name}: n={metric.count} mean={mean:.1f}ms p95<={p95 * 1000:.0f}ms")
+        elif metric.value:
+            lines.append(f"{metric.name}: {metric.value}")
+    return lines
+
+
+def start_exporter(path=METRICS_FILE, interval=EXPORT_INTERVAL, summary_interval=SUMMARY_INTERVAL):
+    """
+    Starts a background thread that writes the metrics file every
+    `interval` seconds and prints a summary every `summary_interval`.
+    """
+    global _exporter
+    if not ENABLED or _exporter is not None:
+        return
+
+    def _loop():
+        last_summary = time.time()
+        while True:
+            time.sleep(interval)
+            try:
+                write_textfile(path)
+            except OSError as e:
+                print("Metrics export failed:", e)
+            if summary_interval and time.time() - last_summary >= summary_interval:
+                last_summary = time.time()
+                print("📊 Metrics summary:")
+                for line in summary():
+                    print("   " + line)
+
+    _exporter = threading.Thread(target=_loop, daemon=True)
+    _exporter.start()
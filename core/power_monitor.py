@@ -1,40 +1,176 @@
 # core/power_monitor.py
 
-import psutil
+import threading
 import time
-import json
-import os
-from core import speech_io
+from collections import deque
+from core import speech_scheduler, event_log
 
 PARENT_NUMBERS = ["+1111111111", "+2222222222"]  # Replace with your actual contacts
-BATTERY_LOW_THRESHOLD = 20   # percentage
+BATTERY_LOW_THRESHOLD = 20        # percentage
+BATTERY_CRITICAL_THRESHOLD = 10   # percentage
+HYSTERESIS = 5                    # level must climb this far above a threshold to re-arm it
+LOW_POWER_THRESHOLD = 30          # on battery at or below this, Neo enters low-power mode
+
+# Seconds between checks, depending on the situation
+POLL_PLUGGED = 300
+POLL_HIGH = 180        # above 50%
+POLL_MEDIUM = 60       # above the low threshold
+POLL_LOW = 30          # at or below the low threshold
+POLL_NO_BATTERY = 600
+
+RATE_SAMPLES = 20      # (time, level) readings used for the discharge rate
+
+# Power alert history (JSON Lines, see core/event_log.py)
+POWER_LOG_PATH = "data/power_alerts.jsonl"
+power_log = event_log.EventLog(POWER_LOG_PATH)
+
+_lock = threading.Lock()
+_samples = deque(maxlen=RATE_SAMPLES)
+_armed = {BATTERY_LOW_THRESHOLD: True, BATTERY_CRITICAL_THRESHOLD: True}
+_low_power = False
+_low_power_listeners = []
+psutil = None   # imported on first check, so importing this module needs no psutil
+
+# ---------------------------------------
+# Low-power mode hook
+# ---------------------------------------
+def on_low_power(callback):
+    """
+    Registers callback(enabled) to run whenever low-power mode turns on or off.
+    """
+    _low_power_listeners.append(callback)
+
+def is_low_power():
+    return _low_power
+
+def _set_low_power(enabled):
+    global _low_power
+    if enabled == _low_power:
+        return
+    _low_power = enabled
+    print("🔋 Low-power mode on." if enabled else "🔌 Low-power mode off.")
+    for callback in list(_low_power_listeners):
+        try:
+            callback(enabled)
+        except Exception as e:
+            print("Low-power listener error:", e)
+
+# ---------------------------------------
+# Discharge tracking
+# ---------------------------------------
+def discharge_rate():
+    """
+    Returns the recent discharge rate in percent per hour (positive while
+    draining), from a least-squares fit over the last readings, or None.
+    """
+    with _lock:
+        samples = list(_samples)
+    if len(samples) < 2 or samples[-1][0] - samples[0][0] < 60:
+        return None
+    n = len(samples)
+    mean_t = sum(t for t, _ in samples) / n
+    mean_p = sum(p for _, p in samples) / n
+    var = sum((t - mean_t) ** 2 for t, _ in samples)
+    if var == 0:
+        return None
+    slope = sum((t - mean_t) * (p - mean_p) for t, p in samples) / var   # percent per second
+    return -slope * 3600
+
+def time_to_empty(percent=None):
+    """
+    Returns the predicted seconds until the battery is empty, or None if
+    it is not draining or there is not enough data yet.
+    """
+    rate = discharge_rate()
+    if not rate or rate <= 0:
+        return None
+    if percent is None:
+        with _lock:
+            if not _samples:
+                return None
+            percent = _samples[-1][1]
+    return percent / rate * 3600
+
+def next_interval(percent, plugged):
+    """
+    Seconds to wait before the next check: rarely while charging or high,
+    more often as the level falls.
+    """
+    if plugged:
+        return POLL_PLUGGED
+    if percent > 50:
+        return POLL_HIGH
+    if percent > BATTERY_LOW_THRESHOLD:
+        return POLL_MEDIUM
+    return POLL_LOW
 
 # ---------------------------------------
 # Check battery and send alert if low
 # ---------------------------------------
+def _import_psutil():
+    global psutil
+    if psutil is None:
+        import psutil as _psutil
+        psutil = _psutil
+    return psutil
+
 def check_battery():
     """
-    Checks battery level every few minutes. If low, sends an alert message.
+    Reads the battery, alerts once per threshold crossing and updates
+    low-power mode. Returns the number of seconds until the next check.
     """
     try:
-        battery = psutil.sensors_battery()
-        if battery is None:
-            return  # No battery sensor
-        if battery.percent <= BATTERY_LOW_THRESHOLD and not battery.power_plugged:
-            send_message("Device battery low. Please check on Neo's owner.")
+        battery = _import_psutil().sensors_battery()
     except Exception as e:
         print("Battery check error:", e)
+        return POLL_NO_BATTERY
+    if battery is None:
+        return POLL_NO_BATTERY  # No battery sensor
+
+    percent, plugged = battery.percent, battery.power_plugged
+    now = time.time()
+    crossed = []
+    with _lock:
+        if plugged:
+            _samples.clear()   # the discharge rate starts over after charging
+        else:
+            _samples.append((now, percent))
+
+        for threshold in sorted(_armed):
+            if _armed[threshold] and not plugged and percent <= threshold:
+                _armed[threshold] = False
+                crossed.append(threshold)
+            elif plugged or percent >= threshold + HYSTERESIS:
+                _armed[threshold] = True
+
+    if crossed:
+        # One message for the most severe threshold crossed this time
+        if min(crossed) <= BATTERY_CRITICAL_THRESHOLD:
+            msg = f"Device battery critical ({percent:.0f}%). Neo may shut down soon. Please check on Neo's owner."
+            spoken = "Critical battery alert recorded."
+        else:
+            msg = f"Device battery low ({percent:.0f}%). Please check on Neo's owner."
+            spoken = "Power alert recorded."
+        remaining = time_to_empty(percent)
+        if remaining:
+            msg += f" About {remaining / 60:.0f} minutes left."
+        send_message(msg, spoken)
+
+    if not plugged and percent <= LOW_POWER_THRESHOLD:
+        _set_low_power(True)
+    elif plugged or percent >= LOW_POWER_THRESHOLD + HYSTERESIS:
+        _set_low_power(False)
+
+    return next_interval(percent, plugged)
 
 # ---------------------------------------
 # Simulate message sending (offline)
 # ---------------------------------------
-def send_message(msg):
+def send_message(msg, spoken="Power alert recorded."):
     """
-    In real app, this would send SMS via phone API. Here we log the message.
+    In real app, this would send SMS via phone API. Here we log the message
+    and tell Sir with the `spoken` line.
     """
-    os.makedirs("data", exist_ok=True)
-    log_path = "data/power_alerts.log"
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(time.ctime() + " | " + msg + "\n")
+    power_log.write("power_alert", message=msg)
     print(f"📩 Alert message saved: {msg}")
-    speech_io.speak("Power alert recorded.")
+    speech_scheduler.say(spoken, speech_scheduler.PRIORITY_STATUS)
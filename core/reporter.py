@@ -1,29 +1,99 @@
-import os, json
-from core import speech_io, learner
+from concurrent.futures import ThreadPoolExecutor
+from core import speech_io, speech_scheduler, learner, message_store, review_queue
 
-MESSAGES_DIR = "data/messages"
+# Synthesizes the next report line while the current one plays
+_prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-tts")
 
+def speak(text):
+    return speech_scheduler.say(text, speech_scheduler.PRIORITY_SIR)
+
+def _prefetch(text):
+    def _synth():
+        try:
+            speech_io.synthesize(text, keep=True)
+        except Exception as e:
+            print("Report prefetch error:", e)
+    _prefetcher.submit(_synth)
+
+# ---------------------------------------
+# Report items
+# ---------------------------------------
+def report_items():
+    """
+    Lazily yields (text, message) pairs for everything not yet reported,
+    grouped by caller. A caller with several messages gets a headline
+    first (message is None for headlines).
+    """
+    for group in message_store.unread_summary():
+        name = group["name"]
+        if group["count"] > 1:
+            yield f"{name} called {group['count']} times.", None
+        for data in message_store.iter_unread(group["number"], caller_name=name):
+            msg = data["message"]
+            if data["unreadable"]:
+                phrase = f"{name} left a message I can no longer read."
+            elif not msg:
+                phrase = f"{name} called but left no message."
+            else:
+                phrase = learner.get_report_phrase(msg) or f"{name} said: {msg}"
+            yield phrase, data
+
+# ---------------------------------------
+# Give report
+# ---------------------------------------
 def give_report():
-    if not os.path.exists(MESSAGES_DIR):
-        speech_io.speak("No messages yet, Sir.")
+    """
+    Speaks every new message, grouped by caller, and marks each one as
+    delivered once spoken. Only unread messages are read from the store,
+    and the next line is synthesized while the current one plays.
+    """
+    summary = message_store.unread_summary()
+    if not summary:
+        speak("No new messages to report, Sir.").result()
         return
 
-    files = sorted(os.listdir(MESSAGES_DIR))
-    if not files:
-        speech_io.speak("No new messages to report, Sir.")
-        return
+    total = sum(group["count"] for group in summary)
+    plural = "s" if total != 1 else ""
+    callers = "caller" if len(summary) == 1 else "callers"
+    speak(f"You have {total} new message{plural} from {len(summary)} {callers}, Sir.")
+
+    items = report_items()
+    current = next(items, None)
+    if current:
+        _prefetch(current[0])
+    while current is not None:
+        upcoming = next(items, None)
+        if upcoming:
+            _prefetch(upcoming[0])
+
+        phrase, data = current
+        speak(phrase).result()
+        print(f"🗒 {phrase}")
+        if data is not None:
+            message_store.mark_read([data["id"]])
+            if data["message"]:
+                request_correction(data["message"])
+        current = upcoming
+
+# ---------------------------------------
+# Corrections (answered later through the review queue)
+# ---------------------------------------
+TEACH_PREFIX = "you have to say"
+
+def request_correction(message_text):
+    """
+    Queues a reported message so Sir can correct its phrasing later,
+    by voice, CLI or the review API, without holding up the report.
+    """
+    return review_queue.submit("correction", f"Reported: {message_text}. Any correction?",
+                               {"message": message_text})
+
+def _apply_correction(answer, context):
+    phrase = answer.strip()
+    if phrase.lower().startswith(TEACH_PREFIX):
+        phrase = phrase[len(TEACH_PREFIX):].strip(": ")
+    if phrase:
+        learner.learn_report_phrase(context["message"], phrase)
+        print("✅ Learned new report phrasing.")
 
-    for file in files:
-        with open(os.path.join(MESSAGES_DIR, file), "r", encoding="utf-8") as f:
-            data = json.load(f)
-        caller = data["caller"]["name"]
-        msg = data["message"]
-        report_phrase = learner.get_report_phrase(msg) or f"{caller} said: {msg}"
-        speech_io.speak(report_phrase)
-        print(f"🗒 {report_phrase}")
-
-        correction = input("Sir, any correction? (type 'you have to say...' or Enter): ").strip()
-        if correction.lower().startswith("you have to say"):
-            new_phrase = correction.replace("you have to say", "").strip(": ")
-            learner.learn_report_phrase(msg, new_phrase)
-            print("✅ Learned new report phrasing.")
+review_queue.register("correction", _apply_correction)
@@ -0,0 +1,176 @@
+# core/response_catalog.py
+# What Neo says to callers, loaded from resources/responses.json. The file
+# maps each condition to a list of interchangeable replies, plus a
+# "prompts" section with the fixed lines of a call ("{condition}" is filled
+# in). Edits to the file are picked up while Neo runs.
+
+import json
+import os
+import random
+import threading
+import time
+
+RESPONSES_FILE = "resources/responses.json"
+RELOAD_CHECK = 2.0   # seconds between checks for a changed file
+PROMPTS_KEY = "prompts"
+
+# Keys older responses.json files used, and the condition each one means.
+# Their replies are added to that condition instead of becoming conditions
+# of their own (the detector never reports "no_user").
+LEGACY_KEYS = {
+    "no_user": "away",
+    "unknown_condition": "unknown",
+}
+
+DEFAULT_RESPONSES = {
+    "sleeping": [
+        "Sir is sleeping right now. Can I take a message?",
+        "Sir is resting. Please leave your message.",
+        "Sir is currently asleep. Would you like to leave a message?",
+    ],
+    "away": [
+        "Sir is away at the moment. Leave a message?",
+        "Sir is not available currently. Can I record your message?",
+        "Sir is out. Please tell me your message.",
+        "Sir is busy. Do you want to leave a message?",
+        "Sir is not here. I can take a message.",
+        "Sir is currently occupied. Please leave a message.",
+        "Sir is away for now. Can I record your message?",
+        "Sir is not available. Would you like to leave a note?",
+        "Sir is not around. I can take your message.",
+        "Sir is away at the moment. Leave your message please.",
+    ],
+    "busy": [
+        "Sir is busy at the moment. Can I take your message?",
+        "He’s occupied right now. I’ll make sure he gets your message.",
+        "He’s in the middle of something. Want to leave a note?",
+    ],
+    "unknown": [
+        "Hello! I will take a message for you.",
+        "Hi! I can record your message for Sir.",
+        "Hello! Please tell me your message.",
+    ],
+    PROMPTS_KEY: {
+        "detected": "Detected that Sir is {condition}.",
+        "ask_message": "Please tell your message. Say 'end', 'finished', or 'complete' to stop.",
+        "recorded": "✅ Message recorded successfully. Goodbye!",
+    },
+}
+
+_lock = threading.Lock()
+_catalog = None
+_mtime = None
+_last_check = 0.0
+_listeners = []
+
+# ---------------------------------------
+# Loading
+# ---------------------------------------
+def ensure_file(path=RESPONSES_FILE):
+    """
+    Writes the default catalog if the file does not exist yet.
+    """
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(DEFAULT_RESPONSES, f, indent=4, ensure_ascii=False)
+
+def _read(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return DEFAULT_RESPONSES
+    except (OSError, ValueError) as e:
+        print("⚠️ Failed to read responses, keeping the previous ones:", e)
+        return None
+    # Anything missing from the file falls back to the defaults
+    prompts = dict(DEFAULT_RESPONSES[PROMPTS_KEY])
+    prompts.update(data.get(PROMPTS_KEY, {}))
+    catalog = {k: v for k, v in DEFAULT_RESPONSES.items() if k != PROMPTS_KEY}
+    catalog.update({k: list(v) for k, v in data.items()
+                    if k != PROMPTS_KEY and k not in LEGACY_KEYS and v})
+    for key, condition in LEGACY_KEYS.items():
+        if data.get(key):
+            catalog[condition] = list(dict.fromkeys(catalog[condition] + list(data[key])))
+    catalog[PROMPTS_KEY] = prompts
+    return catalog
+
+def reload_if_changed(path=RESPONSES_FILE, force=False):
+    """
+    Re-reads the file when its modification time changed (checked at most
+    every RELOAD_CHECK seconds). Returns True if the catalog was reloaded.
+    """
+    global _catalog, _mtime, _last_check
+    now = time.monotonic()
+    with _lock:
+        if not force and _catalog is not None and now - _last_check < RELOAD_CHECK:
+            return False
+        _last_check = now
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if not force and _catalog is not None and mtime == _mtime:
+            return False
+        catalog = _read(path)
+        if catalog is None:
+            _mtime = mtime
+            return False
+        first_load = _catalog is None
+        _catalog, _mtime = catalog, mtime
+    if not first_load:
+        print("🔁 Responses reloaded.")
+        for callback in list(_listeners):
+            try:
+                callback()
+            except Exception as e:
+                print("Responses listener error:", e)
+    return True
+
+def catalog():
+    reload_if_changed()
+    return _catalog
+
+def on_reload(callback):
+    """
+    Registers callback() to run after the file changed and was reloaded.
+    """
+    _listeners.append(callback)
+
+# ---------------------------------------
+# Lookups
+# ---------------------------------------
+def conditions():
+    return [k for k in catalog() if k != PROMPTS_KEY]
+
+def responses(condition):
+    """
+    Returns the replies for a condition, or the "unknown" ones.
+    """
+    current = catalog()
+    return current.get(condition) or current.get("unknown") or DEFAULT_RESPONSES["unknown"]
+
+def pick(condition):
+    return random.choice(responses(condition))
+
+def prompt(name, **fields):
+    text = catalog()[PROMPTS_KEY].get(name, "")
+    return text.format(**fields) if fields else text
+
+def all_lines():
+    """
+    Every line the catalog can produce (prompts filled in for each
+    condition), for pre-rendering.
+    """
+    current = catalog()
+    lines = []
+    for condition in conditions():
+        lines.extend(current[condition])
+    for text in current[PROMPTS_KEY].values():
+        if "{condition}" in text:
+            lines.extend(text.format(condition=c) for c in conditions())
+        else:
+            lines.append(text)
+    return list(dict.fromkeys(lines))
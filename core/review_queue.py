@@ -0,0 +1,490 @@
+# core/review_queue.py
+# Questions for Sir that must never hold up a call: "did Neo answer this
+# caller correctly?", "how should this message be phrased?". Each one is
+# stored as a pending review and can be answered later by voice (the
+# "review" command), from the command line (python -m core.review_queue)
+# or over the local HTTP API (off unless NEO_REVIEW_PORT is set; every
+# request needs the token in data/review_api.token). Unanswered reviews
+# expire after a timeout, falling back to their default answer if they
+# have one. Prompts, context and answers often quote or rephrase a
+# caller's message, so all of them are stored encrypted.
+
+import argparse
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from core import encryption
+
+DB_PATH = "data/reviews.db"
+REVIEW_TIMEOUT = 24 * 3600     # seconds a review stays open
+KEEP_CLOSED = 7 * 24 * 3600    # closed reviews are deleted after this long
+POLL_INTERVAL = 5              # seconds between expiry / apply passes
+APPLY_ATTEMPTS = 3             # handler runs before an answer is given up on
+REENCRYPT_BATCH = 100          # reviews re-encrypted per step after a key rotation
+SEALED_COLUMNS = ("prompt", "context", "answer", "default_answer")   # stored encrypted
+API_HOST = "127.0.0.1"
+API_PORT = int(os.environ.get("NEO_REVIEW_PORT", "0"))   # off by default; e.g. 8765 to enable
+API_TOKEN_FILE = "data/review_api.token"
+API_HOSTS = ("localhost", "127.0.0.1", "[::1]")   # Host headers accepted (against DNS rebinding)
+
+# Status of a review
+PENDING = "pending"      # waiting for Sir
+ANSWERED = "answered"    # answered, not applied yet (e.g. answered from another process)
+APPLYING = "applying"    # its handler is running
+DONE = "done"            # answer applied
+FAILED = "failed"        # the handler kept failing (see the error column)
+SKIPPED = "skipped"      # dismissed without an answer
+EXPIRED = "expired"      # timed out with no default
+
+_conn = None
+_lock = threading.RLock()
+_handlers = {}   # kind -> handler(answer, context)
+_worker = None
+_server = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind     TEXT NOT NULL,
+    prompt   TEXT NOT NULL,
+    context  TEXT NOT NULL,
+    status   TEXT NOT NULL DEFAULT 'pending',
+    answer   TEXT,
+    source   TEXT,
+    default_answer TEXT,
+    created  REAL NOT NULL,
+    expires  REAL NOT NULL,
+    closed   REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error    TEXT
+);
+CREATE INDEX IF NOT EXISTS reviews_status ON reviews (status, expires);
+"""
+
+# ---------------------------------------
+# Connection
+# ---------------------------------------
+def _connect():
+    global _conn
+    with _lock:
+        if _conn is None:
+            os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+            _conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+            _conn.row_factory = sqlite3.Row
+            _conn.execute("PRAGMA journal_mode=WAL")
+            _conn.execute("PRAGMA synchronous=NORMAL")
+            _conn.executescript(SCHEMA)
+            _upgrade(_conn)
+        return _conn
+
+
+def _upgrade(conn):
+    """
+    Adds columns that databases from older versions are missing.
+    """
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(reviews)")}
+    with conn:
+        if "attempts" not in columns:
+            conn.execute("ALTER TABLE reviews ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        if "error" not in columns:
+            conn.execute("ALTER TABLE reviews ADD COLUMN error TEXT")
+
+
+def close():
+    global _conn
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+
+
+def _seal(text):
+    return None if text is None else encryption.encrypt(text)
+
+
+def _unseal(data):
+    return None if data is None else encryption.decrypt_text(data)
+
+
+def _row_to_review(row):
+    return {
+        "id": row["id"],
+        "kind": row["kind"],
+        "prompt": _unseal(row["prompt"]),
+        "context": json.loads(_unseal(row["context"])),
+        "status": row["status"],
+        "answer": _unseal(row["answer"]),
+        "source": row["source"],
+        "error": row["error"],
+        "created": row["created"],
+        "expires": row["expires"],
+    }
+
+
+# ---------------------------------------
+# Handlers
+# ---------------------------------------
+def register(kind, handler):
+    """
+    Registers handler(answer, context) to apply answers to reviews of `kind`.
+    Answers only take effect in a process that registered a handler.
+    """
+    _handlers[kind] = handler
+
+
+# ---------------------------------------
+# Asking
+# ---------------------------------------
+def submit(kind, prompt, context=None, timeout=REVIEW_TIMEOUT, default=None):
+    """
+    Queues a question for Sir and returns its id right away. If nobody
+    answers within `timeout` seconds, `default` is applied (None = drop it).
+    """
+    now = time.time()
+    with _lock:
+        conn = _connect()
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO reviews (kind, prompt, context, default_answer, created, expires) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, _seal(prompt), _seal(json.dumps(context or {})), _seal(default), now, now + timeout))
+        return cur.lastrowid
+
+
+def get(review_id):
+    with _lock:
+        row = _connect().execute("SELECT * FROM reviews WHERE id = ?", (review_id,)).fetchone()
+    return _row_to_review(row) if row else None
+
+
+def pending(kind=None):
+    """
+    Returns the open reviews, oldest first.
+    """
+    expire_due()
+    sql = "SELECT * FROM reviews WHERE status = ?"
+    params = (PENDING,)
+    if kind is not None:
+        sql += " AND kind = ?"
+        params += (kind,)
+    with _lock:
+        rows = _connect().execute(sql + " ORDER BY created, id", params).fetchall()
+    return [_row_to_review(row) for row in rows]
+
+
+def count_pending():
+    with _lock:
+        return _connect().execute("SELECT COUNT(*) FROM reviews WHERE status = ?",
+                                  (PENDING,)).fetchone()[0]
+
+
+# ---------------------------------------
+# Answering
+# ---------------------------------------
+def answer(review_id, text, source="api"):
+    """
+    Answers an open review. Returns False if it was already closed.
+    """
+    text = (text or "").strip()
+    if not text:
+        return skip(review_id)
+    with _lock:
+        conn = _connect()
+        with conn:
+            cur = conn.execute("UPDATE reviews SET status = ?, answer = ?, source = ? "
+                               "WHERE id = ? AND status = ?",
+                               (ANSWERED, _seal(text), source, review_id, PENDING))
+    if not cur.rowcount:
+        return False
+    apply_answered()
+    return True
+
+
+def skip(review_id):
+    return _close(review_id, SKIPPED, (PENDING,))
+
+
+def _close(review_id, status, from_statuses):
+    marks = ",".join("?" * len(from_statuses))
+    with _lock:
+        conn = _connect()
+        with conn:
+            cur = conn.execute(f"UPDATE reviews SET status = ?, closed = ? "
+                               f"WHERE id = ? AND status IN ({marks})",
+                               (status, time.time(), review_id) + tuple(from_statuses))
+    return cur.rowcount > 0
+
+
+def _claim(review_id):
+    with _lock:
+        conn = _connect()
+        with conn:
+            cur = conn.execute("UPDATE reviews SET status = ? WHERE id = ? AND status = ?",
+                               (APPLYING, review_id, ANSWERED))
+    return cur.rowcount > 0
+
+
+def _failed(review_id, error):
+    """
+    Puts a review whose handler raised back to ANSWERED, so the next pass
+    retries it, or closes it as FAILED after APPLY_ATTEMPTS tries.
+    """
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute("UPDATE reviews SET attempts = attempts + 1, error = ?, "
+                         "status = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END, "
+                         "closed = CASE WHEN attempts + 1 >= ? THEN ? END WHERE id = ?",
+                         (str(error), APPLY_ATTEMPTS, FAILED, ANSWERED, APPLY_ATTEMPTS, time.time(),
+                          review_id))
+
+
+def apply_answered():
+    """
+    Runs the registered handler for every answered review of a known
+    kind. A review is only marked DONE once its handler returned; one that
+    raised is retried on the next pass. Returns the number applied.
+    """
+    if not _handlers:
+        return 0
+    marks = ",".join("?" * len(_handlers))
+    with _lock:
+        rows = _connect().execute(f"SELECT * FROM reviews WHERE status = ? AND kind IN ({marks}) "
+                                  f"ORDER BY id", (ANSWERED,) + tuple(_handlers)).fetchall()
+    applied = 0
+    for row in rows:
+        review = _row_to_review(row)
+        # Claim it first so two threads never apply the same answer
+        if not _claim(review["id"]):
+            continue
+        try:
+            _handlers[review["kind"]](review["answer"], review["context"])
+        except Exception as e:
+            print(f"Review #{review['id']} handler error:", e)
+            _failed(review["id"], e)
+            continue
+        _close(review["id"], DONE, (APPLYING,))
+        applied += 1
+    return applied
+
+
+def expire_due(now=None):
+    """
+    Closes reviews past their deadline (their default answer, if any, is
+    applied) and deletes long-closed ones.
+    """
+    now = time.time() if now is None else now
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute("UPDATE reviews SET status = ?, answer = default_answer, source = 'default' "
+                         "WHERE status = ? AND expires <= ? AND default_answer IS NOT NULL",
+                         (ANSWERED, PENDING, now))
+            conn.execute("UPDATE reviews SET status = ?, closed = ? "
+                         "WHERE status = ? AND expires <= ?", (EXPIRED, now, PENDING, now))
+            conn.execute("DELETE FROM reviews WHERE status IN (?, ?, ?, ?) AND closed < ?",
+                         (DONE, SKIPPED, EXPIRED, FAILED, now - KEEP_CLOSED))
+    apply_answered()
+
+
+# ---------------------------------------
+# Re-encryption after a key rotation
+# ---------------------------------------
+def _reencrypt_batch():
+    """
+    Re-encrypts up to REENCRYPT_BATCH reviews with a field still in
+    plaintext or under a retired key. Returns how many were done.
+    """
+    current = encryption.current_key_id()
+    # Bytes 5-8 of an encrypted field are its key id
+    stale = " OR ".join(f"({column} IS NOT NULL AND (typeof({column}) != 'blob' "
+                        f"OR substr({column}, 5, 4) != :key))" for column in SEALED_COLUMNS)
+    columns = ", ".join(SEALED_COLUMNS)
+    with _lock:
+        conn = _connect()
+        rows = conn.execute(f"SELECT id, {columns} FROM reviews WHERE {stale} LIMIT :limit",
+                            {"key": current, "limit": REENCRYPT_BATCH}).fetchall()
+        if rows:
+            with conn:
+                conn.executemany(f"UPDATE reviews SET {' = ?, '.join(SEALED_COLUMNS)} = ? WHERE id = ?",
+                                 [tuple(_seal(_unseal(row[column])) for column in SEALED_COLUMNS) + (row["id"],)
+                                  for row in rows])
+    return len(rows)
+
+encryption.register("review", _reencrypt_batch)
+
+
+# ---------------------------------------
+# Background worker
+# ---------------------------------------
+def start(api_port=API_PORT):
+    """
+    Starts the thread that expires old reviews and applies answers given
+    from other processes (the CLI), plus the local HTTP API.
+    """
+    global _worker
+    if _worker is not None:
+        return
+    with _lock:
+        conn = _connect()
+        with conn:
+            # Handlers that were running when the last process died
+            conn.execute("UPDATE reviews SET status = ? WHERE status = ?", (ANSWERED, APPLYING))
+
+    def _loop():
+        while True:
+            try:
+                expire_due()
+            except sqlite3.Error as e:
+                print("Review queue error:", e)
+            time.sleep(POLL_INTERVAL)
+
+    _worker = threading.Thread(target=_loop, daemon=True)
+    _worker.start()
+    if api_port:
+        start_api(port=api_port)
+
+
+# ---------------------------------------
+# Local HTTP API
+# ---------------------------------------
+# GET  /reviews            -> open reviews as JSON
+# POST /reviews/<id>       -> answer it; body {"answer": "..."} (empty = skip)
+# Every request needs "Authorization: Bearer <token>" with the token from
+# API_TOKEN_FILE, and POSTs must be application/json, so a web page in
+# Sir's browser can neither read the reviews nor answer them.
+def api_token():
+    """
+    Returns this install's API token, creating it (readable by the owner
+    only) on first use.
+    """
+    try:
+        with open(API_TOKEN_FILE, encoding="utf-8") as f:
+            token = f.read().strip()
+        if token:
+            return token
+    except FileNotFoundError:
+        pass
+    token = secrets.token_urlsafe(32)
+    os.makedirs(os.path.dirname(API_TOKEN_FILE) or ".", exist_ok=True)
+    fd = os.open(API_TOKEN_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+    return token
+
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    token = None   # set by start_api()
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _refused(self, json_body=False):
+        """
+        Replies with an error and returns True unless the request comes
+        to a local host name, carries the token and (for `json_body`) is JSON.
+        """
+        host = self.headers.get("Host", "")
+        if host.startswith("["):
+            host = host[:host.find("]") + 1]
+        else:
+            host = host.split(":")[0]
+        if host.lower() not in API_HOSTS:
+            self._reply(403, {"error": "forbidden host"})
+            return True
+        scheme, _, given = self.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(given.strip().encode(), self.token.encode()):
+            self._reply(401, {"error": "missing or wrong token"})
+            return True
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if json_body and content_type != "application/json":
+            self._reply(415, {"error": "expected application/json"})
+            return True
+        return False
+
+    def do_GET(self):
+        if self._refused():
+            return
+        if self.path.rstrip("/") != "/reviews":
+            return self._reply(404, {"error": "not found"})
+        self._reply(200, pending())
+
+    def do_POST(self):
+        if self._refused(json_body=True):
+            return
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] != "reviews" or not parts[1].isdigit():
+            return self._reply(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._reply(400, {"error": "invalid JSON"})
+        if not isinstance(body, dict):
+            return self._reply(400, {"error": "expected a JSON object"})
+        if answer(int(parts[1]), body.get("answer", ""), source="api"):
+            return self._reply(200, {"ok": True})
+        self._reply(409, {"error": "review is not open"})
+
+    def log_message(self, format, *args):
+        pass   # keep the console quiet
+
+
+def start_api(host=API_HOST, port=API_PORT):
+    """
+    Serves the review API on localhost in a daemon thread.
+    """
+    global _server
+    if _server is not None:
+        return _server
+    _ApiHandler.token = api_token()
+    try:
+        _server = ThreadingHTTPServer((host, port), _ApiHandler)
+    except OSError as e:
+        print(f"⚠️ Review API not started on {host}:{port}:", e)
+        return None
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    print(f"🗂 Review API listening on http://{host}:{port}/reviews (token in {API_TOKEN_FILE})")
+    return _server
+
+
+# ---------------------------------------
+# Command line
+# ---------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer Neo's pending reviews")
+    parser.add_argument("--list", action="store_true", help="only list open reviews")
+    parser.add_argument("--answer", nargs=2, metavar=("ID", "TEXT"), help="answer one review")
+    parser.add_argument("--skip", type=int, metavar="ID", help="dismiss one review")
+    parser.add_argument("--token", action="store_true", help="print the HTTP API token")
+    args = parser.parse_args()
+
+    if args.token:
+        print(api_token())
+    elif args.answer:
+        ok = answer(int(args.answer[0]), args.answer[1], source="cli")
+        print("✅ Answered." if ok else "⚠️ That review is not open.")
+    elif args.skip is not None:
+        print("✅ Skipped." if skip(args.skip) else "⚠️ That review is not open.")
+    else:
+        for review in pending():
+            print(f"#{review['id']} [{review['kind']}] {review['prompt']}")
+            if args.list:
+                continue
+            reply = input("Answer (Enter to skip, q to quit): ").strip()
+            if reply.lower() == "q":
+                break
+            if reply:
+                answer(review["id"], reply, source="cli")
+            else:
+                skip(review["id"])
@@ -1,97 +1,824 @@
 # core/speech_io.py
+import asyncio
+import json
 import queue
-import sounddevice as sd
-import numpy as np
-from vosk import Model, KaldiRecognizer
-from piper import PiperVoice
+import time
 import threading
 import os
+import re
+import shutil
+from collections import OrderedDict, deque
+from core import metrics, audio_bank, engine_host
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Audio libraries are optional: without them Neo runs on the null backend
+try:
+    if np is None:
+        raise ImportError("No module named 'numpy'")
+    import sounddevice as sd
+    from vosk import Model, KaldiRecognizer
+    from piper import PiperVoice
+    AUDIO_LIBS_ERROR = None
+except (ImportError, OSError) as e:   # sounddevice raises OSError without PortAudio
+    sd = Model = KaldiRecognizer = PiperVoice = None
+    AUDIO_LIBS_ERROR = e
 
 # ----------------------------
-# Load models
+# Models (loaded on first use)
 # ----------------------------
 VOSK_MODEL_PATH = "models/vosk_model"
 PIPER_MODEL_PATH = "models/piper_model/en_US-lessac-medium.onnx"
 
-if not os.path.exists(VOSK_MODEL_PATH):
-    raise FileNotFoundError("Vosk model not found. Download and place in models/vosk_model")
+class LazyModel:
+    """
+    Loads a model the first time it is needed. Safe to call from several
+    threads: the loader runs once and everyone else waits for it.
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.value = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        if self.value is None:
+            with self.lock:
+                if self.value is None:
+                    started = time.perf_counter()
+                    self.value = self.loader()
+                    print(f"🔊 {self.name} model loaded in {time.perf_counter() - started:.1f}s")
+        return self.value
+
+    def loaded(self):
+        return self.value is not None
+
+
+# With engine workers (core/engine_host.py) the models live in their own
+# processes; stt_model() then only returns the path the worker loaded and
+# tts_voice() a stand-in with the same interface as PiperVoice.
+def _load_vosk():
+    if engine_host.enabled():
+        engine_host.engine("stt").call("load_model", VOSK_MODEL_PATH)
+        return VOSK_MODEL_PATH
+    if not os.path.exists(VOSK_MODEL_PATH):
+        raise FileNotFoundError("Vosk model not found. Download and place in models/vosk_model")
+    return Model(VOSK_MODEL_PATH)
+
+def _load_piper():
+    if engine_host.enabled():
+        return engine_host.Voice(PIPER_MODEL_PATH)
+    if not os.path.exists(PIPER_MODEL_PATH):
+        raise FileNotFoundError("Piper TTS model not found. Download and place in models/piper_model")
+    return PiperVoice.load(PIPER_MODEL_PATH)
 
-if not os.path.exists(PIPER_MODEL_PATH):
-    raise FileNotFoundError("Piper TTS model not found. Download and place in models/piper_model")
+_stt_model = LazyModel("Vosk", _load_vosk)
+_tts_voice = LazyModel("Piper", _load_piper)
 
-# STT model
-stt_model = Model(VOSK_MODEL_PATH)
+def stt_model():
+    return _stt_model.get()
 
-# TTS model
-tts_voice = PiperVoice.load(PIPER_MODEL_PATH)
+def tts_voice():
+    return _tts_voice.get()
+
+def warm_up(background=True):
+    """
+    Loads both models ahead of the first call. Runs in a daemon thread
+    unless `background` is False. Does nothing on the null backend
+    (apart from clearing out the legacy TTS cache).
+    """
+    remove_legacy_cache()
+    if is_null_backend():
+        return None
+
+    def _warm():
+        for model in (_stt_model, _tts_voice):
+            try:
+                model.get()
+            except Exception as e:
+                print(f"⚠️ {model.name} warm-up failed:", e)
+
+    if not background:
+        _warm()
+        return None
+    t = threading.Thread(target=_warm, daemon=True)
+    t.start()
+    return t
 
 # ----------------------------
-# Audio Queue for STT
+# Null backend (headless use)
 # ----------------------------
-audio_q = queue.Queue()
+# NEO_AUDIO=null forces it; otherwise it is used when the audio libraries
+# are not installed. speak() only prints, and listening never hears anything
+# unless text is pushed in with inject().
+_null_backend = os.environ.get("NEO_AUDIO", "auto") == "null" or AUDIO_LIBS_ERROR is not None
+if _null_backend and AUDIO_LIBS_ERROR is not None and os.environ.get("NEO_AUDIO") != "null":
+    print(f"⚠️ Audio libraries unavailable ({AUDIO_LIBS_ERROR}); using the silent null backend.")
+
+def use_null_backend(enabled=True):
+    global _null_backend
+    _null_backend = enabled
+
+def is_null_backend():
+    return _null_backend
+
+def inject(text, kind="final"):
+    """
+    Delivers `text` to every listener as if it had been recognized.
+    """
+    _publish(kind, text)
+
+_speak_backend = None        # stand-ins installed with set_backend()
+_utterances_backend = None
+
+def set_backend(speak=None, utterances=None):
+    """
+    Replaces how Neo speaks and listens: speak(text, stop) and
+    utterances(partials, timeout, keywords, stop) stand in for the real
+    ones until set_backend() is called again without them. Used to run
+    Neo against scripted audio (benchmarks/ring_to_greeting.py).
+    """
+    global _speak_backend, _utterances_backend
+    _speak_backend = speak
+    _utterances_backend = utterances
+
+# ----------------------------
+# Microphone ring buffer
+# ----------------------------
+SAMPLE_RATE = 16000
+BLOCK_SIZE = 1600   # 100 ms per block, the VAD's time step
+RING_SECONDS = 30   # microphone history kept in memory
+
+class MicRing:
+    """
+    Preallocated int16 ring that the microphone callback writes into.
+    Any number of readers (recognizer, voicemail recorder, ...) follow it
+    independently; nothing is queued per reader, so memory stays fixed.
+    """
+
+    def __init__(self, seconds=RING_SECONDS, block=BLOCK_SIZE):
+        blocks = max(4, int(seconds * SAMPLE_RATE / block))
+        self.block = block
+        self.buffer = np.zeros(blocks * block, dtype=np.int16)
+        self.write_pos = 0   # total samples written
+        self.cond = threading.Condition()
+
+    def write(self, samples):
+        size = len(self.buffer)
+        n = min(len(samples), size)
+        samples = samples[-n:]
+        with self.cond:
+            start = self.write_pos % size
+            first = min(n, size - start)
+            self.buffer[start:start + first] = samples[:first]
+            self.buffer[:n - first] = samples[first:]
+            self.write_pos += n
+            self.cond.notify_all()
+
+    def reader(self):
+        return RingReader(self)
+
+
+class RingReader:
+    """
+    One consumer's position in a MicRing. read() returns a view into the
+    ring (no copy) whenever the block does not wrap around, which is always
+    the case for block-sized reads. A view stays valid until the ring laps
+    it (RING_SECONDS), so use it right away.
+    """
+
+    def __init__(self, ring):
+        self.ring = ring
+        self.pos = ring.write_pos
+        self.overruns = 0
+
+    def read(self, count=None, timeout=None):
+        """
+        Returns the next `count` samples (default one block), waiting up to
+        `timeout` seconds for them (None = forever). Returns None on timeout.
+        """
+        ring = self.ring
+        count = count or ring.block
+        size = len(ring.buffer)
+        with ring.cond:
+            if not ring.cond.wait_for(lambda: ring.write_pos - self.pos >= count, timeout):
+                return None
+            if ring.write_pos - self.pos > size - ring.block:
+                # Fell a whole ring behind: skip to the most recent half
+                self.pos = ring.write_pos - (size // 2 // ring.block) * ring.block
+                self.overruns += 1
+        start = self.pos % size
+        self.pos += count
+        if start + count <= size:
+            return ring.buffer[start:start + count]
+        return np.concatenate((ring.buffer[start:], ring.buffer[:start + count - size]))
+
+_mic_ring = None
+_ring_lock = threading.Lock()
+
+def mic_ring():
+    """
+    Returns the shared microphone ring (created on first use).
+    """
+    global _mic_ring
+    if _mic_ring is None:
+        with _ring_lock:
+            if _mic_ring is None:
+                _mic_ring = MicRing()
+    return _mic_ring
 
 def audio_callback(indata, frames, time, status):
-    """Callback from sounddevice to feed Vosk recognizer"""
+    """Callback from sounddevice: copies the block into the microphone ring"""
     if status:
         print(status)
-    audio_q.put(bytes(indata))
+    _mic_ring.write(np.frombuffer(indata, dtype=np.int16))
+
+# ----------------------------
+# Microphone capture service
+# ----------------------------
+# One input stream and one recognizer stay open for the life of the
+# process; the stream fills the microphone ring and the recognizer is one
+# of its readers. Every subscriber gets its own queue of ("partial" | "final", text)
+# events, so several listeners can follow the same conversation and nobody
+# sees audio captured before they subscribed.
+_mic_lock = threading.Lock()
+_mic_stream = None
+_mic_thread = None
+_subscribers = {}   # queue -> keyword phrases it needs, or None for full dictation
+_subscribers_lock = threading.Lock()
+
+def start_microphone():
+    """
+    Opens the shared microphone stream and recognizer thread (once).
+    """
+    global _mic_stream, _mic_thread
+    if is_null_backend():
+        return
+    ring = mic_ring()
+    with _mic_lock:
+        if _mic_stream is not None:
+            return
+        if _mic_thread is None or not _mic_thread.is_alive():
+            _mic_thread = threading.Thread(target=_recognizer_loop, args=(ring.reader(),), daemon=True)
+            _mic_thread.start()
+        _mic_stream = sd.RawInputStream(samplerate=SAMPLE_RATE, blocksize=BLOCK_SIZE, dtype='int16',
+                                        channels=1, callback=audio_callback)
+        _mic_stream.start()
+
+def stop_microphone():
+    """
+    Closes the shared microphone stream. The recognizer thread keeps waiting
+    and resumes when start_microphone() is called again.
+    """
+    global _mic_stream
+    with _mic_lock:
+        if _mic_stream is None:
+            return
+        _mic_stream.stop()
+        _mic_stream.close()
+        _mic_stream = None
+
+def _publish(kind, text):
+    with _subscribers_lock:
+        subscribers = list(_subscribers)
+    for q in subscribers:
+        q.put((kind, text))
+
+# ----------------------------
+# Voice activity detection
+# ----------------------------
+VAD_ENABLED = True
+SPEECH_FACTOR = 3.0      # speech = RMS this many times above the noise floor
+MIN_SPEECH_RMS = 300     # ... and at least this loud (int16 scale)
+NOISE_ADAPT = 0.05       # how fast the noise floor follows the room during silence
+NOISE_WINDOW = 5.0       # seconds of block levels the floor tracker looks back over
+NOISE_TRACK = 0.02       # how fast the floor rises towards that window's quietest block
+PRE_ROLL = 0.3           # seconds of audio kept from before speech starts
+END_SILENCE = 0.8        # trailing silence that ends an utterance
+MAX_UTTERANCE = 15.0     # utterances are cut off at this length
+
+class EnergyVad:
+    """
+    Energy-based voice activity detector over int16 blocks. The noise
+    floor adapts while nobody is talking, so a fan or a TV in the
+    background does not count as speech. It also follows the quietest
+    block of the last NOISE_WINDOW seconds (minimum statistics): real
+    speech has pauses, so if even the quietest block counts as "speech",
+    the room got louder and the floor rises slowly to match.
+    """
+
+    def __init__(self, factor=SPEECH_FACTOR, min_rms=MIN_SPEECH_RMS, adapt=NOISE_ADAPT,
+                 window=NOISE_WINDOW, track=NOISE_TRACK):
+        self.factor = factor
+        self.min_rms = min_rms
+        self.adapt = adapt
+        self.track = track
+        self.noise_floor = None
+        self.recent = deque(maxlen=max(1, int(window * SAMPLE_RATE / BLOCK_SIZE)))
+
+    def is_speech(self, samples):
+        x = samples.astype(np.float32)
+        rms = float(np.sqrt(np.mean(x * x))) if len(x) else 0.0
+        if self.noise_floor is None:
+            self.noise_floor = rms
+        self.recent.append(rms)
+        speech = rms > max(self.min_rms, self.noise_floor * self.factor)
+        if not speech:
+            self.noise_floor += self.adapt * (rms - self.noise_floor)
+        elif len(self.recent) == self.recent.maxlen:
+            quietest = min(self.recent)
+            if quietest > self.noise_floor:
+                self.noise_floor += self.track * (quietest - self.noise_floor)
+        return speech
+
+# ----------------------------
+# Keyword spotting
+# ----------------------------
+# While every listener only waits for fixed phrases (Sir's commands), the
+# recognizer runs on a Vosk grammar made of just those phrases, which costs
+# a fraction of open-vocabulary decoding. As soon as anyone needs free
+# speech (a caller's message, listen()), the next utterance is decoded in full.
+KEYWORD_SPOTTING = True
+UNKNOWN_WORD = "[unk]"
+
+def words(text):
+    """
+    Splits text into lowercase words, dropping punctuation.
+    """
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+def find_phrase(text, phrases):
+    """
+    Looks for the first of `phrases` that occurs in `text` on word
+    boundaries ("end" matches "the end" but not "weekend").
+    Returns (phrase, text before it, text after it), or None.
+    """
+    tokens = words(text)
+    for phrase in phrases:
+        target = words(phrase)
+        n = len(target)
+        for i in range(len(tokens) - n + 1):
+            if n and tokens[i:i + n] == target:
+                return phrase, " ".join(tokens[:i]), " ".join(tokens[i + n:])
+    return None
+
+def _vocabulary():
+    """
+    Returns what the recognizer must be able to hear: None for full
+    dictation, otherwise the set of keyword phrases (empty = nobody listens).
+    """
+    with _subscribers_lock:
+        wanted = list(_subscribers.values())
+    if not KEYWORD_SPOTTING or any(keywords is None for keywords in wanted):
+        return None
+    return frozenset().union(*wanted)
+
+def _clean(text):
+    return " ".join(w for w in text.split() if w != UNKNOWN_WORD)
+
+def _new_recognizer(grammar=None):
+    if engine_host.enabled():
+        return engine_host.Recognizer(VOSK_MODEL_PATH, SAMPLE_RATE, grammar)
+    return KaldiRecognizer(stt_model(), SAMPLE_RATE, *([grammar] if grammar else []))
+
+def _accept(rec, samples):
+    # Vosk takes bytes; the engine worker proxy copies the ring view
+    # straight into shared memory instead
+    return rec.AcceptWaveform(samples if engine_host.enabled() else samples.tobytes())
+
+def _feed(rec, samples):
+    """
+    Accepts one block and returns (utterance ended, Result() or
+    PartialResult() JSON). With an engine worker that is one round trip
+    per block instead of two.
+    """
+    if engine_host.enabled():
+        return rec.feed(samples)
+    if rec.AcceptWaveform(samples.tobytes()):
+        return True, rec.Result()
+    return False, rec.PartialResult()
+
+def _recognizer_loop(reader):
+    full_rec = None
+    keyword_rec, keyword_vocab = None, None
+
+    def _pick_recognizer():
+        nonlocal full_rec, keyword_rec, keyword_vocab
+        vocab = _vocabulary()
+        if vocab is None:
+            if full_rec is None:
+                full_rec = _new_recognizer()
+            return full_rec
+        if not vocab:
+            return None
+        if vocab != keyword_vocab:
+            if hasattr(keyword_rec, "close"):
+                keyword_rec.close()   # frees it in the engine worker
+            grammar = json.dumps(sorted(vocab) + [UNKNOWN_WORD])
+            keyword_rec, keyword_vocab = _new_recognizer(grammar), vocab
+        return keyword_rec
+
+    def _to_dictation(blocks):
+        # Someone started dictating mid-utterance: decode it again in full
+        nonlocal full_rec
+        keyword_rec.Reset()
+        if full_rec is None:
+            full_rec = _new_recognizer()
+        for block in blocks:
+            _accept(full_rec, block)
+        return full_rec
+
+    rec = None
+    vad = EnergyVad()
+    block_seconds = BLOCK_SIZE / SAMPLE_RATE
+    pre_roll = deque(maxlen=max(1, int(PRE_ROLL / block_seconds)))
+    heard = []   # blocks of the current keyword-spotted utterance (ring views)
+    in_utterance = False
+    utterance_length = 0.0
+    silence = 0.0
+    last_partial = ""
+
+    def _finish(result_json):
+        nonlocal last_partial
+        text = _clean(json.loads(result_json).get("text", ""))
+        last_partial = ""
+        if text:
+            _publish("final", text)
+
+    while True:
+        data = reader.read()
+        speech = vad.is_speech(data) if VAD_ENABLED else True
+
+        try:
+            if not in_utterance:
+                # The recognizer (keyword or full) is chosen per utterance
+                rec = _pick_recognizer() if speech else None
+                if rec is None:
+                    pre_roll.append(data)   # idle or nobody listening: no decoding at all
+                    continue
+                in_utterance, utterance_length, silence = True, 0.0, 0.0
+                heard = list(pre_roll) + [data] if rec is keyword_rec else []
+                for block in pre_roll:
+                    _accept(rec, block)
+                pre_roll.clear()
+            elif rec is keyword_rec:
+                if _vocabulary() is None:
+                    rec = _to_dictation(heard)
+                    heard = []
+                else:
+                    heard.append(data)
+
+            utterance_length += block_seconds
+            silence = 0.0 if speech else silence + block_seconds
+
+            ended, result = _feed(rec, data)
+            if ended:
+                _finish(result)
+                in_utterance = False
+                continue
+            partial = _clean(json.loads(result).get("partial", ""))
+            if partial and partial != last_partial:
+                last_partial = partial
+                _publish("partial", partial)
+
+            if VAD_ENABLED and (silence >= END_SILENCE or utterance_length >= MAX_UTTERANCE):
+                _finish(rec.FinalResult())
+                rec.Reset()
+                in_utterance = False
+        except engine_host.EngineError as e:
+            # The recognizer worker failed and is being restarted; this utterance is lost
+            print("Speech recognition error:", e)
+            in_utterance, last_partial = False, ""
+            pre_roll.clear()
+
+def subscribe(keywords=None):
+    """
+    Registers a new listener and returns its event queue. A listener that
+    passes `keywords` (phrases) only needs those to be recognized, which
+    lets the recognizer fall back to cheap keyword spotting.
+    """
+    q = queue.Queue()
+    set_keywords(q, keywords)
+    return q
+
+def set_keywords(q, keywords):
+    """
+    Changes the phrases a subscriber needs (None = full dictation). The
+    keyword grammar is rebuilt from the next utterance on.
+    """
+    with _subscribers_lock:
+        _subscribers[q] = None if keywords is None else frozenset(" ".join(words(k)) for k in keywords)
+
+def unsubscribe(q):
+    with _subscribers_lock:
+        _subscribers.pop(q, None)
+
+STOP_POLL = 0.25   # seconds between checks of utterances(stop=...)
+
+def utterances(partials=False, timeout=None, keywords=None, stop=None):
+    """
+    Yields (kind, text) tuples from the shared microphone, where kind is
+    "partial" or "final". Partial results are only yielded if `partials` is
+    True. Stops after `timeout` seconds without any event (None = never),
+    or as soon as `stop()` returns True (checked every STOP_POLL seconds).
+    With `keywords`, only those phrases are guaranteed to be recognized
+    (see subscribe()).
+    """
+    if _utterances_backend is not None:
+        yield from _utterances_backend(partials, timeout, keywords, stop)
+        return
+    start_microphone()
+    q = subscribe(keywords)
+    last_event = time.monotonic()
+    try:
+        while True:
+            wait = timeout
+            if timeout is not None:
+                wait = last_event + timeout - time.monotonic()
+                if wait <= 0:
+                    return
+            if stop is not None:
+                if stop():
+                    return
+                wait = STOP_POLL if wait is None else min(wait, STOP_POLL)
+            try:
+                kind, text = q.get(timeout=wait)
+            except queue.Empty:
+                continue
+            last_event = time.monotonic()
+            if kind == "partial" and not partials:
+                continue
+            yield kind, text
+    finally:
+        unsubscribe(q)
+
+async def async_utterances(partials=False, timeout=None):
+    """
+    Async iterator version of utterances() for asyncio callers.
+    """
+    loop = asyncio.get_running_loop()
+    gen = utterances(partials=partials, timeout=timeout)
+    sentinel = object()
+    try:
+        while True:
+            item = await loop.run_in_executor(None, next, gen, sentinel)
+            if item is sentinel:
+                return
+            yield item
+    finally:
+        gen.close()
 
 # ----------------------------
 # STT: Listen and return text
 # ----------------------------
+@metrics.timed("listen", "Time spent in listen()")
 def listen(duration=5):
     """
-    Listens from microphone for `duration` seconds and returns recognized text.
-    """
-    rec = KaldiRecognizer(stt_model, 16000)
-    text = ""
-
-    def _listen_thread():
-        with sd.RawInputStream(samplerate=16000, blocksize=8000, dtype='int16',
-                               channels=1, callback=audio_callback):
-            nonlocal text
-            rec.AcceptWaveform(b"")  # Reset
-            for _ in range(int(duration * 16000 / 8000)):
-                data = audio_q.get()
-                if rec.AcceptWaveform(data):
-                    result = rec.Result()
-                    result_json = eval(result)  # dict format
-                    text += result_json.get("text", "") + " "
-            # Get final partial result
-            final = rec.FinalResult()
-            final_json = eval(final)
-            text += final_json.get("text", "")
-
-    t = threading.Thread(target=_listen_thread)
-    t.start()
-    t.join()
+    Listens from microphone and returns the first complete utterance,
+    as soon as the speaker pauses. `duration` is the longest it waits;
+    if it runs out mid-sentence, the text decoded so far is returned.
+    """
+    start_microphone()
+    q = subscribe()
+    partial = ""
+    deadline = time.monotonic() + duration
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                kind, text = q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if kind == "final":
+                return text.strip()
+            partial = text
+    finally:
+        unsubscribe(q)
 
-    return text.strip()
+    # Whatever was still being decoded when time ran out
+    return partial.strip()
 
 # ----------------------------
-# TTS: Speak text
+# TTS: Playback ring buffer
 # ----------------------------
-def speak(text):
+PLAYBACK_BUFFER_SECONDS = 10
+
+class RingPlayer:
     """
-    Neo speaks the text using offline Piper TTS
+    Long-lived output stream fed from a float32 ring buffer. Writers push
+    samples as soon as they are synthesized; the sounddevice callback drains
+    them and plays silence when the buffer runs dry.
     """
-    if not text:
+
+    def __init__(self, sample_rate, seconds=PLAYBACK_BUFFER_SECONDS):
+        self.sample_rate = sample_rate
+        self.buffer = np.zeros(int(sample_rate * seconds), dtype=np.float32)
+        self.read_pos = 0    # total samples played
+        self.write_pos = 0   # total samples written
+        self.generation = 0  # bumped by clear() to abort pending writes
+        self.cond = threading.Condition()
+        self.stream = sd.OutputStream(samplerate=sample_rate, channels=1, dtype='float32',
+                                      callback=self._callback)
+        self.stream.start()
+
+    def _callback(self, outdata, frames, time, status):
+        if status:
+            print(status)
+        out = outdata[:, 0]
+        with self.cond:
+            available = min(frames, self.write_pos - self.read_pos)
+            start = self.read_pos % len(self.buffer)
+            first = min(available, len(self.buffer) - start)
+            out[:first] = self.buffer[start:start + first]
+            out[first:available] = self.buffer[:available - first]
+            out[available:] = 0
+            self.read_pos += available
+            self.cond.notify_all()
+
+    def write(self, samples):
+        """
+        Queues samples for playback, blocking while the buffer is full.
+        Returns False if clear() was called before everything was queued.
+        """
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        size = len(self.buffer)
+        offset = 0
+        with self.cond:
+            generation = self.generation
+            while offset < len(samples):
+                if self.generation != generation:
+                    return False
+                free = size - (self.write_pos - self.read_pos)
+                if free == 0:
+                    self.cond.wait()
+                    continue
+                n = min(free, len(samples) - offset)
+                start = self.write_pos % size
+                first = min(n, size - start)
+                self.buffer[start:start + first] = samples[offset:offset + first]
+                self.buffer[:n - first] = samples[offset + first:offset + n]
+                self.write_pos += n
+                offset += n
+        return True
+
+    def drain(self):
+        """Blocks until everything written so far has been played."""
+        with self.cond:
+            while self.read_pos < self.write_pos:
+                self.cond.wait()
+
+    def clear(self):
+        """Drops anything not yet played and aborts blocked writers."""
+        with self.cond:
+            self.write_pos = self.read_pos
+            self.generation += 1
+            self.cond.notify_all()
+
+_player = None
+_player_lock = threading.Lock()
+
+def get_player():
+    global _player
+    with _player_lock:
+        if _player is None:
+            _player = RingPlayer(tts_voice().config.sample_rate)
+        return _player
+
+# ----------------------------
+# TTS: Synthesis cache
+# ----------------------------
+TTS_CACHE_SIZE = 64          # utterances kept in memory
+TTS_CACHE_MAX_CHARS = 200    # longer texts are never cached
+# Synthesized speech is only cached in memory: much of it repeats what
+# callers said, and fixed phrases are already on disk in the audio bank.
+LEGACY_TTS_CACHE_DIR = "data/tts_cache"   # removed on startup (see warm_up)
+
+_tts_cache = OrderedDict()
+_tts_cache_lock = threading.Lock()
+
+def _cache_get(text):
+    with _tts_cache_lock:
+        audio = _tts_cache.get(text)
+        if audio is not None:
+            _tts_cache.move_to_end(text)
+        return audio
+
+def _cache_put(text, audio, keep=False):
+    if len(text) > TTS_CACHE_MAX_CHARS and not keep:
         return
+    with _tts_cache_lock:
+        _tts_cache[text] = audio
+        _tts_cache.move_to_end(text)
+        while len(_tts_cache) > TTS_CACHE_SIZE:
+            _tts_cache.popitem(last=False)
 
-    # Generate audio (AudioChunk generator)
-    audio_gen = tts_voice.synthesize(text)
+def remove_legacy_cache():
+    """
+    Deletes the on-disk TTS cache older versions kept (unencrypted audio
+    of report lines, among others).
+    """
+    if os.path.isdir(LEGACY_TTS_CACHE_DIR):
+        shutil.rmtree(LEGACY_TTS_CACHE_DIR, ignore_errors=True)
+        print("🧹 Removed the old on-disk speech cache.")
 
-    # Convert to NumPy float32 array
-    audio = np.concatenate([
-        chunk.audio_float_array for chunk in audio_gen
-    ])
+def render(text):
+    """
+    Synthesizes `text` with Piper, bypassing every cache.
+    """
+    return np.concatenate([chunk.audio_float_array for chunk in tts_voice().synthesize(text)])
 
-    # Get sample rate directly from Piper config
-    sample_rate = tts_voice.config.sample_rate
+def _prerendered(text):
+    """
+    Returns the audio for `text` from the audio bank or the TTS cache, or None.
+    """
+    audio = audio_bank.lookup(text, PIPER_MODEL_PATH)
+    if audio is None:
+        audio = _cache_get(text)
+    return audio
+
+def synthesize(text, keep=False):
+    """
+    Returns the full float32 audio for `text`, from the audio bank or the
+    cache when possible. With `keep`, long texts are cached in memory too,
+    so a speak() that follows shortly (e.g. the next report item) starts
+    instantly. Returns None on the null backend.
+    """
+    if is_null_backend():
+        return None
+    audio = _prerendered(text)
+    if audio is None:
+        audio = render(text)
+        _cache_put(text, audio, keep=keep)
+    return audio
+
+def preload(phrases):
+    """
+    Synthesizes fixed phrases ahead of time so speaking them starts instantly.
+    """
+    if is_null_backend():
+        return
+    for text in phrases:
+        if text and len(text) <= TTS_CACHE_MAX_CHARS:
+            synthesize(text)
+
+# ----------------------------
+# TTS: Speak text
+# ----------------------------
+_speaking = threading.Event()   # stop event of the utterance being played
+
+def interrupt(stop=None):
+    """
+    Stops the utterance currently being spoken, if any. Pass the `stop`
+    event given to speak() to stop that utterance even if its playback
+    has not started yet.
+    """
+    (stop or _speaking).set()
+    if _player is not None:
+        _player.clear()
+
+@metrics.timed("speak", "Synthesis plus playback of one utterance")
+def speak(text, stop=None):
+    """
+    Neo speaks the text using offline Piper TTS.
+    Playback starts with the first synthesized chunk. `stop` is this
+    utterance's own threading.Event: once it is set (by interrupt()),
+    playback ends, or never starts. Returns False if it was cut short.
+    """
+    global _speaking
+    stop = stop or threading.Event()
+    _speaking = stop
+    if stop.is_set():
+        return False
+    if not text:
+        return True
+    if _speak_backend is not None:
+        return _speak_backend(text, stop)
+    if is_null_backend():
+        print(f"🔇 Neo says: {text}")
+        return True
 
-    # Play generated speech
-    sd.play(audio, samplerate=sample_rate)
-    sd.wait()
+    player = get_player()
+    audio = _prerendered(text)   # bank audio is played straight from the mapped file
+    if audio is not None:
+        if not player.write(audio):
+            return False
+    else:
+        parts = []
+        for chunk in tts_voice().synthesize(text):
+            samples = chunk.audio_float_array
+            if stop.is_set() or not player.write(samples):
+                return False
+            parts.append(samples)
+        if parts:
+            _cache_put(text, np.concatenate(parts))
+    player.drain()
+    return not stop.is_set()
 
 # ----------------------------
 # Example usage
@@ -0,0 +1,173 @@
+# core/speech_scheduler.py
+
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future
+from core import speech_io
+
+# ---------------------------------------
+# Priority levels (lower = more urgent)
+# ---------------------------------------
+PRIORITY_ALERT = 0
+PRIORITY_CALLER = 1
+PRIORITY_SIR = 2
+PRIORITY_STATUS = 3
+
+_queue = []              # heap of (priority, seq, utterance)
+_pending = {}            # text -> utterance waiting in the queue
+_cond = threading.Condition()
+_counter = itertools.count()
+_current = None
+_worker = None
+_listeners = []
+
+# Utterance events, see add_listener()
+QUEUED = "queued"
+STARTED = "started"
+
+
+class Utterance:
+    def __init__(self, text, priority):
+        self.text = text
+        self.priority = priority
+        self.seq = next(_counter)
+        self.future = Future()
+        self.stale = False      # superseded heap entry, skip when popped
+        self.stop = threading.Event()   # set to cut this utterance short, see speech_io.speak
+
+
+# ---------------------------------------
+# Public API
+# ---------------------------------------
+def say(text, priority=PRIORITY_STATUS):
+    """
+    Queues `text` to be spoken and returns immediately with a Future that
+    resolves once it has been played. Duplicate pending texts are coalesced
+    into one utterance; a more urgent utterance interrupts a less urgent one,
+    which is then played again afterwards.
+    """
+    if not text:
+        future = Future()
+        future.set_result(True)
+        return future
+
+    _ensure_worker()
+    with _cond:
+        existing = _pending.get(text)
+        if existing is not None:
+            if priority < existing.priority:
+                # Re-queue at the more urgent level, keep the same future
+                existing.stale = True
+                bumped = Utterance(text, priority)
+                bumped.future = existing.future
+                _push(bumped)
+            _notify(QUEUED, existing)
+            return existing.future
+
+        utterance = Utterance(text, priority)
+        _push(utterance)
+        _notify(QUEUED, utterance)
+        if _current is not None and priority < _current.priority:
+            speech_io.interrupt(_current.stop)
+        return utterance.future
+
+
+def speak(text, priority=PRIORITY_STATUS):
+    """
+    Blocking helper: queues `text` and waits until it has been spoken.
+    """
+    return say(text, priority).result()
+
+
+def pending_count():
+    with _cond:
+        return len(_pending)
+
+
+def wait_idle(timeout=None):
+    """
+    Blocks until nothing is queued or playing. Returns False on timeout.
+    """
+    with _cond:
+        return _cond.wait_for(lambda: not _pending and _current is None, timeout)
+
+
+def add_listener(callback):
+    """
+    Registers callback(event, text, future): QUEUED whenever say() queues
+    text, also when it joins an identical pending utterance (on the
+    caller's thread, under the scheduler lock, so it always comes before
+    STARTED), and STARTED right before the utterance plays (on the
+    worker). Keep it quick and do not call say() from it.
+    """
+    _listeners.append(callback)
+
+
+def _notify(event, utterance):
+    for callback in _listeners:
+        try:
+            callback(event, utterance.text, utterance.future)
+        except Exception as e:
+            print("Speech listener error:", e)
+
+
+# ---------------------------------------
+# Worker
+# ---------------------------------------
+def _push(utterance):
+    _pending[utterance.text] = utterance
+    heapq.heappush(_queue, (utterance.priority, utterance.seq, utterance))
+    _cond.notify()
+
+
+def _copy_result(source, target):
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+def _ensure_worker():
+    global _worker
+    with _cond:
+        if _worker is None:
+            _worker = threading.Thread(target=_run, daemon=True)
+            _worker.start()
+
+
+def _run():
+    global _current
+    while True:
+        with _cond:
+            while not _queue:
+                _cond.wait()
+            _, _, utterance = heapq.heappop(_queue)
+            if utterance.stale:
+                continue
+            _pending.pop(utterance.text, None)
+            _current = utterance
+
+        _notify(STARTED, utterance)
+        try:
+            finished = speech_io.speak(utterance.text, utterance.stop)
+        except Exception as e:
+            print("Speech error:", e)
+            utterance.future.set_exception(e)
+            finished = None
+
+        with _cond:
+            _current = None
+            _cond.notify_all()   # for wait_idle()
+            if finished is None:
+                continue
+            if finished:
+                utterance.future.set_result(True)
+            elif utterance.text in _pending:
+                # Same text was queued again meanwhile; resolve with that one
+                _pending[utterance.text].future.add_done_callback(
+                    lambda f, u=utterance: _copy_result(f, u.future))
+            else:
+                # Interrupted: play it again once the urgent speech is done
+                utterance.stop = threading.Event()
+                _push(utterance)
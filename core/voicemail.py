@@ -0,0 +1,165 @@
+# core/voicemail.py
+# Records the caller's own voice while they leave a message, so a bad
+# transcript can still be checked against the audio. The recorder is one
+# more reader of the microphone ring (see speech_io.MicRing) and writes
+# each block to disk as it arrives, so memory use does not grow with the
+# length of the message. With encryption on, the blocks go straight
+# through encryption.StreamWriter into a WAV whose header leaves the
+# length open: the caller's voice never touches the disk in the clear,
+# even if Neo dies mid-call. Read recordings back with
+# core.encryption.open_read(). With encryption off they are FLAC (through
+# soundfile, when installed) or plain WAV.
+
+import os
+import struct
+import threading
+import time
+import wave
+from core import speech_io, encryption
+
+try:
+    import soundfile
+except (ImportError, OSError):   # OSError: libsndfile missing
+    soundfile = None
+
+VOICEMAIL_DIR = "data/voicemail"
+MAX_SECONDS = 300         # recordings stop on their own after this long
+READ_TIMEOUT = 0.1        # seconds to wait for the next block before checking for stop()
+
+_active = set()           # paths still being recorded
+_active_lock = threading.Lock()
+
+
+class VoicemailRecorder:
+    """
+    Streams microphone audio to a file from start() until stop().
+    """
+
+    def __init__(self, path, max_seconds=MAX_SECONDS):
+        self.path = path
+        self.max_seconds = max_seconds
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = None
+        self.error = None
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with _active_lock:
+            _active.add(self.path)
+        reader = speech_io.mic_ring().reader()
+        self.thread = threading.Thread(target=self._run, args=(reader,), daemon=True)
+        self.thread.start()
+        return self
+
+    def _open(self):
+        if encryption.enabled():
+            out = encryption.StreamWriter(open(self.path, "wb"))
+            out.write(wav_header())
+            return out
+        if self.path.endswith(".flac"):
+            return soundfile.SoundFile(self.path, "w", samplerate=speech_io.SAMPLE_RATE,
+                                       channels=1, subtype="PCM_16", format="FLAC")
+        out = wave.open(self.path, "wb")
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(speech_io.SAMPLE_RATE)
+        return out
+
+    def _run(self, reader):
+        limit = self.max_seconds * speech_io.SAMPLE_RATE
+        try:
+            out = self._open()
+            try:
+                while not self.stopped.is_set() and self.samples < limit:
+                    block = reader.read(timeout=READ_TIMEOUT)
+                    if block is None:
+                        continue
+                    if isinstance(out, wave.Wave_write):
+                        out.writeframes(block.tobytes())
+                    elif isinstance(out, encryption.StreamWriter):
+                        out.write(block.tobytes())
+                    else:
+                        out.write(block)
+                    self.samples += len(block)
+            finally:
+                out.close()
+        except Exception as e:
+            self.error = e
+            print("Voicemail recording error:", e)
+
+    def stop(self):
+        """
+        Stops recording and returns the file path, or None if nothing was saved.
+        """
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        with _active_lock:
+            _active.discard(self.path)
+        if self.error is not None or not self.samples:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            return None
+        return self.path
+
+    def duration(self):
+        return self.samples / speech_io.SAMPLE_RATE
+
+
+def wav_header():
+    """
+    A 16-bit mono WAV header for a stream of unknown length: both sizes
+    are left at their maximum, so readers take the samples to run to the
+    end of the file (an encrypted stream cannot be patched afterwards).
+    """
+    rate = speech_io.SAMPLE_RATE
+    return (b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, rate, rate * 2, 2, 16)
+            + b"data" + struct.pack("<I", 0xFFFFFFFF))
+
+
+def record(caller):
+    """
+    Starts recording a message from `caller`. Returns the recorder, or
+    None when there is no microphone (null backend).
+    """
+    if speech_io.is_null_backend():
+        return None
+    speech_io.start_microphone()
+    extension = ".flac" if soundfile is not None and not encryption.enabled() else ".wav"
+    number = "".join(ch for ch in caller.get("number", "unknown") if ch.isalnum())
+    name = time.strftime("%Y%m%d_%H%M%S") + f"_{number}{extension}"
+    return VoicemailRecorder(os.path.join(VOICEMAIL_DIR, name)).start()
+
+
+def _reencrypt_batch():
+    """
+    Re-encrypts one finished recording that is in plaintext (made with
+    encryption off) or under a retired key. Returns 1 if one was done, 0
+    if none is left. A recording that cannot be decrypted (cut short by a
+    crash) is renamed to *.unreadable and skipped from then on.
+    """
+    if not os.path.isdir(VOICEMAIL_DIR):
+        return 0
+    for name in sorted(os.listdir(VOICEMAIL_DIR)):
+        path = os.path.join(VOICEMAIL_DIR, name)
+        with _active_lock:
+            if path in _active or name.endswith((".tmp", ".unreadable")):
+                continue
+        if encryption.file_needs_reencrypt(path):
+            try:
+                encryption.encrypt_file(path)
+            except encryption.EncryptionError as e:
+                print(f"⚠️ Voicemail {name} cannot be decrypted ({e}); kept as {name}.unreadable")
+                os.replace(path, path + ".unreadable")
+                try:
+                    os.remove(path + ".tmp")
+                except OSError:
+                    pass
+            return 1
+    return 0
+
+encryption.register("voicemail", _reencrypt_batch)
@@ -1,169 +1,323 @@
 # main.py
+import queue
 import time
 import threading
 import os
+from concurrent.futures import ThreadPoolExecutor
 from core import (
+    audio_bank,
+    call_simulator,
     speech_io,
     dialogue_manager,
     condition_detector,
     alert_manager,
+    call_session,
     power_monitor,
     reporter,
-    learner
+    response_catalog,
+    learner,
+    message_store,
+    message_index,
+    metrics,
+    review_queue,
+    speech_scheduler,
+    encryption
 )
 
-# Thread-safe lock for speech
-speak_lock = threading.Lock()
-
 # Ensure folders exist
 os.makedirs("data/messages", exist_ok=True)
 os.makedirs("resources", exist_ok=True)
 
-# Fallback responses file (auto-create if missing)
-RESPONSES_FILE = "resources/responses.json"
-if not os.path.exists(RESPONSES_FILE):
-    import json
-    fallback_responses = {
-        "unknown": [
-            "Hello! I’ll take a message for you.",
-            "He’s not available right now, would you like to leave a message?",
-            "I can record your message if you’d like."
-        ],
-        "away": [
-            "Sir is away at the moment. Can I take a message?",
-            "He stepped out for a bit. Would you like to leave a note?",
-            "He’ll be back soon, I can note your message."
-        ],
-        "sleeping": [
-            "Sir is sleeping right now. Would you like to leave a message?",
-            "He’s resting at the moment. Can I take a message?",
-            "He’s asleep, but I’ll inform him when he wakes up."
-        ],
-        "busy": [
-            "Sir is busy at the moment. Can I take your message?",
-            "He’s occupied right now. I’ll make sure he gets your message.",
-            "He’s in the middle of something. Want to leave a note?"
-        ]
-    }
-    with open(RESPONSES_FILE, "w", encoding="utf-8") as f:
-        json.dump(fallback_responses, f, indent=4)
+# Responses catalog (written with the defaults if missing)
+response_catalog.ensure_file()
 
 # -------------------------------------------------
 # Startup sequence
 # -------------------------------------------------
+STARTUP_MESSAGE = "Neo is now active and monitoring calls silently."
+
+def bank_phrases():
+    """
+    Every fixed line Neo speaks: the response catalog plus its own phrases.
+    """
+    return response_catalog.all_lines() + [
+        STARTUP_MESSAGE,
+        "Power alert recorded.",
+        call_session.DECLINE_MESSAGE,
+        "Hello Sir, how may I assist you?",
+        "No new messages to report, Sir.",
+    ]
+
+def preload_phrases():
+    """
+    Maps the pre-rendered audio bank and re-renders any fixed phrase that
+    is new or changed since it was built (again whenever the catalog is edited).
+    """
+    audio_bank.load()
+    response_catalog.on_reload(lambda: audio_bank.build_async(bank_phrases))
+    try:
+        audio_bank.build(bank_phrases())
+    except Exception as e:
+        print("Audio bank build error:", e)
+
 def startup_message():
-    with speak_lock:
-        speech_io.speak("Neo is now active and monitoring calls silently.")
+    speech_scheduler.say(STARTUP_MESSAGE, speech_scheduler.PRIORITY_STATUS)
     print("🚀 Neo started successfully! Waiting for calls...")
 
 # -------------------------------------------------
 # Call Handler Thread
 # -------------------------------------------------
-def call_handler():
-    active_calls = {}  # track calls in progress
+CALL_WORKERS = call_session.MAX_SESSIONS   # one thread per live session
 
-    while True:
-        try:
-            if call_simulator.check_incoming_call():
-                caller = call_simulator.get_current_caller()
-                caller_id = caller.get('phone')  # use phone as unique ID
-                print(f"📞 Incoming call detected from {caller['name']} ({caller_id})")
+sessions = call_session.SessionManager()
+call_pool = ThreadPoolExecutor(max_workers=CALL_WORKERS, thread_name_prefix="call")
 
-                if caller_id in active_calls:
-                    continue  # skip repeated handling
+def handle_call(session):
+    sessions.handling(session)
+    caller = session.caller
+    metrics.count("calls", help="Rings handled")
+    outcome = call_session.FAILED
+    try:
+        condition = condition_detector.detect()
+        session.condition = condition
+        print(f"🧠 Detected condition: {condition}")
 
-                active_calls[caller_id] = True
-                condition = condition_detector.detect()
-                print(f"🧠 Detected condition: {condition}")
+        if session.answered:
+            print(f"🟢 {caller['name']} was answered by the user, Neo stays silent.")
+            outcome = call_session.ANSWERED
+            return
 
-                if condition in ["sleeping", "away", "unknown", "busy"]:
-                    alert_manager.record_call(caller)
-                    dialogue_manager.handle_incoming_call(caller, condition)
-                else:
-                    print("🟢 User seems active, Neo will stay silent.")
+        if condition not in ["sleeping", "away", "unknown", "busy"]:
+            print("🟢 User seems active, Neo will stay silent.")
+            outcome = call_session.USER_ACTIVE
+            return
 
-                # Remove from active_calls after 5 seconds
-                threading.Timer(5, lambda: active_calls.pop(caller_id, None)).start()
+        if not sessions.wait_for_line(session):
+            if session.answered:
+                outcome = call_session.ANSWERED
+            elif session.hung_up.is_set():
+                outcome = call_session.HUNG_UP
+            else:
+                sessions.decline(session)
+            return
+        try:
+            dialogue_manager.handle_incoming_call(caller, condition, session)
+            outcome = call_session.MESSAGE
+        finally:
+            sessions.release_line(session)
+    except Exception as e:
+        print("Call handler error:", e)
+    finally:
+        sessions.close(session, outcome)
 
-        except Exception as e:
-            print("Call handler error:", e)
+def call_handler(events):
+    """
+    Dispatches call events from `events` (a call_simulator.subscribe()
+    queue, subscribed before the simulator starts so no ring is missed).
+    """
+    while True:
+        event = events.get()
+        caller = event["caller"]
+        caller_id = caller["number"]
 
-        time.sleep(2)
+        if event["type"] == call_simulator.RINGING:
+            print(f"📞 Incoming call from {caller['name']} ({caller_id})")
+            # Every ring counts towards the repeated-calls alert, including
+            # rings from a caller whose earlier call is still being handled
+            try:
+                alert_manager.record_call(caller)
+            except Exception as e:
+                print("Alert manager error:", e)
+            session = sessions.open(caller)
+            if session is None:
+                continue  # already handling this caller
+            if session.overflow:
+                sessions.decline(session)
+                continue
+            call_pool.submit(handle_call, session)
+
+        elif event["type"] == call_simulator.ANSWERED:
+            sessions.mark_answered(caller_id)
+
+        elif event["type"] == call_simulator.HUNG_UP:
+            sessions.hang_up(caller_id)
 
 # -------------------------------------------------
 # Power & Alert Monitor Thread
 # -------------------------------------------------
 def system_monitor():
     while True:
+        interval = 60
         try:
-            power_monitor.check_battery()
+            interval = power_monitor.check_battery()
         except Exception as e:
             print("Power monitor error:", e)
-        time.sleep(60)
+        time.sleep(interval)
+
+def on_low_power(enabled):
+    # Sample the camera less often while the battery is low
+    condition_detector.set_sample_interval(
+        condition_detector.LOW_POWER_SAMPLE_INTERVAL if enabled else condition_detector.SAMPLE_INTERVAL)
 
 # -------------------------------------------------
 # Sir Interaction Thread
 # -------------------------------------------------
-def sir_interaction_listener():
-    last_command = ""
-    silence_count = 0
+# Sir's commands, checked in order: (trigger phrases, handler(rest)).
+# `rest` is whatever was said after the trigger phrase. The recognizer
+# only listens for these phrases (keyword spotting), so adding a command
+# here is all it takes to make Neo hear it.
+SIR_COMMANDS = []
 
-    while True:
-        try:
-            command = speech_io.listen(duration=5).lower().strip()
-        except Exception as e:
-            print("Listening error:", e)
-            continue
+def sir_command(*phrases):
+    def register(handler):
+        SIR_COMMANDS.append((phrases, handler))
+        return handler
+    return register
 
-        if not command:
-            silence_count += 1
-            if silence_count > 3:
-                time.sleep(5)
-                silence_count = 0
-            continue
+def sir_phrases():
+    return [phrase for phrases, _ in SIR_COMMANDS for phrase in phrases]
+
+@sir_command("you have to say")
+def teach_command(rest):
+    phrase = rest
+    if not phrase:
+        # Keyword spotting does not transcribe free speech, so ask for it
+        speech_scheduler.say("What should I say, Sir?", speech_scheduler.PRIORITY_SIR).result()
+        phrase = speech_io.listen(duration=8)
+    if not phrase:
+        speech_scheduler.say("I didn’t catch that, Sir.", speech_scheduler.PRIORITY_SIR)
+        return
+    speech_scheduler.say("Okay Sir, I’ll remember that.", speech_scheduler.PRIORITY_SIR)
+    learner.learn_response("sir", "instruction", phrase)
+    print(f"💾 Learned new phrase from Sir: {phrase}")
+
+@sir_command("give me report", "report")
+def report_command(rest):
+    print("📋 Sir requested report.")
+    reporter.give_report()
 
-        silence_count = 0
-        if command == last_command:
+@sir_command("review")
+def review_command(rest):
+    reviews = review_queue.pending()
+    if not reviews:
+        speech_scheduler.say("Nothing to review, Sir.", speech_scheduler.PRIORITY_SIR)
+        return
+    for review in reviews:
+        speech_scheduler.say(review["prompt"], speech_scheduler.PRIORITY_SIR).result()
+        reply = speech_io.listen(duration=10)
+        if speech_io.find_phrase(reply, ("stop",)):
+            break
+        if not reply or speech_io.find_phrase(reply, ("skip",)):
+            review_queue.skip(review["id"])
             continue
-        last_command = command
+        review_queue.answer(review["id"], reply, source="voice")
+    speech_scheduler.say("Thank you, Sir.", speech_scheduler.PRIORITY_SIR)
 
-        try:
-            if "give me report" in command or "report" in command:
-                print("📋 Sir requested report.")
-                reporter.give_report()
-                continue
+@sir_command("search messages", "find messages", "messages from", "what did")
+def search_command(rest):
+    query = rest
+    if not query:
+        speech_scheduler.say("What should I look for, Sir?", speech_scheduler.PRIORITY_SIR).result()
+        query = speech_io.listen(duration=8)
+    if not query:
+        speech_scheduler.say("I didn’t catch that, Sir.", speech_scheduler.PRIORITY_SIR)
+        return
+    results = message_index.search(query, limit=3)
+    if not results:
+        speech_scheduler.say("I found no messages about that, Sir.", speech_scheduler.PRIORITY_SIR)
+        return
+    for msg in results:
+        when = time.strftime("%A at %I:%M %p", time.localtime(msg["time"]))
+        speech_scheduler.say(f"{msg['caller'].get('name', 'Someone')}, {when}: {msg['message'] or 'no message'}",
+                             speech_scheduler.PRIORITY_SIR)
 
-            if "you have to say" in command:
-                phrase = command.split("you have to say", 1)[1].strip()
-                with speak_lock:
-                    speech_io.speak("Okay Sir, I’ll remember that.")
-                learner.learn_response("sir", "instruction", phrase)
-                print(f"💾 Learned new phrase from Sir: {phrase}")
-                continue
+@sir_command("call status", "calls")
+def call_status_command(rest):
+    stats = sessions.stats()
+    if not stats["live"]:
+        text = f"No calls right now, Sir. {stats['total']} handled so far."
+    else:
+        text = (f"{stats['live']} call{'s' if stats['live'] != 1 else ''} in progress, "
+                f"{stats['holding']} on hold, Sir.")
+    speech_scheduler.say(text, speech_scheduler.PRIORITY_SIR)
 
-            if any(greet in command for greet in ["hello", "hi", "hey neo"]):
-                with speak_lock:
-                    speech_io.speak("Hello Sir, how may I assist you?")
-                continue
+@sir_command("hey neo", "hello", "hi")
+def greet_command(rest):
+    speech_scheduler.say("Hello Sir, how may I assist you?", speech_scheduler.PRIORITY_SIR)
 
-            # fallback
-            with speak_lock:
-                speech_io.speak("I didn’t understand that, Sir. I’ll try to learn it next time.")
-            time.sleep(3)
+LISTENER_POLL = 0.5   # seconds between checks for a call taking the line or new commands
 
+def sir_interaction_listener():
+    last_command = ""
+
+    while True:
+        # Paused while a caller is on the line: what the microphone hears
+        # then is the caller, whose words must never run Sir's commands
+        sessions.wait_line_free()
+        phrases = sir_phrases()
+        events = speech_io.subscribe(keywords=phrases)
+        speech_io.start_microphone()
+        try:
+            while not sessions.line_busy():
+                if sir_phrases() != phrases:
+                    # A command was added: rebuild the keyword grammar
+                    phrases = sir_phrases()
+                    speech_io.set_keywords(events, phrases)
+                try:
+                    kind, text = events.get(timeout=LISTENER_POLL)
+                except queue.Empty:
+                    continue
+                if kind != "final" or sessions.line_busy():
+                    continue
+                command = text.lower().strip()
+                if not command or command == last_command:
+                    continue
+                last_command = command
+                handle_sir_command(command)
+                # Drop what was heard while the command ran (Neo's own voice, dictation)
+                while not events.empty():
+                    events.get_nowait()
         except Exception as e:
-            print("Sir interaction error:", e)
+            print("Listening error:", e)
+            time.sleep(1)
+        finally:
+            speech_io.unsubscribe(events)
+
+def handle_sir_command(command):
+    try:
+        for phrases, handler in SIR_COMMANDS:
+            found = speech_io.find_phrase(command, phrases)
+            if found:
+                handler(found[2])
+                return
+
+        # fallback
+        speech_scheduler.say("I didn’t understand that, Sir. I’ll try to learn it next time.",
+                             speech_scheduler.PRIORITY_SIR)
+
+    except Exception as e:
+        print("Sir interaction error:", e)
 
 # -------------------------------------------------
 # Main run
 # -------------------------------------------------
 def main():
     os.makedirs("data", exist_ok=True)
+    speech_io.warm_up()
+    metrics.start_exporter()
+    message_store.migrate_directory()
+    alert_manager.migrate_alert_file()
+    review_queue.start()
+    encryption.start()
+    condition_detector.start_sampler()
+    power_monitor.on_low_power(on_low_power)
+    call_events = call_simulator.subscribe()
+    threading.Thread(target=call_handler, args=(call_events,), daemon=True).start()
     call_simulator.simulate_incoming_calls()
 
-    threading.Thread(target=call_handler, daemon=True).start()
     threading.Thread(target=system_monitor, daemon=True).start()
     threading.Thread(target=sir_interaction_listener, daemon=True).start()
+    threading.Thread(target=preload_phrases, daemon=True).start()
 
     startup_message()
 
@@ -0,0 +1,42 @@
+# tests/conftest.py
+# Tests run against the pure modules with the silent null audio backend,
+# engines in-process and no HTTP API. Each test gets its own working
+# directory, so the modules' relative data/ paths land in tmp_path.
+
+import os
+import sys
+
+os.environ.setdefault("NEO_AUDIO", "null")
+os.environ.setdefault("NEO_ENGINES", "inline")
+os.environ.setdefault("NEO_REVIEW_PORT", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+# Modules that keep an SQLite connection open between calls
+_DATABASES = ("core.message_store", "core.message_index", "core.review_queue")
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    encryption = sys.modules.get("core.encryption")
+    if encryption is not None:
+        # Forget the previous test's key (the key file is per directory too)
+        monkeypatch.setattr(encryption, "_keys", None)
+    yield tmp_path
+    for name in _DATABASES:
+        module = sys.modules.get(name)
+        if module is not None:
+            module.close()
+    learner = sys.modules.get("core.learner")
+    if learner is not None:
+        # Drop what the test learned, so the shared profile store never
+        # flushes it into another test's directory (or the checkout) later
+        store = learner._store
+        with store.lock:
+            if store.timer is not None:
+                store.timer.cancel()
+                store.timer = None
+            store.dirty = False
+            store.profile = None
@@ -0,0 +1,71 @@
+import json
+import os
+import time
+
+from core import alert_manager
+from core.alert_manager import CallRateTracker
+
+NUMBER = "+5555555555"
+PRIORITY = alert_manager.ALERT_CONTACTS[0]
+
+
+def test_alert_when_threshold_is_reached_within_the_window():
+    tracker = CallRateTracker()
+    threshold, window = alert_manager.CALL_THRESHOLD, alert_manager.TIME_WINDOW
+    results = [tracker.record(NUMBER, t=i * (window / threshold / 2)) for i in range(threshold)]
+    assert results == [False] * (threshold - 1) + [True]
+
+
+def test_calls_spread_past_the_window_do_not_alert():
+    tracker = CallRateTracker()
+    window = alert_manager.TIME_WINDOW
+    assert not any(tracker.record(NUMBER, t=i * window) for i in range(10))
+
+
+def test_cooldown_silences_repeat_alerts():
+    tracker = CallRateTracker()
+    cooldown = alert_manager.ALERT_COOLDOWN
+    alerts = [t for t in range(0, 600, 10) if tracker.record(NUMBER, t=t)]
+    assert len(alerts) == 1
+    later = alerts[0] + cooldown
+    alerts = [t for t in range(later, later + 30, 10) if tracker.record(NUMBER, t=t)]
+    assert alerts == [later]
+
+
+def test_priority_contacts_escalate_faster():
+    tracker = CallRateTracker()
+    assert [tracker.record(PRIORITY, t=t) for t in (0, 1)] == [False, True]
+
+
+def test_memory_is_bounded_per_number_and_overall():
+    tracker = CallRateTracker(idle_ttl=100, max_tracked=50)
+    for t in range(1000):
+        tracker.record(NUMBER, t=t)
+    assert len(tracker.entries[NUMBER]["calls"]) == alert_manager.CALL_THRESHOLD
+    for i in range(200):
+        tracker.record(f"+1900{i:07d}", t=1000)
+    assert len(tracker) == 50
+    tracker.record("+1999", t=2000)   # everyone else has gone idle
+    assert len(tracker) == 1
+    assert tracker.count("+1999", t=2000) == 1
+
+
+def test_legacy_alert_file_is_imported_once(monkeypatch):
+    log = alert_manager.event_log.EventLog("data/alerts.jsonl", encrypt=True)
+    monkeypatch.setattr(alert_manager, "alert_log", log)
+    log.write("repeated_call", caller={"name": "Dad"})
+    log.flush()
+    stamps = [time.mktime((2025, 10, 31, 12, 0, s, 0, 0, -1)) for s in (0, 30)]
+    os.makedirs("data", exist_ok=True)
+    with open(alert_manager.ALERT_FILE, "w", encoding="utf-8") as f:
+        for ts in stamps:
+            f.write(json.dumps({"caller": {"name": "Mom", "number": NUMBER},
+                                "time": time.ctime(ts), "type": "repeated_call"}) + "\n")
+        f.write("not json\n")
+    assert alert_manager.migrate_alert_file() == 2
+    assert not os.path.exists(alert_manager.ALERT_FILE)
+    assert alert_manager.migrate_alert_file() == 0
+    alerts = list(alert_manager.read_alerts())
+    assert [a["ts"] for a in alerts[:2]] == stamps
+    assert [a["caller"]["name"] for a in alerts] == ["Mom", "Mom", "Dad"]
+    log.close()
@@ -0,0 +1,89 @@
+import threading
+
+from core import call_session, message_store
+from core.call_session import SessionManager
+
+MOM = {"name": "Mom", "number": "+1111111111"}
+DAD = {"name": "Dad", "number": "+2222222222"}
+BOSS = {"name": "Boss", "number": "+4444444444"}
+
+
+def _wait_in_thread(manager, session, timeout=5):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("got", manager.wait_for_line(session, timeout)))
+    thread.start()
+    return thread, result
+
+
+def test_one_session_per_caller_and_overflow():
+    manager = SessionManager(max_sessions=2)
+    mom = manager.open(MOM)
+    assert manager.open(MOM) is None
+    assert not mom.overflow
+    manager.open(DAD)
+    assert manager.open(BOSS).overflow
+    assert manager.stats()["live"] == 2
+
+
+def test_line_is_handed_to_the_next_caller_on_release():
+    manager = SessionManager()
+    mom, dad = manager.open(MOM), manager.open(DAD)
+    assert manager.wait_for_line(mom)
+    assert manager.line_busy()
+    thread, result = _wait_in_thread(manager, dad)
+    manager.release_line(mom)
+    thread.join(5)
+    assert result["got"] and dad.state == call_session.ON_LINE
+
+
+def test_holding_too_long_gives_up():
+    manager = SessionManager()
+    mom, dad = manager.open(MOM), manager.open(DAD)
+    manager.wait_for_line(mom)
+    assert not manager.wait_for_line(dad, timeout=0.05)
+
+
+def test_hang_up_and_answer_release_a_holding_caller():
+    manager = SessionManager()
+    mom, dad, boss = manager.open(MOM), manager.open(DAD), manager.open(BOSS)
+    manager.wait_for_line(mom)
+    dad_thread, dad_result = _wait_in_thread(manager, dad)
+    boss_thread, boss_result = _wait_in_thread(manager, boss)
+    manager.hang_up(DAD["number"])
+    manager.mark_answered(BOSS["number"])
+    dad_thread.join(5)
+    boss_thread.join(5)
+    assert dad_result["got"] is False and dad.hung_up.is_set()
+    assert boss_result["got"] is False and boss.answered
+
+
+def test_close_frees_the_line_and_counts_outcomes():
+    manager = SessionManager()
+    mom = manager.open(MOM)
+    manager.wait_for_line(mom)
+    manager.close(mom, call_session.MESSAGE)
+    manager.close(mom, call_session.FAILED)   # closing twice is a no-op
+    assert manager.wait_line_free(timeout=0)
+    stats = manager.stats()
+    assert stats["live"] == 0 and stats["outcomes"] == {call_session.MESSAGE: 1}
+    assert manager.open(MOM) is not None   # the number can call again
+
+
+def test_decline_records_a_missed_call():
+    manager = SessionManager()
+    session = manager.open(MOM)
+    manager.decline(session)
+    assert session.outcome == call_session.DECLINED
+    assert message_store.get(session.message_id)["caller"] == MOM
+
+
+def test_listeners_see_each_session_open_handled_and_closed():
+    manager = SessionManager()
+    events = []
+    manager.add_listener(lambda event, session: events.append((event, session.number)))
+    mom = manager.open(MOM)
+    manager.handling(mom)
+    manager.close(mom, call_session.MESSAGE)
+    manager.close(mom, call_session.MESSAGE)
+    assert events == [(call_session.OPENED, MOM["number"]), (call_session.HANDLING, MOM["number"]),
+                      (call_session.CLOSED, MOM["number"])]
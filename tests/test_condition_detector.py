@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from core import condition_detector
+from core.condition_detector import AWAY, BUSY, SLEEPING, ConditionTracker, batch_vote
+
+
+def test_tracker_needs_a_clear_majority_to_enter_a_state():
+    tracker = ConditionTracker(window=5, enter=0.6, stay=0.4)
+    assert tracker.update([BUSY, AWAY]) == ("unknown", 0.0)
+    state, confidence = tracker.update([BUSY])
+    assert state == "busy"
+    assert confidence == pytest.approx(2 / 3)
+
+
+def test_tracker_hysteresis_ignores_a_single_odd_vote():
+    tracker = ConditionTracker(window=5, enter=0.6, stay=0.4)
+    tracker.update([BUSY] * 5)
+    assert tracker.update([SLEEPING])[0] == "busy"
+    assert tracker.update([SLEEPING, SLEEPING])[0] == "busy"   # busy still holds 2/5
+    assert tracker.update([SLEEPING])[0] == "sleeping"
+
+
+def test_tracker_window_is_a_ring():
+    tracker = ConditionTracker(window=3)
+    tracker.update([AWAY] * 10)
+    assert list(tracker.votes) == [AWAY] * 3
+    tracker.reset()
+    assert tracker.state == "unknown"
+    assert (tracker.votes == -1).all()
+
+
+def test_batch_counts_as_one_vote():
+    assert batch_vote(np.array([BUSY, AWAY, AWAY], dtype=np.int8)) == AWAY
+    assert batch_vote(np.array([AWAY, BUSY], dtype=np.int8)) == BUSY   # tie: latest frame
+
+
+class _Camera:
+    def __init__(self):
+        self.reads = 0
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        self.reads += 1
+        return True, np.full((48, 64, 3), 128 + self.reads % 50, dtype=np.uint8)
+
+    def release(self):
+        pass
+
+
+class _Cascade:
+    def detectMultiScale(self, image, *args, **kwargs):
+        return [(4, 4, 16, 16)]
+
+
+def test_benchmark_keeps_the_samplers_face_track():
+    condition_detector.set_camera(_Camera(), _Cascade(), _Cascade())
+    try:
+        condition_detector._face_track.face = (1, 2, 3, 4)
+        result = condition_detector.benchmark(frame_count=8)
+        assert result["frames"] == 8
+        assert condition_detector._face_track.face == (1, 2, 3, 4)
+    finally:
+        condition_detector.set_camera(None)
@@ -0,0 +1,119 @@
+import base64
+import os
+
+import pytest
+
+pytest.importorskip("cryptography")
+from core import encryption, event_log
+from core.encryption import CHUNK_SIZE, HEADER_SIZE, TAG_SIZE, EncryptionError
+
+
+def test_short_record_round_trip():
+    sealed = encryption.encrypt("call me back")
+    assert encryption.is_encrypted(sealed)
+    assert b"call me back" not in sealed
+    assert encryption.decrypt_text(sealed) == "call me back"
+    assert encryption.decrypt(b"") == b""
+
+
+def test_plaintext_passes_through():
+    assert encryption.decrypt(b"from before encryption") == b"from before encryption"
+    assert encryption.decrypt_text("old text") == "old text"
+
+
+@pytest.mark.parametrize("size", [0, 1, CHUNK_SIZE - 1, CHUNK_SIZE, CHUNK_SIZE + 1, 3 * CHUNK_SIZE + 5])
+def test_stream_round_trip_across_chunk_boundaries(size):
+    data = os.urandom(size)
+    assert encryption.decrypt(encryption.encrypt(data)) == data
+
+
+def test_truncation_is_detected():
+    sealed = encryption.encrypt(os.urandom(2 * CHUNK_SIZE + 10))
+    last_chunk = HEADER_SIZE + 2 * (CHUNK_SIZE + TAG_SIZE)
+    for cut in (len(sealed) - 1, last_chunk, HEADER_SIZE + CHUNK_SIZE + TAG_SIZE):
+        with pytest.raises(EncryptionError):
+            encryption.decrypt(sealed[:cut])
+
+
+def test_tampering_and_unknown_keys_are_detected():
+    sealed = bytearray(encryption.encrypt(b"secret"))
+    sealed[-1] ^= 1
+    with pytest.raises(EncryptionError):
+        encryption.decrypt(bytes(sealed))
+    sealed = bytearray(encryption.encrypt(b"secret"))
+    sealed[4:8] = b"\0\0\0\0"
+    with pytest.raises(EncryptionError):
+        encryption.decrypt(bytes(sealed))
+
+
+def test_files_are_encrypted_in_place_and_read_back_as_a_stream():
+    os.makedirs("data", exist_ok=True)
+    data = os.urandom(CHUNK_SIZE * 2 + 123)
+    with open("data/blob.bin", "wb") as f:
+        f.write(data)
+    encryption.encrypt_file("data/blob.bin")
+    assert not encryption.file_needs_reencrypt("data/blob.bin")
+    with encryption.open_read("data/blob.bin") as f:
+        assert f.read() == data
+
+
+def test_rotation_keeps_old_data_readable_until_reencrypted():
+    sealed = encryption.encrypt(b"before rotation")
+    old_id = encryption.current_key_id()
+    encryption.rotate_key()
+    assert encryption.current_key_id() != old_id
+    assert encryption.needs_reencrypt(sealed)
+    assert encryption.decrypt(sealed) == b"before rotation"
+
+
+def test_retired_keys_are_pruned_once_every_store_is_done(monkeypatch):
+    monkeypatch.setattr(encryption, "_reencryptors", {"test": lambda: 0})
+    monkeypatch.setattr(encryption, "REENCRYPT_PAUSE", 0)
+    encryption.rotate_key()
+    assert encryption.status()["retired_keys"] == 1
+    encryption.reencrypt_all()
+    assert not os.path.exists(encryption.RETIRED_KEYS_FILE)
+    assert encryption.status()["retired_keys"] == 0
+
+
+def test_retired_keys_stay_while_a_store_fails(monkeypatch):
+    def failing():
+        raise OSError("disk full")
+
+    monkeypatch.setattr(encryption, "_reencryptors", {"test": failing})
+    encryption.rotate_key()
+    encryption.reencrypt_all()
+    assert os.path.exists(encryption.RETIRED_KEYS_FILE)
+
+
+def test_published_key_is_replaced(monkeypatch):
+    raw = os.urandom(32)
+    monkeypatch.setattr(encryption, "PUBLISHED_KEY_IDS", frozenset({encryption._key_id(raw)}))
+    os.makedirs("data", exist_ok=True)
+    with open(encryption.KEY_FILE, "wb") as f:
+        f.write(base64.urlsafe_b64encode(raw) + b"\n")
+    assert encryption.current_key_id() != encryption._key_id(raw)
+    assert os.path.exists(encryption.RETIRED_KEYS_FILE)
+
+
+def test_blind_index_terms_are_keyed_hashes():
+    term = encryption.blind("meeting")
+    assert term != b"meeting" and len(term) == 8
+    assert encryption.blind("meeting") == term
+    encryption.rotate_key()
+    assert encryption.blind("meeting") != term
+
+
+def test_encrypted_event_log_keeps_only_timestamps_readable():
+    log = event_log.EventLog("data/alerts.jsonl", encrypt=True)
+    log.write("alert", ts=5.0, caller="Mom")
+    log.flush()
+    with open("data/alerts.jsonl", encoding="utf-8") as f:
+        raw = f.read()
+    assert "Mom" not in raw and '"ts": 5.0' in raw
+    assert list(log.read(since=1.0)) == [{"ts": 5.0, "type": "alert", "caller": "Mom"}]
+    encryption.rotate_key()
+    assert log._reencrypt_batch() == 1
+    assert log._reencrypt_batch() == 0
+    assert [e["caller"] for e in log.read()] == ["Mom"]
+    log.close()
@@ -0,0 +1,76 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from core import engine_host
+from core.engine_host import Engine, EngineError
+
+
+@pytest.fixture
+def eng():
+    eng = Engine("stt")
+    yield eng
+    eng.stop()
+
+
+def test_call_runs_in_a_worker_process(eng):
+    assert eng.call("ping") == "pong"
+    status = eng.status()
+    assert status["alive"] and status["pid"] != os.getpid()
+    socket_dir = eng.socket_dir
+    eng.stop()
+    assert not os.path.exists(socket_dir)
+    assert not eng.status()["alive"]
+
+
+def test_worker_errors_are_raised_without_a_restart(eng):
+    eng.call("ping")
+    pid = eng.proc.pid
+    with pytest.raises(EngineError, match="AttributeError"):
+        eng.call("no_such_op")
+    assert eng.call("ping") == "pong" and eng.proc.pid == pid and eng.restarts == 0
+
+
+def test_crashed_worker_is_restarted_with_back_off(eng, monkeypatch):
+    monkeypatch.setattr(engine_host, "RESTART_DELAYS", (0, 30))
+    eng.call("ping")
+    first_pid, generation = eng.proc.pid, eng.generation
+
+    eng.proc.kill()
+    eng.proc.wait()
+    assert eng.call("ping") == "pong"   # first failure: restarted at once
+    assert eng.proc.pid != first_pid and eng.generation == generation + 1
+
+    eng.proc.kill()
+    eng.proc.wait()
+    eng.check()   # the health check notices, but backs off
+    assert eng.restarts == 2 and not eng.status()["alive"]
+    started = time.monotonic()
+    with pytest.raises(EngineError, match="restarting in"):
+        eng.call("ping")
+    assert time.monotonic() - started < 1   # fails fast instead of waiting with the lock held
+
+    eng.restart_at = time.monotonic()   # the delay is over
+    eng.check()
+    assert eng.status()["alive"] and eng.call("ping") == "pong"
+
+
+def test_shared_buffer_grows_and_is_reattached_after_a_restart(eng):
+    initial = engine_host.BUFFER_SIZES["stt"]
+    shm = eng.buffer(10)
+    assert shm.size >= initial and eng.attached
+
+    big = np.arange(initial, dtype=np.int16)   # twice the initial buffer
+    with eng.lock:
+        assert eng.write(big) == big.nbytes
+        assert eng.shm.name != shm.name and eng.shm.size >= big.nbytes
+        assert np.array_equal(eng.read(len(big), "int16"), big)
+
+    eng.proc.kill()
+    eng.proc.wait()
+    eng.call("ping")   # restarted worker ...
+    assert not eng.attached
+    eng.buffer(10)     # ... is handed the current buffer again
+    assert eng.attached
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+
+import pytest
+
+from core import event_log
+
+
+@pytest.fixture
+def make_log():
+    # Closes every log a test opens, so the flusher lets go of them
+    logs = []
+
+    def make(*args, **kwargs):
+        logs.append(event_log.EventLog(*args, **kwargs))
+        return logs[-1]
+
+    yield make
+    for log in logs:
+        log.close()
+
+
+def wait_for_file(path, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return os.path.exists(path)
+
+
+def test_events_are_buffered_until_flush(make_log):
+    log = make_log("data/events.jsonl", flush_size=100)
+    log.write("ring", ts=1.0, caller="Mom")
+    assert not os.path.exists("data/events.jsonl")
+    log.flush()
+    assert list(event_log.read_events("data/events.jsonl")) == [{"ts": 1.0, "type": "ring", "caller": "Mom"}]
+
+
+def test_full_buffer_is_left_to_the_background_flusher(make_log):
+    log = make_log("data/events.jsonl", flush_size=2, flush_interval=3600)
+    flushed_by = []
+    flush = log.flush
+
+    def recording_flush():
+        flushed_by.append(threading.current_thread())
+        flush()
+
+    log.flush = recording_flush
+    log.write("a", ts=1.0)
+    log.write("b", ts=2.0)
+    assert wait_for_file("data/events.jsonl")
+    assert flushed_by and threading.current_thread() not in flushed_by   # write() never touches the disk
+    assert list(event_log.read_events("data/events.jsonl")) == [{"ts": 1.0, "type": "a"}, {"ts": 2.0, "type": "b"}]
+
+
+def test_quiet_logs_are_flushed_after_the_interval(make_log):
+    log = make_log("data/events.jsonl", flush_size=100, flush_interval=0.05)
+    log.write("a", ts=1.0)
+    assert wait_for_file("data/events.jsonl")
+
+
+def test_closed_logs_are_flushed_and_released(make_log):
+    log = make_log("data/events.jsonl", flush_size=100)
+    log.write("a", ts=1.0)
+    assert log in event_log._logs
+    log.close()
+    assert log not in event_log._logs
+    assert [e["type"] for e in event_log.read_events("data/events.jsonl")] == ["a"]
+
+
+def test_imported_history_goes_ahead_of_the_live_log(make_log):
+    log = make_log("data/events.jsonl")
+    log.write("live", ts=100.0)
+    log.flush()
+    old = [{"ts": 2.0, "type": "old"}, {"ts": 1.0, "type": "older"}]
+    assert log.import_events(old) == 2
+    assert log.import_events(old) == 2   # the same segment again, no duplicates
+    assert [e["type"] for e in log.read()] == ["older", "old", "live"]
+    assert [e["type"] for e in log.read(since=1.5)] == ["old", "live"]
+
+
+def test_rotation_keeps_every_event_in_order(make_log):
+    log = make_log("data/events.jsonl", flush_size=1000, max_bytes=2000, backups=100)
+    for i in range(300):
+        log.write("tick", ts=float(i), n=i)
+        if i % 10 == 9:
+            log.flush()
+    log.flush()
+    segments = event_log._segments("data/events.jsonl")
+    assert len(segments) > 3
+    assert all(name.endswith(".gz") for _, _, name in segments)
+    assert [e["n"] for e in log.read()] == list(range(300))
+
+
+def test_old_segments_are_dropped_past_backups(make_log):
+    log = make_log("data/events.jsonl", max_bytes=500, backups=2)
+    for i in range(200):
+        log.write("tick", ts=float(i))
+        log.flush()
+    assert len(event_log._segments("data/events.jsonl")) == 2
+
+
+def test_time_range_reads_seek_into_the_live_file(make_log):
+    log = make_log("data/events.jsonl", flush_size=10_000, max_bytes=10**9)
+    for i in range(20_000):
+        log.write("tick" if i % 2 else "tock", ts=float(i))
+    log.flush()
+    events = list(log.read(since=15_000.0, until=15_010.0, event_type="tick"))
+    assert [e["ts"] for e in events] == [float(t) for t in range(15_001, 15_010, 2)]
+
+
+def test_torn_lines_are_skipped(make_log):
+    log = make_log("data/events.jsonl")
+    log.write("a", ts=1.0)
+    log.flush()
+    with open("data/events.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"ts": 2.0, "ty\n')
+    log.write("b", ts=3.0)
+    assert [e["type"] for e in log.read()] == ["a", "b"]
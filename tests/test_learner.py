@@ -0,0 +1,93 @@
+import json
+import os
+import threading
+
+import pytest
+
+from core import encryption, learner
+from core.learner import ProfileStore
+
+PATH = "data/profile.json"
+
+
+def read_profile(path=PATH):
+    with encryption.open_read(path) as f:
+        return json.load(f)
+
+
+class NewerFirst:
+    """
+    Stands in for a store's write_lock and lets the flush running in the
+    thread named "newer" write before the one named "older", the race the
+    generation check guards against.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.older_waiting = threading.Event()
+        self.newer_done = threading.Event()
+
+    def __enter__(self):
+        if threading.current_thread().name == "older":
+            self.older_waiting.set()
+            self.newer_done.wait(5)
+        self.lock.acquire()
+
+    def __exit__(self, *exc):
+        self.lock.release()
+        if threading.current_thread().name == "newer":
+            self.newer_done.set()
+
+
+def test_changes_are_written_after_the_quiet_period():
+    store = ProfileStore(PATH, flush_delay=0.05)
+    store.set("responses", "+1111111111", "sleeping", value="Call back later.")
+    store.set("habits", "wake", value=7)
+    store.timer.join(5)
+    assert read_profile()["habits"] == {"wake": 7}
+    assert ProfileStore(PATH).get("responses", "+1111111111", "sleeping") == "Call back later."
+
+
+def test_an_older_snapshot_never_replaces_a_newer_one():
+    store = ProfileStore(PATH, flush_delay=60)
+    gate = store.write_lock = NewerFirst()
+    store.set("habits", "wake", value=1)
+    older = threading.Thread(target=store.flush, name="older")
+    older.start()
+    assert gate.older_waiting.wait(5)   # holds the first snapshot
+    store.set("habits", "wake", value=2)
+    newer = threading.Thread(target=store.flush, name="newer")
+    newer.start()
+    newer.join(5)
+    older.join(5)
+    assert read_profile()["habits"] == {"wake": 2}
+    assert store.written == store.generation == 2
+    assert not [name for name in os.listdir("data") if name.endswith(".tmp")]
+
+
+def test_an_undecryptable_profile_is_moved_aside():
+    pytest.importorskip("cryptography")
+    store = ProfileStore(PATH, flush_delay=60)
+    store.set("habits", "wake", value=7)
+    store.flush()
+    with open(PATH, "rb") as f:
+        sealed = f.read()
+    with open(PATH, "wb") as f:
+        f.write(sealed[:-1])   # cut short
+
+    store = ProfileStore(PATH, flush_delay=60)
+    assert store.get("habits") == {}
+    assert not os.path.exists(PATH)
+    with open(PATH + ".unreadable", "rb") as f:
+        assert f.read() == sealed[:-1]
+    store.set("habits", "wake", value=8)
+    store.flush()
+    assert read_profile()["habits"] == {"wake": 8}
+    assert os.path.exists(PATH + ".unreadable")
+
+
+def test_module_functions_use_the_shared_store():
+    learner.learn_report_phrase("  Call ME back ", "wants a call back")
+    assert learner.get_report_phrase("call me back") == "wants a call back"
+    learner.flush()
+    assert read_profile(learner.USER_PROFILE)["report_phrases"] == {"call me back": "wants a call back"}
@@ -0,0 +1,64 @@
+import math
+
+import pytest
+
+from core import call_simulator
+from core.load_simulator import LoadSimulator, replay_alerts
+
+MOM = call_simulator.CALLERS[0]
+
+
+def traffic(seed):
+    return (LoadSimulator(seed=seed).poisson(2.0, 3600)
+            .robocall_flood(20, 600).hang_ups())
+
+
+def test_same_seed_gives_the_same_run():
+    first, second = traffic(7), traffic(7)
+    first.run(lambda event: None)
+    second.run(lambda event: None)
+    assert first.trace and first.trace == second.trace
+    other = traffic(8)
+    other.run(lambda event: None)
+    assert other.trace != first.trace
+
+
+@pytest.mark.parametrize("rate", [-1.0, math.inf, math.nan])
+def test_poisson_rejects_bad_rates(rate):
+    with pytest.raises(ValueError):
+        LoadSimulator(seed=1).poisson(rate, 60)
+
+
+def test_poisson_with_zero_rate_adds_nothing():
+    assert LoadSimulator(seed=1).poisson(0, 60).arrivals == []
+
+
+def test_each_run_starts_over():
+    sim = LoadSimulator(seed=1, start=100.0).burst(MOM, 3, spacing=30, start=100.0)
+    assert sim.run(lambda event: None) == 6
+    assert sim.clock.now == 100.0 + 60 + 10
+    assert sim.run(lambda event: None) == 6
+    assert len(sim.trace) == 6
+    assert [e["time"] for e in sim.trace] == sorted(e["time"] for e in sim.trace)
+
+
+def test_missed_calls_hang_up_after_their_stay():
+    sim = LoadSimulator(seed=1).add_call(0, MOM, stay=25).add_call(5, MOM, answered=True)
+    sim.hang_ups(call_length=(40, 40))
+    sim.run(lambda event: None)
+    assert [(e["type"], e["time"]) for e in sim.trace] == [
+        (call_simulator.RINGING, 0), (call_simulator.RINGING, 5), (call_simulator.MISSED, 10),
+        (call_simulator.ANSWERED, 10), (call_simulator.HUNG_UP, 35)]
+
+
+def test_recorded_trace_replays_the_same_events_and_alerts(tmp_path):
+    sim = traffic(3).burst(MOM, 4, spacing=20, start=120)
+    alerts = replay_alerts(sim)
+    assert alerts
+    path = str(tmp_path / "trace.jsonl")
+    sim.save_trace(path)
+
+    replay = LoadSimulator.from_trace(path)
+    assert replay_alerts(replay) == alerts
+    assert [(e["type"], e["caller"]) for e in replay.trace] == [(e["type"], e["caller"]) for e in sim.trace]
+    assert [e["time"] for e in replay.trace] == pytest.approx([e["time"] for e in sim.trace])
@@ -0,0 +1,77 @@
+import datetime
+
+import pytest
+
+from core import message_index, message_store
+
+MOM = {"name": "Mom", "number": "+1111111111"}
+BOSS = {"name": "Boss", "number": "+4444444444"}
+NOW = datetime.datetime(2026, 3, 18, 15, 0).timestamp()   # a Wednesday
+
+
+def test_tokens_fold_plurals_but_keep_stop_words_whole():
+    assert message_index.tokens("This does matter") == ["matter"]
+    assert message_index.tokens("Meetings and the meeting's notes") == ["meeting", "meeting", "note"]
+    assert message_index.tokens("status of the bus and class") == ["status", "bus", "class"]
+
+
+@pytest.mark.parametrize("phrase, days", [
+    ("last 3 days", 3), ("past three days", 3), ("last couple of days", 2), ("past a day", 1),
+])
+def test_time_range_reads_digits_and_number_words(phrase, days):
+    since, until, rest = message_index.time_range(f"dentist from Mom {phrase}", now=NOW)
+    assert since == NOW - days * 86400 and until is None
+    assert message_index.tokens(rest) == ["dentist", "mom"]
+
+
+def test_time_range_named_days():
+    midnight = datetime.datetime(2026, 3, 18).timestamp()
+    assert message_index.time_range("yesterday", now=NOW)[:2] == (midnight - 86400, midnight)
+    assert message_index.time_range("this week", now=NOW)[0] == midnight - 2 * 86400
+    assert message_index.time_range("the dentist", now=NOW) == (None, None, "the dentist")
+
+
+def test_best_match_comes_first():
+    message_store.add_message(BOSS, "the meeting moved to Friday", timestamp=NOW - 50)
+    best = message_store.add_message(BOSS, "meeting about the meeting notes", timestamp=NOW - 40)
+    message_store.add_message(MOM, "call me about dinner", timestamp=NOW - 30)
+    results = message_index.search("meetings", now=NOW)
+    assert [m["id"] for m in results][0] == best
+    assert len(results) == 2 and results[0]["score"] >= results[1]["score"]
+
+
+def test_caller_name_is_boosted():
+    message_store.add_message(BOSS, "dinner is at eight, says mom", timestamp=NOW - 20)
+    from_mom = message_store.add_message(MOM, "dinner tonight", timestamp=NOW - 10)
+    assert message_index.search("mom dinner", now=NOW)[0]["id"] == from_mom
+
+
+def test_time_only_query_lists_the_newest_in_range():
+    message_store.add_message(MOM, "old", timestamp=NOW - 10 * 86400)
+    recent = message_store.add_message(MOM, "recent", timestamp=NOW - 3600)
+    assert [m["id"] for m in message_index.search("today", now=NOW)] == [recent]
+    assert message_index.search("", now=NOW) == []
+
+
+def test_sync_is_incremental():
+    for i in range(5):
+        message_store.add_message(MOM, f"note {i}", timestamp=NOW - i)
+    assert message_index.sync(limit=3) == 3
+    assert message_index.sync(limit=3) == 2
+    assert message_index.sync() == 0
+    message_store.add_message(MOM, "late note", timestamp=NOW)
+    assert message_index.sync() == 1
+    assert len(message_index.search("note", limit=10, now=NOW)) == 6
+
+
+def test_undecryptable_messages_are_skipped():
+    if not message_store.encryption.enabled():
+        pytest.skip("needs encryption")
+    damaged = message_store.add_message(MOM, "garage code", timestamp=NOW - 20)
+    kept = message_store.add_message(BOSS, "garage door", timestamp=NOW - 10)
+    conn = message_store._connect()
+    sealed = conn.execute("SELECT message FROM messages WHERE id = ?", (damaged,)).fetchone()[0]
+    with conn:
+        conn.execute("UPDATE messages SET message = ? WHERE id = ?", (sealed[:-1], damaged))
+    assert message_index.sync() == 2
+    assert [m["id"] for m in message_index.search("garage", now=NOW)] == [kept]
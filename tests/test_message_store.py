@@ -0,0 +1,103 @@
+import json
+import os
+
+import pytest
+
+from core import message_store
+
+MOM = {"name": "Mom", "number": "+1111111111"}
+BOSS = {"name": "Boss", "number": "+4444444444"}
+
+
+def _legacy_file(directory, name, caller, text, stamp):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+        json.dump({"caller": caller, "message": text, "time": stamp}, f)
+
+
+def test_add_and_read_back():
+    message_id = message_store.add_message(MOM, "call me back", timestamp=100.0)
+    message = message_store.get(message_id)
+    assert message["caller"] == MOM
+    assert message["message"] == "call me back"
+    assert message["time"] == 100.0
+    assert not message["read"]
+
+
+def test_mark_read_leaves_only_new_messages():
+    first = message_store.add_message(MOM, "one", timestamp=1.0)
+    message_store.add_message(BOSS, "two", timestamp=2.0)
+    message_store.mark_read([first])
+    assert [m["message"] for m in message_store.unread()] == ["two"]
+    assert message_store.count_unread() == 1
+
+
+def test_iter_unread_pages_through_ties_in_time():
+    ids = [message_store.add_message(MOM, f"m{i}", timestamp=float(i // 3)) for i in range(10)]
+    seen = [m["id"] for m in message_store.iter_unread(batch_size=3)]
+    assert seen == ids
+
+
+def test_unread_summary_groups_by_caller():
+    message_store.add_message(BOSS, "a", timestamp=1.0)
+    message_store.add_message(MOM, "b", timestamp=2.0)
+    message_store.add_message(BOSS, "c", timestamp=3.0)
+    summary = message_store.unread_summary()
+    assert [(g["name"], g["count"]) for g in summary] == [("Boss", 2), ("Mom", 1)]
+
+
+def test_after_and_ranges():
+    ids = [message_store.add_message(MOM, str(i), timestamp=float(i)) for i in range(5)]
+    assert [m["id"] for m in message_store.after(ids[1], limit=2)] == ids[2:4]
+    assert [m["message"] for m in message_store.between(1.0, 3.0)] == ["1", "2"]
+    assert [m["message"] for m in message_store.by_caller(MOM["number"], since=3.0)] == ["3", "4"]
+
+
+def test_migration_imports_once_and_removes_the_json_files():
+    directory = os.path.join("data", "messages")
+    _legacy_file(directory, "Boss_20251031_122508.json", BOSS, "meeting at noon", "20251031_122508")
+    _legacy_file(directory, "Mom_20251031_121914.json", MOM, "", "20251031_121914")
+    _legacy_file(directory, "broken.json", MOM, "x", "not a time")
+
+    assert message_store.migrate_directory(directory) == 2
+    assert os.listdir(directory) == ["broken.json"]   # left for a look, not imported
+    assert [m["caller"]["name"] for m in message_store.unread()] == ["Mom", "Boss"]
+
+    # A copy of an already imported file is skipped (and removed) on the next run
+    _legacy_file(directory, "Boss_20251031_122508.json", BOSS, "meeting at noon", "20251031_122508")
+    assert message_store.migrate_directory(directory) == 0
+    assert message_store.count_unread() == 2
+    assert os.listdir(directory) == ["broken.json"]
+
+
+def test_iter_unread_none_means_callers_without_a_number():
+    message_store.add_message(MOM, "from mom", timestamp=1.0)
+    message_store.add_message({"name": "Stranger"}, "no number", timestamp=2.0)
+    message_store.add_message({"name": "Other"}, "also none", timestamp=3.0)
+    assert [m["message"] for m in message_store.iter_unread(None)] == ["no number", "also none"]
+    assert [m["message"] for m in message_store.iter_unread(None, caller_name="Other")] == ["also none"]
+    assert len(list(message_store.iter_unread())) == 3
+
+
+def test_a_damaged_message_neither_stalls_reencryption_nor_breaks_reports(monkeypatch):
+    pytest.importorskip("cryptography")
+    encryption = message_store.encryption
+    from core import reporter
+    damaged = message_store.add_message(MOM, "garage code", timestamp=1.0)
+    message_store.add_message(BOSS, "meeting at noon", timestamp=2.0)
+    conn = message_store._connect()
+    sealed = conn.execute("SELECT message FROM messages WHERE id = ?", (damaged,)).fetchone()[0]
+    with conn:
+        conn.execute("UPDATE messages SET message = ? WHERE id = ?", (sealed[:-1], damaged))
+
+    assert message_store.get(damaged)["unreadable"]
+    assert [m["message"] for m in message_store.unread()] == [None, "meeting at noon"]
+    phrases = [phrase for phrase, _ in reporter.report_items()]
+    assert phrases == ["Mom left a message I can no longer read.", "Boss said: meeting at noon"]
+
+    monkeypatch.setattr(encryption, "_reencryptors", {"message": message_store._reencrypt_batch})
+    monkeypatch.setattr(encryption, "REENCRYPT_PAUSE", 0)
+    encryption.rotate_key()
+    assert encryption.reencrypt_all() == {"message": 2}
+    assert not os.path.exists(encryption.RETIRED_KEYS_FILE)   # the pass completed
+    assert message_store.get(2)["message"] == "meeting at noon"
@@ -0,0 +1,79 @@
+import pytest
+
+from core import metrics
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+
+
+def test_counters_are_shared_by_name():
+    metrics.count("test_rings")
+    metrics.count("test_rings", 2)
+    assert metrics.counter("neo_test_rings_total").value == 3
+
+
+def test_histogram_buckets_and_quantiles():
+    hist = metrics.Histogram("test_latency", buckets=(0.1, 1.0))
+    assert hist.quantile(0.5) is None
+    for value in (0.05, 0.1, 0.5, 5.0):
+        hist.observe(value)
+    assert hist.counts == [2, 1, 1]
+    assert hist.quantile(0.5) == 0.1
+    assert hist.quantile(0.75) == 1.0
+    assert hist.quantile(1.0) == float("inf")
+    assert hist.lines() == [
+        'test_latency_bucket{le="0.1"} 2',
+        'test_latency_bucket{le="1.0"} 3',
+        'test_latency_bucket{le="+Inf"} 4',
+        "test_latency_sum 5.65",
+        "test_latency_count 4",
+    ]
+
+
+def test_timer_and_timed_record_calls_and_errors():
+    with metrics.timer("test_block"):
+        pass
+
+    @metrics.timed("test_call")
+    def call(fail):
+        if fail:
+            raise ValueError("no")
+        return "ok"
+
+    assert call(False) == "ok"
+    with pytest.raises(ValueError):
+        call(True)
+    assert metrics.histogram("neo_test_block_seconds").count == 1
+    assert metrics.histogram("neo_test_call_seconds").count == 2
+    assert metrics.counter("neo_test_call_errors_total").value == 1
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    with metrics.timer("test_off"):
+        metrics.count("test_off")
+    assert "neo_test_off_seconds" not in metrics._registry
+    assert metrics.counter("neo_test_off_total").value == 0
+
+
+def test_text_export(tmp_path):
+    metrics.counter("neo_test_exported_total", "Exported things").inc()
+    text = metrics.export_text()
+    assert "# HELP neo_test_exported_total Exported things\n" in text
+    assert "# TYPE neo_test_exported_total counter\nneo_test_exported_total 1\n" in text
+    path = tmp_path / "out" / "metrics.prom"
+    metrics.write_textfile(str(path))
+    assert path.read_text(encoding="utf-8") == metrics.export_text()
+
+
+def test_observers_see_every_timing(monkeypatch):
+    seen = []
+    monkeypatch.setattr(metrics, "_observers", [])
+    metrics.add_observer(lambda name, value: seen.append((name, value)))
+    metrics.histogram("test_observed").observe(0.5)
+    with metrics.timer("test_observed_block"):
+        pass
+    assert seen[0] == ("test_observed", 0.5)
+    assert [name for name, _ in seen] == ["test_observed", "neo_test_observed_block_seconds"]
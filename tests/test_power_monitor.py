@@ -0,0 +1,100 @@
+from collections import deque
+from types import SimpleNamespace
+
+import pytest
+
+from core import power_monitor
+
+
+class FakeBattery:
+    """
+    Stands in for psutil: the test sets the level and the clock.
+    """
+
+    def __init__(self):
+        self.percent, self.plugged, self.now = 100, False, 0.0
+
+    def sensors_battery(self):
+        return SimpleNamespace(percent=self.percent, power_plugged=self.plugged)
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def battery(monkeypatch):
+    fake = FakeBattery()
+    monkeypatch.setattr(power_monitor, "psutil", fake)
+    monkeypatch.setattr(power_monitor, "time", fake)
+    monkeypatch.setattr(power_monitor, "_samples", deque(maxlen=power_monitor.RATE_SAMPLES))
+    monkeypatch.setattr(power_monitor, "_armed", {power_monitor.BATTERY_LOW_THRESHOLD: True,
+                                                  power_monitor.BATTERY_CRITICAL_THRESHOLD: True})
+    monkeypatch.setattr(power_monitor, "_low_power", False)
+    monkeypatch.setattr(power_monitor, "_low_power_listeners", [])
+    return fake
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    messages = []
+    monkeypatch.setattr(power_monitor, "send_message",
+                        lambda msg, spoken="Power alert recorded.": messages.append((msg, spoken)))
+    return messages
+
+
+def drain(battery, levels, step=60):
+    for level in levels:
+        battery.percent = level
+        power_monitor.check_battery()
+        battery.now += step
+
+
+def test_alerts_fire_once_per_crossing(battery, sent):
+    drain(battery, [25, 20, 19, 18, 21, 19])
+    assert len(sent) == 1 and "battery low (20%)" in sent[0][0]
+
+
+def test_thresholds_rearm_only_past_the_hysteresis(battery, sent):
+    low, margin = power_monitor.BATTERY_LOW_THRESHOLD, power_monitor.HYSTERESIS
+    drain(battery, [low, low + margin - 1, low, low + margin, low])
+    assert len(sent) == 2
+
+
+def test_plugging_in_rearms_the_thresholds(battery, sent):
+    drain(battery, [20])
+    battery.plugged = True
+    drain(battery, [20])
+    battery.plugged = False
+    drain(battery, [20])
+    assert len(sent) == 2
+
+
+def test_critical_alert_has_its_own_wording(battery, sent):
+    drain(battery, [15, 9])
+    (low, low_spoken), (critical, critical_spoken) = sent
+    assert "low" in low and "critical (9%)" in critical
+    assert low_spoken != critical_spoken
+
+
+def test_low_power_mode_turns_on_and_off_with_hysteresis(battery, sent):
+    changes = []
+    power_monitor.on_low_power(changes.append)
+    threshold = power_monitor.LOW_POWER_THRESHOLD
+    drain(battery, [threshold + 1, threshold, threshold - 1, threshold + 1, threshold + power_monitor.HYSTERESIS])
+    assert changes == [True, False]
+    assert not power_monitor.is_low_power()
+
+
+def test_time_to_empty_follows_the_discharge_rate(battery, sent):
+    assert power_monitor.time_to_empty() is None
+    drain(battery, [80, 79, 78, 77], step=360)   # 10% per hour
+    assert power_monitor.discharge_rate() == pytest.approx(10.0)
+    assert power_monitor.time_to_empty() == pytest.approx(77 / 10 * 3600)
+    battery.plugged = True
+    drain(battery, [77])
+    assert power_monitor.time_to_empty() is None
+
+
+def test_no_battery_sensor_polls_rarely(battery, monkeypatch):
+    monkeypatch.setattr(battery, "sensors_battery", lambda: None)
+    assert power_monitor.check_battery() == power_monitor.POLL_NO_BATTERY
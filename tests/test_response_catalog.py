@@ -0,0 +1,81 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from core import response_catalog
+from core.response_catalog import DEFAULT_RESPONSES, RELOAD_CHECK, RESPONSES_FILE
+
+LEGACY = {
+    "no_user": ["Sir is away, can I take a note?", DEFAULT_RESPONSES["away"][0]],
+    "unknown_condition": ["Not sure where sir is, do you want to leave a message?"],
+}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = SimpleNamespace(now=1000.0)
+    fake.monotonic = lambda: fake.now
+    monkeypatch.setattr(response_catalog, "time", fake)
+    monkeypatch.setattr(response_catalog, "_catalog", None)
+    monkeypatch.setattr(response_catalog, "_mtime", None)
+    monkeypatch.setattr(response_catalog, "_last_check", 0.0)
+    monkeypatch.setattr(response_catalog, "_listeners", [])
+    return fake
+
+
+def write(data, bump=0):
+    os.makedirs(os.path.dirname(RESPONSES_FILE), exist_ok=True)
+    with open(RESPONSES_FILE, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    # Make sure the change is visible even on coarse file system clocks
+    stamp = os.stat(RESPONSES_FILE).st_mtime_ns + bump * 1_000_000_000
+    os.utime(RESPONSES_FILE, ns=(stamp, stamp))
+
+
+def test_legacy_keys_are_merged_into_their_conditions(clock):
+    write(LEGACY)
+    assert sorted(response_catalog.conditions()) == sorted(
+        k for k in DEFAULT_RESPONSES if k != response_catalog.PROMPTS_KEY)
+    away = response_catalog.responses("away")
+    assert away[:len(DEFAULT_RESPONSES["away"])] == DEFAULT_RESPONSES["away"]
+    assert away.count(DEFAULT_RESPONSES["away"][0]) == 1
+    assert "Sir is away, can I take a note?" in away
+    assert LEGACY["unknown_condition"][0] in response_catalog.responses("unknown")
+    assert not any("no_user" in line or "unknown_condition" in line
+                   for line in response_catalog.all_lines())
+
+
+def test_missing_file_uses_the_defaults(clock):
+    assert response_catalog.responses("sleeping") == DEFAULT_RESPONSES["sleeping"]
+    assert response_catalog.prompt("detected", condition="busy") == "Detected that Sir is busy."
+
+
+def test_changes_are_picked_up_after_the_check_interval(clock):
+    write({"busy": ["Old line."]})
+    reloads = []
+    response_catalog.on_reload(lambda: reloads.append(True))
+    assert response_catalog.responses("busy") == ["Old line."]
+
+    write({"busy": ["New line."]}, bump=1)
+    clock.now += RELOAD_CHECK / 2
+    assert response_catalog.responses("busy") == ["Old line."]
+    clock.now += RELOAD_CHECK
+    assert response_catalog.responses("busy") == ["New line."]
+    assert reloads == [True]
+
+    clock.now += RELOAD_CHECK * 2   # nothing changed: no reload
+    assert not response_catalog.reload_if_changed()
+    assert reloads == [True]
+
+
+def test_a_broken_edit_keeps_the_previous_catalog(clock):
+    write({"busy": ["Good line."]})
+    response_catalog.catalog()
+    with open(RESPONSES_FILE, "w", encoding="utf-8") as f:
+        f.write("{ not json")
+    stamp = os.stat(RESPONSES_FILE).st_mtime_ns + 1_000_000_000
+    os.utime(RESPONSES_FILE, ns=(stamp, stamp))
+    clock.now += RELOAD_CHECK
+    assert response_catalog.responses("busy") == ["Good line."]
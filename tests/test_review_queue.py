@@ -0,0 +1,148 @@
+import http.client
+import json
+import os
+import time
+
+import pytest
+
+from core import review_queue
+
+
+def test_submit_returns_at_once_and_lists_pending_reviews():
+    first = review_queue.submit("feedback", "Did Neo answer Mom correctly?", {"caller": "Mom"})
+    second = review_queue.submit("correction", "Any correction?")
+    assert [r["id"] for r in review_queue.pending()] == [first, second]
+    assert [r["id"] for r in review_queue.pending("correction")] == [second]
+    review = review_queue.get(first)
+    assert review["prompt"] == "Did Neo answer Mom correctly?"
+    assert review["context"] == {"caller": "Mom"}
+    assert review_queue.count_pending() == 2
+
+
+def test_answer_runs_the_handler_once(monkeypatch):
+    applied = []
+    monkeypatch.setitem(review_queue._handlers, "test", lambda answer, context: applied.append((answer, context)))
+    review_id = review_queue.submit("test", "Question?", {"n": 1})
+    assert review_queue.answer(review_id, " yes ", source="voice")
+    assert not review_queue.answer(review_id, "again")
+    assert applied == [("yes", {"n": 1})]
+    assert review_queue.get(review_id)["status"] == review_queue.DONE
+
+
+def test_failed_handlers_are_retried_then_given_up(monkeypatch):
+    calls = []
+
+    def flaky(answer, context):
+        calls.append(answer)
+        if len(calls) == 1 or answer == "never":
+            raise ValueError("profile busy")
+
+    monkeypatch.setitem(review_queue._handlers, "test", flaky)
+    retried = review_queue.submit("test", "Question?")
+    review_queue.answer(retried, "yes")
+    review = review_queue.get(retried)
+    assert review["status"] == review_queue.ANSWERED and review["error"] == "profile busy"
+    assert review_queue.apply_answered() == 1
+    assert review_queue.get(retried)["status"] == review_queue.DONE
+
+    doomed = review_queue.submit("test", "Question?")
+    review_queue.answer(doomed, "never")
+    for _ in range(review_queue.APPLY_ATTEMPTS):
+        review_queue.apply_answered()
+    assert review_queue.get(doomed)["status"] == review_queue.FAILED
+    assert calls.count("never") == review_queue.APPLY_ATTEMPTS
+
+
+def test_empty_answer_skips():
+    review_id = review_queue.submit("test", "Question?")
+    assert review_queue.answer(review_id, "  ")
+    assert review_queue.get(review_id)["status"] == review_queue.SKIPPED
+    assert review_queue.pending() == []
+
+
+def test_expired_reviews_fall_back_to_their_default(monkeypatch):
+    applied = []
+    monkeypatch.setitem(review_queue._handlers, "test", lambda answer, context: applied.append(answer))
+    with_default = review_queue.submit("test", "Keep it?", timeout=10, default="keep")
+    without = review_queue.submit("test", "Anything?", timeout=10)
+    review_queue.expire_due(now=time.time() + 11)
+    assert applied == ["keep"]
+    assert review_queue.get(with_default)["source"] == "default"
+    assert review_queue.get(without)["status"] == review_queue.EXPIRED
+
+
+def test_closed_reviews_are_deleted_after_a_while():
+    review_id = review_queue.submit("test", "Question?")
+    review_queue.skip(review_id)
+    review_queue.expire_due(now=time.time() + review_queue.KEEP_CLOSED + 1)
+    assert review_queue.get(review_id) is None
+
+
+def test_prompts_context_and_answers_are_not_stored_in_the_clear():
+    encryption = review_queue.encryption
+    review_id = review_queue.submit("note", "Reported: the garage code is 4321", {"message": "code 4321"},
+                                    default="code 4321")
+    review_queue.answer(review_id, "The code is 4321")
+    row = review_queue._connect().execute("SELECT * FROM reviews WHERE id = ?", (review_id,)).fetchone()
+    if encryption.enabled():
+        for column in review_queue.SEALED_COLUMNS:
+            assert b"4321" not in row[column]
+    review = review_queue.get(review_id)
+    assert review["context"] == {"message": "code 4321"}
+    assert review["answer"] == "The code is 4321"
+
+
+def test_every_sealed_field_is_reencrypted_after_rotation():
+    pytest.importorskip("cryptography")
+    encryption = review_queue.encryption
+    answered = review_queue.submit("note", "Any correction?", default="none")
+    review_queue.answer(answered, "fine")
+    review_queue.submit("note", "Another?")
+    encryption.rotate_key()
+    assert review_queue._reencrypt_batch() == 2
+    assert review_queue._reencrypt_batch() == 0
+    row = review_queue._connect().execute("SELECT * FROM reviews WHERE id = ?", (answered,)).fetchone()
+    assert all(not encryption.needs_reencrypt(row[column]) for column in review_queue.SEALED_COLUMNS)
+    assert review_queue.get(answered)["answer"] == "fine"
+
+
+@pytest.fixture
+def api():
+    server = review_queue.start_api(port=0)
+    yield server.server_address[1], review_queue.api_token()
+    server.shutdown()
+    server.server_close()
+    review_queue._server = None
+
+
+def _request(port, method, path, body=None, headers=()):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request(method, path, body=body, headers=dict(headers))
+    response = conn.getresponse()
+    status, data = response.status, json.loads(response.read())
+    conn.close()
+    return status, data
+
+
+def test_api_needs_the_token_a_local_host_and_json(api):
+    port, token = api
+    review_id = review_queue.submit("test", "Question?")
+    auth = {"Authorization": f"Bearer {token}"}
+    body = json.dumps({"answer": "yes"})
+    assert _request(port, "GET", "/reviews")[0] == 401
+    assert _request(port, "GET", "/reviews", headers={"Authorization": "Bearer wrong"})[0] == 401
+    assert _request(port, "GET", "/reviews", headers={**auth, "Host": "evil.example:80"})[0] == 403
+    assert _request(port, "POST", f"/reviews/{review_id}", body,
+                    {**auth, "Content-Type": "text/plain"})[0] == 415
+    assert review_queue.get(review_id)["status"] == review_queue.PENDING
+    status, reviews = _request(port, "GET", "/reviews", headers=auth)
+    assert status == 200 and [r["id"] for r in reviews] == [review_id]
+    assert _request(port, "POST", f"/reviews/{review_id}", body,
+                    {**auth, "Content-Type": "application/json"}) == (200, {"ok": True})
+    assert review_queue.get(review_id)["answer"] == "yes"
+
+
+def test_api_token_is_private_and_stable():
+    token = review_queue.api_token()
+    assert review_queue.api_token() == token
+    assert os.stat(review_queue.API_TOKEN_FILE).st_mode & 0o077 == 0
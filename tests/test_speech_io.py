@@ -0,0 +1,177 @@
+import json
+import threading
+
+import numpy as np
+
+from core import speech_io
+from core.speech_io import BLOCK_SIZE, EnergyVad, MicRing
+
+BLOCKS_PER_SECOND = speech_io.SAMPLE_RATE // BLOCK_SIZE
+
+
+def block(level):
+    # A constant block has an RMS equal to its level
+    return np.full(BLOCK_SIZE, level, dtype=np.int16)
+
+
+def classify(vad, levels):
+    return [vad.is_speech(block(level)) for level in levels]
+
+
+# ----------------------------
+# EnergyVad
+# ----------------------------
+def test_speech_stands_out_from_a_quiet_room():
+    vad = EnergyVad()
+    assert classify(vad, [100] * 10 + [3000] * 5 + [100] * 5) == [False] * 10 + [True] * 5 + [False] * 5
+
+
+def test_quiet_blocks_stay_below_the_minimum_level():
+    vad = EnergyVad()
+    assert not any(classify(vad, [0] * 5 + [250] * 5))
+
+
+def test_floor_adapts_during_silence():
+    vad = EnergyVad()
+    classify(vad, [100] * 5 + [200] * 50)
+    assert 190 < vad.noise_floor <= 200
+
+
+def test_lasting_background_noise_stops_counting_as_speech():
+    vad = EnergyVad()
+    classify(vad, [100] * 10)
+    heard = classify(vad, [1000] * (15 * BLOCKS_PER_SECOND))
+    assert heard[0] is True
+    first_quiet = heard.index(False)
+    assert first_quiet < 10 * BLOCKS_PER_SECOND
+    assert not any(heard[first_quiet:])
+
+
+def test_speech_with_pauses_keeps_the_floor_down():
+    vad = EnergyVad()
+    classify(vad, [100] * 10)
+    heard = classify(vad, ([3000] * 8 + [100] * 3) * 20)
+    assert heard == ([True] * 8 + [False] * 3) * 20
+    assert vad.noise_floor < 150
+
+
+# ----------------------------
+# MicRing / RingReader
+# ----------------------------
+def small_ring():
+    ring = MicRing(seconds=0, block=4)   # the minimum of 4 blocks
+    assert len(ring.buffer) == 16
+    return ring
+
+
+def test_readers_get_block_views_in_order():
+    ring = small_ring()
+    reader = ring.reader()
+    ring.write(np.arange(8, dtype=np.int16))
+    first, second = reader.read(), reader.read()
+    assert first.tolist() == [0, 1, 2, 3] and second.tolist() == [4, 5, 6, 7]
+    assert np.shares_memory(first, ring.buffer)
+    assert reader.read(timeout=0.01) is None
+
+
+def test_readers_only_see_audio_written_after_they_joined():
+    ring = small_ring()
+    ring.write(np.arange(8, dtype=np.int16))
+    reader = ring.reader()
+    ring.write(np.arange(100, 104, dtype=np.int16))
+    assert reader.read().tolist() == [100, 101, 102, 103]
+
+
+def test_reads_across_the_end_are_stitched_together():
+    ring = small_ring()
+    reader = ring.reader()
+    ring.write(np.arange(12, dtype=np.int16))
+    reader.read(count=12, timeout=5)
+    ring.write(np.arange(12, 20, dtype=np.int16))
+    assert reader.read(count=8, timeout=5).tolist() == list(range(12, 20))
+    assert reader.overruns == 0
+
+
+def test_a_reader_that_falls_a_ring_behind_skips_ahead():
+    ring = small_ring()
+    reader = ring.reader()
+    ring.write(np.arange(16, dtype=np.int16))
+    assert reader.read().tolist() == [8, 9, 10, 11]
+    assert reader.overruns == 1
+    assert reader.read().tolist() == [12, 13, 14, 15]
+    assert reader.overruns == 1
+
+
+def test_oversized_writes_keep_the_latest_samples():
+    ring = small_ring()
+    reader = ring.reader()
+    ring.write(np.arange(40, dtype=np.int16))
+    assert ring.write_pos == 16
+    assert reader.read(count=8).tolist() == list(range(32, 40))
+
+
+def test_read_waits_for_the_writer():
+    ring = small_ring()
+    reader = ring.reader()
+    threading.Timer(0.05, ring.write, (np.arange(4, dtype=np.int16),)).start()
+    assert reader.read(timeout=5).tolist() == [0, 1, 2, 3]
+
+
+# ----------------------------
+# Speaking
+# ----------------------------
+def test_an_interrupt_before_playback_stops_the_utterance(capsys):
+    stop = threading.Event()
+    speech_io.interrupt(stop)
+    assert speech_io.speak("never heard", stop) is False
+    assert speech_io.speak("heard") is True
+    assert capsys.readouterr().out == "🔇 Neo says: heard\n"
+
+
+# ----------------------------
+# Recognizer feed
+# ----------------------------
+class FakeRecognizer:
+    """
+    Ends an utterance on every second block, like a Vosk recognizer would
+    after a pause.
+    """
+
+    def __init__(self):
+        self.blocks = []
+
+    def AcceptWaveform(self, data):
+        self.blocks.append(data)
+        return len(self.blocks) % 2 == 0
+
+    def Result(self):
+        return json.dumps({"text": f"block {len(self.blocks)}"})
+
+    def PartialResult(self):
+        return json.dumps({"partial": "block"})
+
+
+def test_feed_returns_the_result_with_the_block():
+    rec = FakeRecognizer()
+    assert speech_io._feed(rec, block(1)) == (False, '{"partial": "block"}')
+    assert speech_io._feed(rec, block(1)) == (True, '{"text": "block 2"}')
+    assert rec.blocks[0] == block(1).tobytes()
+
+
+def test_a_backend_stands_in_for_speaking_and_listening():
+    said = []
+
+    def speak(text, stop):
+        said.append(text)
+        return True
+
+    def utterances(partials, timeout, keywords, stop):
+        yield "final", "scripted"
+
+    speech_io.set_backend(speak=speak, utterances=utterances)
+    try:
+        assert speech_io.speak("hello") is True
+        assert list(speech_io.utterances(timeout=1)) == [("final", "scripted")]
+    finally:
+        speech_io.set_backend()
+    assert said == ["hello"]
@@ -0,0 +1,104 @@
+import threading
+
+from core import speech_io, speech_scheduler
+
+
+def _fake_speaker(monkeypatch, on_speak=None, before=None):
+    spoken = []
+
+    def speak(text, stop=None):
+        if before is not None:
+            before(text)   # runs after the utterance was picked, before playback
+        if stop is not None and stop.is_set():
+            return False
+        spoken.append(text)
+        if on_speak is not None:
+            on_speak(text)
+        return True
+
+    monkeypatch.setattr(speech_io, "speak", speak)
+    return spoken
+
+
+def _hold(text, started, gate):
+    # Keeps `text` "playing" until the gate opens
+    def on_speak(spoken_text):
+        if spoken_text == text:
+            started.set()
+            gate.wait(5)
+    return on_speak
+
+
+def test_lines_play_in_priority_order(monkeypatch):
+    started, gate = threading.Event(), threading.Event()
+    spoken = _fake_speaker(monkeypatch, _hold("first", started, gate))
+    first = speech_scheduler.say("first", speech_scheduler.PRIORITY_STATUS)
+    assert started.wait(5)
+    status = speech_scheduler.say("status", speech_scheduler.PRIORITY_STATUS)
+    alert = speech_scheduler.say("alert", speech_scheduler.PRIORITY_ALERT)
+    gate.set()
+    for future in (first, status, alert):
+        assert future.result(timeout=5) is True
+    assert spoken == ["first", "alert", "status"]
+
+
+def test_duplicate_pending_texts_share_one_utterance(monkeypatch):
+    started, gate = threading.Event(), threading.Event()
+    spoken = _fake_speaker(monkeypatch, _hold("busy", started, gate))
+    busy = speech_scheduler.say("busy")
+    assert started.wait(5)
+    one = speech_scheduler.say("same line")
+    two = speech_scheduler.say("same line")
+    assert one is two
+    gate.set()
+    busy.result(timeout=5)
+    one.result(timeout=5)
+    assert spoken.count("same line") == 1
+
+
+def test_preemption_before_playback_is_not_lost(monkeypatch):
+    # A more urgent line queued after "low" was picked but before its
+    # playback started still goes first, and "low" is spoken exactly once
+    urgent = []
+
+    def before(text):
+        if text == "low" and not urgent:
+            urgent.append(speech_scheduler.say("urgent", speech_scheduler.PRIORITY_ALERT))
+
+    spoken = _fake_speaker(monkeypatch, before=before)
+    assert speech_scheduler.say("low").result(timeout=5) is True
+    urgent[0].result(timeout=5)
+    assert spoken == ["urgent", "low"]
+
+
+def test_interrupted_line_is_played_again(monkeypatch):
+    cut = []
+
+    def speak(text, stop=None):
+        spoken.append(text)
+        if text == "long" and not cut:
+            cut.append(speech_scheduler.say("urgent", speech_scheduler.PRIORITY_ALERT))
+            return False   # playback was cut short
+        return True
+
+    spoken = []
+    monkeypatch.setattr(speech_io, "speak", speak)
+    assert speech_scheduler.say("long").result(timeout=5) is True
+    assert spoken == ["long", "urgent", "long"]
+
+
+def test_listeners_and_wait_idle(monkeypatch):
+    started, gate = threading.Event(), threading.Event()
+    spoken = _fake_speaker(monkeypatch, _hold("first", started, gate))
+    events = []
+    monkeypatch.setattr(speech_scheduler, "_listeners", [])
+    speech_scheduler.add_listener(lambda event, text, future: events.append((event, text)))
+    first = speech_scheduler.say("first")
+    assert started.wait(5)
+    assert speech_scheduler.say("second") is speech_scheduler.say("second")
+    assert not speech_scheduler.wait_idle(timeout=0.05)
+    gate.set()
+    assert speech_scheduler.wait_idle(timeout=5)
+    assert first.done() and spoken == ["first", "second"]
+    Q, S = speech_scheduler.QUEUED, speech_scheduler.STARTED
+    assert events == [(Q, "first"), (S, "first"), (Q, "second"), (Q, "second"), (S, "second")]
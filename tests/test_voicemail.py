@@ -0,0 +1,88 @@
+import io
+import os
+import queue
+import wave
+
+import numpy as np
+import pytest
+
+from core import encryption, speech_io, voicemail
+
+
+class FakeRing:
+    """
+    Stands in for the microphone ring: hands out queued blocks, then
+    lets the recorder stop once they are all written.
+    """
+
+    def __init__(self):
+        self.blocks = queue.Queue()
+        self.drained = queue.Queue()
+
+    def reader(self):
+        return self
+
+    def read(self, timeout=None):
+        try:
+            return self.blocks.get(timeout=timeout)
+        except queue.Empty:
+            self.drained.put(True)
+            return None
+
+
+@pytest.fixture
+def ring(monkeypatch):
+    ring = FakeRing()
+    monkeypatch.setattr(speech_io, "mic_ring", lambda: ring)
+    return ring
+
+
+def _record(ring, path, blocks):
+    for block in blocks:
+        ring.blocks.put(block)
+    recorder = voicemail.VoicemailRecorder(path).start()
+    ring.drained.get(timeout=5)
+    return recorder.stop()
+
+
+def _blocks(count):
+    rng = np.random.default_rng(1)
+    return [rng.integers(-3000, 3000, 1600).astype(np.int16) for _ in range(count)]
+
+
+def test_recording_is_encrypted_as_it_is_written(ring):
+    pytest.importorskip("cryptography")
+    blocks = _blocks(30)
+    path = _record(ring, "data/voicemail/mom.wav", blocks)
+    with open(path, "rb") as f:
+        raw = f.read()
+    assert encryption.is_encrypted(raw)
+    assert blocks[0].tobytes()[:64] not in raw
+    with encryption.open_read(path) as f:
+        audio = wave.open(io.BytesIO(f.read()))
+        assert audio.getframerate() == speech_io.SAMPLE_RATE
+        assert audio.readframes(10**6) == b"".join(b.tobytes() for b in blocks)
+
+
+def test_plain_wav_when_encryption_is_off(ring, monkeypatch):
+    monkeypatch.setattr(encryption, "ENCRYPTION_ENABLED", False)
+    blocks = _blocks(3)
+    path = _record(ring, "data/voicemail/mom.wav", blocks)
+    with wave.open(path) as audio:
+        assert audio.readframes(10**6) == b"".join(b.tobytes() for b in blocks)
+
+
+def test_empty_recording_is_not_kept(ring):
+    assert _record(ring, "data/voicemail/mom.wav", []) is None
+    assert not os.path.exists("data/voicemail/mom.wav")
+
+
+def test_cut_short_recordings_are_set_aside_on_rotation(ring):
+    pytest.importorskip("cryptography")
+    path = _record(ring, "data/voicemail/mom.wav", _blocks(30))
+    with open(path, "rb+") as f:
+        f.truncate(os.path.getsize(path) - 100)   # as if Neo died mid-call
+    encryption.rotate_key()
+    assert voicemail._reencrypt_batch() == 1
+    assert voicemail._reencrypt_batch() == 0
+    assert os.listdir("data/voicemail") == ["mom.wav.unreadable"]